@@ -0,0 +1,181 @@
+-- Per-user prediction aggregates, kept current by triggers on public.predictions
+-- so history summaries read one row instead of scanning a user's predictions
+CREATE TABLE IF NOT EXISTS public.prediction_user_stats (
+  user_id UUID PRIMARY KEY,
+  predictions BIGINT NOT NULL DEFAULT 0,
+  churned BIGINT NOT NULL DEFAULT 0,                      -- rows with prediction = 1
+  probability_sum DOUBLE PRECISION NOT NULL DEFAULT 0,    -- sum of features->>'churn_probability'
+  probability_count BIGINT NOT NULL DEFAULT 0,            -- rows that carry a churn_probability
+  last_prediction_at TIMESTAMPTZ,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Enable RLS
+ALTER TABLE public.prediction_user_stats ENABLE ROW LEVEL SECURITY;
+
+-- RLS policies (rows are only written by the triggers below)
+CREATE POLICY "Users can view their own prediction stats"
+  ON public.prediction_user_stats
+  FOR SELECT
+  USING (auth.uid() = user_id);
+
+-- Keyset pagination orders by (created_at, id); ties are common because a
+-- batch shares one created_at, so the index carries id as well
+CREATE INDEX IF NOT EXISTS predictions_user_id_created_at_id_idx
+  ON public.predictions (user_id, created_at DESC, id DESC);
+
+DROP INDEX IF EXISTS public.predictions_user_id_created_at_idx;
+
+-- Statement-level triggers: a COPY of thousands of rows updates each user's
+-- stats row once (users in a fixed order, so concurrent batches can't deadlock)
+CREATE OR REPLACE FUNCTION public.add_prediction_user_stats()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO public.prediction_user_stats AS s
+    (user_id, predictions, churned, probability_sum, probability_count, last_prediction_at)
+  SELECT user_id,
+         count(*),
+         count(*) FILTER (WHERE prediction = 1),
+         coalesce(sum((features->>'churn_probability')::double precision), 0),
+         count(features->>'churn_probability'),
+         max(created_at)
+  FROM new_rows
+  GROUP BY user_id
+  ORDER BY user_id
+  ON CONFLICT (user_id) DO UPDATE SET
+    predictions = s.predictions + EXCLUDED.predictions,
+    churned = s.churned + EXCLUDED.churned,
+    probability_sum = s.probability_sum + EXCLUDED.probability_sum,
+    probability_count = s.probability_count + EXCLUDED.probability_count,
+    last_prediction_at = greatest(s.last_prediction_at, EXCLUDED.last_prediction_at),
+    updated_at = now();
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.remove_prediction_user_stats()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  UPDATE public.prediction_user_stats AS s SET
+    predictions = s.predictions - d.predictions,
+    churned = s.churned - d.churned,
+    probability_sum = s.probability_sum - d.probability_sum,
+    probability_count = s.probability_count - d.probability_count,
+    last_prediction_at = (SELECT max(p.created_at) FROM public.predictions p WHERE p.user_id = s.user_id),
+    updated_at = now()
+  FROM (
+    SELECT user_id,
+           count(*) AS predictions,
+           count(*) FILTER (WHERE prediction = 1) AS churned,
+           coalesce(sum((features->>'churn_probability')::double precision), 0) AS probability_sum,
+           count(features->>'churn_probability') AS probability_count
+    FROM old_rows
+    GROUP BY user_id
+  ) d
+  WHERE s.user_id = d.user_id;
+
+  DELETE FROM public.prediction_user_stats
+  WHERE predictions <= 0 AND user_id IN (SELECT user_id FROM old_rows);
+  RETURN NULL;
+END;
+$$;
+
+-- An UPDATE can move a row to another user or change its prediction or
+-- probability: take the old rows out, then count the new ones in
+CREATE OR REPLACE FUNCTION public.update_prediction_user_stats()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  UPDATE public.prediction_user_stats AS s SET
+    predictions = s.predictions - d.predictions,
+    churned = s.churned - d.churned,
+    probability_sum = s.probability_sum - d.probability_sum,
+    probability_count = s.probability_count - d.probability_count,
+    last_prediction_at = (SELECT max(p.created_at) FROM public.predictions p WHERE p.user_id = s.user_id),
+    updated_at = now()
+  FROM (
+    SELECT user_id,
+           count(*) AS predictions,
+           count(*) FILTER (WHERE prediction = 1) AS churned,
+           coalesce(sum((features->>'churn_probability')::double precision), 0) AS probability_sum,
+           count(features->>'churn_probability') AS probability_count
+    FROM old_rows
+    GROUP BY user_id
+  ) d
+  WHERE s.user_id = d.user_id;
+
+  INSERT INTO public.prediction_user_stats AS s
+    (user_id, predictions, churned, probability_sum, probability_count, last_prediction_at)
+  SELECT user_id,
+         count(*),
+         count(*) FILTER (WHERE prediction = 1),
+         coalesce(sum((features->>'churn_probability')::double precision), 0),
+         count(features->>'churn_probability'),
+         max(created_at)
+  FROM new_rows
+  GROUP BY user_id
+  ORDER BY user_id
+  ON CONFLICT (user_id) DO UPDATE SET
+    predictions = s.predictions + EXCLUDED.predictions,
+    churned = s.churned + EXCLUDED.churned,
+    probability_sum = s.probability_sum + EXCLUDED.probability_sum,
+    probability_count = s.probability_count + EXCLUDED.probability_count,
+    last_prediction_at = greatest(s.last_prediction_at, EXCLUDED.last_prediction_at),
+    updated_at = now();
+
+  DELETE FROM public.prediction_user_stats
+  WHERE predictions <= 0 AND user_id IN (SELECT user_id FROM old_rows);
+  RETURN NULL;
+END;
+$$;
+
+-- Backfill under a lock that blocks writers, so no insert lands between the
+-- snapshot and the triggers
+LOCK TABLE public.predictions IN SHARE ROW EXCLUSIVE MODE;
+
+INSERT INTO public.prediction_user_stats
+  (user_id, predictions, churned, probability_sum, probability_count, last_prediction_at)
+SELECT user_id,
+       count(*),
+       count(*) FILTER (WHERE prediction = 1),
+       coalesce(sum((features->>'churn_probability')::double precision), 0),
+       count(features->>'churn_probability'),
+       max(created_at)
+FROM public.predictions
+GROUP BY user_id
+ON CONFLICT (user_id) DO NOTHING;
+
+DO $$ BEGIN
+  CREATE TRIGGER predictions_add_user_stats
+    AFTER INSERT ON public.predictions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.add_prediction_user_stats();
+EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+
+DO $$ BEGIN
+  CREATE TRIGGER predictions_remove_user_stats
+    AFTER DELETE ON public.predictions
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.remove_prediction_user_stats();
+EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+
+DO $$ BEGIN
+  CREATE TRIGGER predictions_update_user_stats
+    AFTER UPDATE ON public.predictions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.update_prediction_user_stats();
+EXCEPTION WHEN duplicate_object THEN NULL; END $$;
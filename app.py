@@ -1,10 +1,23 @@
 import streamlit as st
-import joblib
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-import base64
 import os
+import tempfile
+
+# Plotly, pandas and the pickled pipeline are imported on first use, not here:
+# a cold start only needs streamlit, NumPy and the compiled model.
+from artifacts import BASE_DIR, ArtifactRegistry, io_stats, load_asset_base64
+from compiled_model import COMPILED_FILE, CompiledRuntime, default_runtime, load_runtime
+from drift_monitor import compare as drift_compare, load_reference
+from explanations import load_explainer, pipeline_explainer
+from inference import default_model_path, load_inference_model
+from prediction_cache import PredictionCache
+from prediction_sink import open_sink
+from profiling import DIAGNOSTICS_ENABLED, RerunTrace, SpanStats, append_trace
+from retention_policy import DEFAULT_THRESHOLD, assign_tier, campaign_table, threshold_sweep, tier_summary
+
+# Per-stage timing spans for this rerun (profiling.py); CHURN_PROFILE=1 adds cProfile.
+trace = RerunTrace()
+io_reads_at_start = io_stats["reads"]
+trace.stage("page_config")
 
 # ===============================
 # 🌆 PAGE CONFIGURATION
@@ -18,10 +31,14 @@ st.set_page_config(
 # ===============================
 # 🖼️ BACKGROUND IMAGE
 # ===============================
+@st.cache_resource(show_spinner=False)
+def load_background(image_file):
+    return load_asset_base64(image_file)
+
+
 def add_bg_from_local(image_file):
-    if os.path.exists(image_file):
-        with open(image_file, "rb") as f:
-            encoded_string = base64.b64encode(f.read()).decode()
+    encoded_string = load_background(image_file)
+    if encoded_string:
         st.markdown(
             f"""
             <style>
@@ -37,22 +54,100 @@ def add_bg_from_local(image_file):
         )
 
 # Add your background image
-add_bg_from_local(r"C:\Users\VIVEK\Documents\MJ\Customer-churn\photo.png")
+trace.stage("background")
+add_bg_from_local(os.path.join(BASE_DIR, "photo.png"))
 
 # ===============================
 # 🧠 LOAD MODEL & ASSETS
 # ===============================
-try:
-    model = joblib.load("churn_model.pkl")
-    model_columns = joblib.load("model_columns.pkl")
-    scaler = joblib.load("scaler.pkl")
-except:
-    st.warning("⚠️ Model file not found. Please ensure 'churn_model.pkl', 'model_columns.pkl', and 'scaler.pkl' are in the same directory.")
-    st.stop()
+trace.stage("model_load")
+
+
+@st.cache_resource(show_spinner=False)
+def get_registry():
+    return ArtifactRegistry()
+
+
+registry = get_registry()
+
+
+def load_full_pipeline():
+    try:
+        return registry.get()
+    except Exception:
+        st.warning("⚠️ Model file not found. Please ensure 'churn_pipeline.pkl' (or 'churn_model.pkl', 'model_columns.pkl' and 'scaler.pkl') is in the same directory.")
+        st.stop()
+
+
+def artifact_signature():
+    signature = []
+    for path in [default_model_path(registry.artifact_dir), *(registry.path(name) for name in sorted(registry.files))]:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+# Lightweight path (inference.py): an exported churn_compiled.npz carries the
+# model and its encoding, so single predictions need neither the pickled
+# pipeline nor pandas/sklearn. Used when it matches the pipeline files (or
+# is shipped without them); the full pipeline then loads only for batch scoring.
+@st.cache_resource(show_spinner=False, max_entries=1)
+def get_inference_model(signature):
+    try:
+        model = load_inference_model(registry.artifact_dir)
+    except (OSError, ValueError):
+        return None
+    try:
+        current = registry.file_version()
+    except OSError:
+        return model
+    return model if model.version == current else None
+
+
+# Compiled NumPy runtime by default; CHURN_RUNTIME=sklearn serves the model as is.
+@st.cache_resource(show_spinner=False)
+def get_runtime(version, _pipeline):
+    return load_runtime(_pipeline, registry.version_dir(version), version)
+
+
+inference_model = get_inference_model(artifact_signature()) if default_runtime() == "compiled" else None
+if inference_model is not None:
+    model_version = inference_model.version
+    encode_row = inference_model.encoder.encode_row
+    runtime = CompiledRuntime(inference_model.compiled, f"{COMPILED_FILE}, NumPy only")
+else:
+    artifacts = load_full_pipeline()
+    model_version = artifacts.version
+    encode_row = artifacts.pipeline.encode_row
+    runtime = get_runtime(artifacts.version, artifacts.pipeline)
+
+
+# Per-customer drivers (explanations.py) from the background saved at
+# export; None when the model has no compiled form or no saved background.
+@st.cache_resource(show_spinner=False)
+def get_explainer(version):
+    if inference_model is not None:
+        return load_explainer(registry.version_dir(version), inference_model.compiled, version)
+    if runtime.name == "compiled":
+        return load_explainer(registry.version_dir(version), runtime.compiled, version, artifacts.scaler.mean_)
+    return pipeline_explainer(artifacts.pipeline, registry.version_dir(version), version)
+
+
+explainer = get_explainer(model_version)
+
+
+# Training histograms saved with the model; uploaded files are compared with them.
+@st.cache_resource(show_spinner=False)
+def get_drift_reference(version):
+    return load_reference(registry.version_dir(version), version)
 
 # ===============================
 # 💡 CUSTOM CSS STYLING
 # ===============================
+trace.stage("css_and_header")
 st.markdown("""
     <style>
     h1, h2, h3, h4, h5 {
@@ -88,6 +183,7 @@ st.markdown("---")
 # ===============================
 # 🧾 INPUT FORM
 # ===============================
+trace.stage("form")
 st.markdown("<h3 style='color:white;'>Enter Customer Details:</h3>", unsafe_allow_html=True)
 
 col1, col2, col3 = st.columns(3)
@@ -99,16 +195,16 @@ with col1:
     Dependents = st.selectbox("Dependents", ["Yes", "No"])
     tenure = st.number_input("Tenure (Months)", min_value=0.0, max_value=72.0, value=12.0)
     PhoneService = st.selectbox("PhoneService", ["Yes", "No"])
-    MultipleLines = st.selectbox("MultipleLines", ["Yes", "No"])
+    MultipleLines = st.selectbox("MultipleLines", ["Yes", "No", "No phone service"])
     InternetService = st.selectbox("InternetService", ["DSL", "Fiber optic", "No"])
 
 with col2:
-    OnlineSecurity = st.selectbox("OnlineSecurity", ["Yes", "No"])
-    OnlineBackup = st.selectbox("OnlineBackup", ["Yes", "No"])
-    DeviceProtection = st.selectbox("DeviceProtection", ["Yes", "No"])
-    TechSupport = st.selectbox("TechSupport", ["Yes", "No"])
-    StreamingTV = st.selectbox("StreamingTV", ["Yes", "No"])
-    StreamingMovies = st.selectbox("StreamingMovies", ["Yes", "No"])
+    OnlineSecurity = st.selectbox("OnlineSecurity", ["Yes", "No", "No internet service"])
+    OnlineBackup = st.selectbox("OnlineBackup", ["Yes", "No", "No internet service"])
+    DeviceProtection = st.selectbox("DeviceProtection", ["Yes", "No", "No internet service"])
+    TechSupport = st.selectbox("TechSupport", ["Yes", "No", "No internet service"])
+    StreamingTV = st.selectbox("StreamingTV", ["Yes", "No", "No internet service"])
+    StreamingMovies = st.selectbox("StreamingMovies", ["Yes", "No", "No internet service"])
     Contract = st.selectbox("Contract", ["Month-to-month", "One year", "Two year"])
     PaperlessBilling = st.selectbox("PaperlessBilling", ["Yes", "No"])
 
@@ -116,130 +212,108 @@ with col3:
     PaymentMethod = st.selectbox("PaymentMethod", ["Electronic check", "Mailed check", "Bank transfer (automatic)", "Credit card (automatic)"])
     MonthlyCharges = st.number_input("MonthlyCharges", min_value=0.0, max_value=200.0, value=75.0)
     TotalCharges = st.number_input("TotalCharges", min_value=0.0, max_value=10000.0, value=1800.0)
-    AvgMonthlyCharges = st.number_input("AvgMonthlyCharges", min_value=0.0, max_value=500.0, value=75.0)
-    TenureGroup = st.selectbox("TenureGroup", ["Low", "Medium", "High"])
-    ChargesGroup = st.selectbox("ChargesGroup", ["Low", "Medium", "High"])
+    st.caption("AvgMonthlyCharges, TenureGroup and ChargesGroup are derived from tenure and charges.")
 
 # ===============================
-# 🔢 ENCODING FUNCTION
+# 🧮 PREPARE INPUT
 # ===============================
-def encode_value(val):
-    mapping = {
-        "Yes": 1, "No": 0,
-        "Male": 1, "Female": 0,
-        "Month-to-month": 0, "One year": 1, "Two year": 2,
-        "Electronic check": 0, "Mailed check": 1,
-        "Bank transfer (automatic)": 2, "Credit card (automatic)": 3,
-        "DSL": 0, "Fiber optic": 1, "No": 2,
-        "Low": 0, "Medium": 1, "High": 2
-    }
-    return mapping.get(val, val)
+trace.stage("encode")
+customer = {
+    "gender": gender,
+    "SeniorCitizen": SeniorCitizen,
+    "Partner": Partner,
+    "Dependents": Dependents,
+    "tenure": tenure,
+    "PhoneService": PhoneService,
+    "MultipleLines": MultipleLines,
+    "InternetService": InternetService,
+    "OnlineSecurity": OnlineSecurity,
+    "OnlineBackup": OnlineBackup,
+    "DeviceProtection": DeviceProtection,
+    "TechSupport": TechSupport,
+    "StreamingTV": StreamingTV,
+    "StreamingMovies": StreamingMovies,
+    "Contract": Contract,
+    "PaperlessBilling": PaperlessBilling,
+    "PaymentMethod": PaymentMethod,
+    "MonthlyCharges": MonthlyCharges,
+    "TotalCharges": TotalCharges,
+}
+
+# Same fitted encoding the model was trained with (see churn_pipeline.py).
+encoded_inputs = encode_row(customer).reshape(1, -1)
+
 
 # ===============================
-# 🧮 PREPARE INPUT (FIXED)
+# 🧮 PREDICTION CACHE
 # ===============================
-encoded_inputs = [
-    encode_value(gender),
-    SeniorCitizen,
-    encode_value(Partner),
-    encode_value(Dependents),
-    tenure,
-    encode_value(PhoneService),
-    encode_value(MultipleLines),
-    encode_value(InternetService),
-    encode_value(OnlineSecurity),
-    encode_value(OnlineBackup),
-    encode_value(DeviceProtection),
-    encode_value(TechSupport),
-    encode_value(StreamingTV),
-    encode_value(StreamingMovies),
-    encode_value(Contract),
-    encode_value(PaperlessBilling),
-    encode_value(PaymentMethod),
-    MonthlyCharges,
-    TotalCharges,
-    AvgMonthlyCharges,
-    encode_value(TenureGroup),
-    encode_value(ChargesGroup)
-]
-
-input_data = pd.DataFrame([encoded_inputs], columns=model_columns)
-input_scaled = scaler.transform(input_data)
+# Probability and figures per (encoded row, model version), shared by all
+# sessions; a reloaded model empties it.
+@st.cache_resource(show_spinner=False)
+def get_prediction_cache():
+    return PredictionCache()
+
+
+prediction_cache = get_prediction_cache()
+
 
 # ===============================
-# 🚀 PREDICT BUTTON
+# 🗄️ PREDICTION LOG
 # ===============================
-if st.button("🚀 Predict Churn"):
-    churn_prob = model.predict_proba(input_scaled)[0][1] * 100
-    stay_prob = 100 - churn_prob
+# With CHURN_PREDICTIONS_DSN and CHURN_USER_ID set, every prediction is
+# queued for public.predictions and written in batches off the UI thread.
+PREDICTIONS_USER_ID = os.environ.get("CHURN_USER_ID")
 
-    st.markdown("<br>", unsafe_allow_html=True)
 
-    if churn_prob > 50:
-        st.error(f"⚠️ This customer is **likely to churn**.\n\n**Churn Probability:** {churn_prob:.2f}%")
-    else:
-        st.success(f"✅ This customer is **likely to stay**.\n\n**Retention Probability:** {stay_prob:.2f}%")
+@st.cache_resource(show_spinner=False)
+def get_prediction_sink():
+    return open_sink() if PREDICTIONS_USER_ID else None
 
-    # ===============================
-    # 💡 RETENTION POLICY
-    # ===============================
-    st.markdown("### 💡 Retention Strategy Suggestion")
-    if churn_prob > 80:
-        st.info("Offer a **loyalty discount**, upgrade plan benefits, or assign a **personal relationship manager**.")
-    elif churn_prob > 60:
-        st.info("Send **targeted offers** or **personalized recommendations** to improve engagement.")
-    elif churn_prob > 40:
-        st.info("Encourage through **customer satisfaction surveys** or **reward points**.")
-    else:
-        st.info("Customer is satisfied. Maintain service quality and provide **regular engagement**.")
 
-    # ===============================
-    # 📊 INTERACTIVE PLOTLY VISUALS
-    # ===============================
-    st.markdown("### 📈 Prediction Visuals")
+prediction_sink = get_prediction_sink()
 
-    colA, colB = st.columns(2)
+
+def build_prediction_figures(churn_prob):
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    stay_prob = 100 - churn_prob
 
     # --- Bar Chart (Hover Enabled) ---
-    with colA:
-        bar_fig = px.bar(
-            x=["Retention", "Churn"],
-            y=[stay_prob, churn_prob],
-            color=["Retention", "Churn"],
-            color_discrete_map={"Retention": "#00ff99", "Churn": "#ff4d4d"},
-            text=[f"{stay_prob:.2f}%", f"{churn_prob:.2f}%"],
-            title="Customer Churn vs Retention"
-        )
-        bar_fig.update_traces(textposition="outside", hovertemplate="%{x}: %{y:.2f}%")
-        bar_fig.update_layout(
-            template="plotly_dark",
-            plot_bgcolor="rgba(0,0,0,0)",
-            paper_bgcolor="rgba(0,0,0,0)",
-            font=dict(color="white")
-        )
-        st.plotly_chart(bar_fig, use_container_width=True)
+    bar_fig = px.bar(
+        x=["Retention", "Churn"],
+        y=[stay_prob, churn_prob],
+        color=["Retention", "Churn"],
+        color_discrete_map={"Retention": "#00ff99", "Churn": "#ff4d4d"},
+        text=[f"{stay_prob:.2f}%", f"{churn_prob:.2f}%"],
+        title="Customer Churn vs Retention"
+    )
+    bar_fig.update_traces(textposition="outside", hovertemplate="%{x}: %{y:.2f}%")
+    bar_fig.update_layout(
+        template="plotly_dark",
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="white")
+    )
 
     # --- Pie Chart (Hover Enabled) ---
-    with colB:
-        pie_fig = px.pie(
-            names=["Retention", "Churn"],
-            values=[stay_prob, churn_prob],
-            color=["Retention", "Churn"],
-            color_discrete_map={"Retention": "#00ff99", "Churn": "#ff4d4d"},
-            title="Proportion of Churn vs Retention",
-            hole=0.4
-        )
-        pie_fig.update_traces(textinfo="label+percent", hovertemplate="%{label}: %{value:.2f}%")
-        pie_fig.update_layout(
-            template="plotly_dark",
-            plot_bgcolor="rgba(0,0,0,0)",
-            paper_bgcolor="rgba(0,0,0,0)",
-            font=dict(color="white")
-        )
-        st.plotly_chart(pie_fig, use_container_width=True)
+    pie_fig = px.pie(
+        names=["Retention", "Churn"],
+        values=[stay_prob, churn_prob],
+        color=["Retention", "Churn"],
+        color_discrete_map={"Retention": "#00ff99", "Churn": "#ff4d4d"},
+        title="Proportion of Churn vs Retention",
+        hole=0.4
+    )
+    pie_fig.update_traces(textinfo="label+percent", hovertemplate="%{label}: %{value:.2f}%")
+    pie_fig.update_layout(
+        template="plotly_dark",
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="white")
+    )
 
     # --- Gauge Chart ---
-    st.markdown("### 🚦 Churn Likelihood Gauge")
     gauge_fig = go.Figure(go.Indicator(
         mode="gauge+number",
         value=churn_prob,
@@ -261,4 +335,170 @@ if st.button("🚀 Predict Churn"):
         paper_bgcolor="rgba(0,0,0,0)",
         font=dict(color="white")
     )
-    st.plotly_chart(gauge_fig, use_container_width=True)
+    return bar_fig, pie_fig, gauge_fig
+
+
+def predict_customer():
+    churn_prob = float(runtime.predict_proba(encoded_inputs)[0]) * 100
+    return churn_prob, build_prediction_figures(churn_prob)
+
+
+# ===============================
+# 🚀 PREDICT BUTTON
+# ===============================
+trace.stage("predict")
+if st.button("🚀 Predict Churn"):
+    with trace.span("predict_and_figures"):
+        churn_prob, (bar_fig, pie_fig, gauge_fig) = prediction_cache.get_or_compute(
+            model_version, encoded_inputs, predict_customer)
+    stay_prob = 100 - churn_prob
+    if prediction_sink is not None:
+        prediction_sink.submit(PREDICTIONS_USER_ID, {**customer, "churn_probability": churn_prob / 100,
+                                                     "model_version": model_version},
+                                  churn_prob > DEFAULT_THRESHOLD * 100)
+
+    st.markdown("<br>", unsafe_allow_html=True)
+
+    if churn_prob > DEFAULT_THRESHOLD * 100:
+        st.error(f"⚠️ This customer is **likely to churn**.\n\n**Churn Probability:** {churn_prob:.2f}%")
+    else:
+        st.success(f"✅ This customer is **likely to stay**.\n\n**Retention Probability:** {stay_prob:.2f}%")
+
+    # ===============================
+    # 💡 RETENTION POLICY
+    # ===============================
+    # Same tiers as batch scoring (retention_policy.RETENTION_TIERS).
+    st.markdown("### 💡 Retention Strategy Suggestion")
+    st.info(assign_tier(churn_prob / 100).suggestion)
+
+    # ===============================
+    # 🔍 WHY THIS PREDICTION
+    # ===============================
+    if explainer is not None:
+        with trace.span("explain"):
+            drivers = explainer.explain_row(encoded_inputs[0])
+        st.markdown("### 🔍 Top Churn Drivers")
+        st.markdown("\n".join(
+            f"- **{d['feature']}** = {d['value']} — {'raises' if d['contribution'] > 0 else 'lowers'} churn risk "
+            f"({d['contribution']:+.3f} {explainer.units})" for d in drivers))
+
+    # ===============================
+    # 📊 INTERACTIVE PLOTLY VISUALS
+    # ===============================
+    with trace.span("charts"):
+        st.markdown("### 📈 Prediction Visuals")
+
+        colA, colB = st.columns(2)
+        with colA:
+            st.plotly_chart(bar_fig, use_container_width=True)
+        with colB:
+            st.plotly_chart(pie_fig, use_container_width=True)
+
+        st.markdown("### 🚦 Churn Likelihood Gauge")
+        st.plotly_chart(gauge_fig, use_container_width=True)
+
+# ===============================
+# 📂 BATCH SCORING
+# ===============================
+trace.stage("batch_scoring")
+st.markdown("---")
+st.markdown("### 📂 Batch Scoring")
+uploaded = st.file_uploader("Upload a customer CSV (same columns as the Telco export)", type="csv")
+if uploaded is not None and st.button("📊 Score File"):
+    from batch_scoring import score_csv
+
+    artifacts = load_full_pipeline()
+    drift_reference = get_drift_reference(artifacts.version)
+    drift = drift_reference.empty() if drift_reference is not None else None
+    with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as out:
+        results_path = out.name
+    with st.spinner("Scoring customers..."):
+        summary = score_csv(uploaded, results_path, artifacts, sink=prediction_sink, user_id=PREDICTIONS_USER_ID,
+                            explainer=explainer if artifacts.version == model_version else None, drift=drift)
+    st.success(f"✅ Scored **{summary['rows']}** customers — **{summary['churners']}** likely to churn "
+               f"({summary['rows_per_second']:.0f} rows/s).")
+
+    # Campaign sizing over the whole file: one sort + cumulative sums, with
+    # the scores standing in for outcomes (expected churners reached).
+    import pandas as pd
+
+    scored_frame = pd.read_csv(results_path, usecols=lambda col: col in ("churn_probability", "driver_1"))
+    scored = scored_frame["churn_probability"].to_numpy()
+    sweep = threshold_sweep(scored)
+    colT, colC = st.columns(2)
+    with colT:
+        st.markdown("**Retention tiers**")
+        st.dataframe(tier_summary(scored), hide_index=True)
+    with colC:
+        st.markdown("**Campaign size by threshold** (expected outcomes)")
+        st.dataframe([{"flag if p >": row["threshold"], "customers": row["flagged"],
+                       "expected churners reached": round(row["tp"]), "precision": round(row["precision"], 3),
+                       "recall": round(row["recall"], 3), "cost": round(row["cost"])} for row in campaign_table(sweep)],
+                     hide_index=True)
+    if "driver_1" in scored_frame:
+        flagged = scored_frame[scored > DEFAULT_THRESHOLD]
+        st.markdown("**Top churn driver among customers likely to churn**")
+        st.dataframe(flagged["driver_1"].value_counts().rename_axis("driver").reset_index(name="customers"),
+                     hide_index=True)
+    if drift is not None:
+        st.markdown("**Drift vs. training population** (PSI ≥ 0.25 drift, 0.1–0.25 watch)")
+        st.dataframe([{"column": row["column"], "PSI": round(row["psi"], 4), "status": row["status"],
+                       "KS": None if row["ks"] is None else round(row["ks"], 4)}
+                      for row in drift_compare(drift_reference, drift)[:8]], hide_index=True)
+    with open(results_path, "rb") as f:
+        st.download_button("⬇️ Download Predictions", f.read(), file_name="churn_predictions.csv", mime="text/csv")
+    os.remove(results_path)
+
+# ===============================
+# ⏱️ RERUN TIMINGS
+# ===============================
+trace.stage("sidebar")
+with st.sidebar.expander("⏱️ Load timings"):
+    st.write(f"Model version: `{model_version}`")
+    st.write(f"Runtime: {runtime.name}" + (f" ({runtime.source})" if runtime.name == "compiled" else ""))
+    st.write(f"Artifact loads this process: {registry.stats['loads']} "
+             f"(last took {registry.stats['last_load_seconds'] * 1000:.1f} ms)")
+    st.write(f"Disk reads this rerun: {io_stats['reads'] - io_reads_at_start}")
+    st.write(f"Prediction cache: {prediction_cache.stats['hits']} hits / {prediction_cache.stats['misses']} misses "
+             f"({prediction_cache.hit_rate():.0%}), {len(prediction_cache)} of {prediction_cache.max_entries} entries")
+    if prediction_sink is not None:
+        st.write(f"Predictions persisted: {prediction_sink.stats['rows_written']} "
+                 f"of {prediction_sink.stats['rows_submitted']}")
+    st.write(f"Rerun time: {trace.elapsed() * 1000:.1f} ms")
+    if st.button("🔄 Reload model"):
+        get_inference_model.clear()
+        get_explainer.clear()
+        get_drift_reference.clear()
+        if registry.stats["loads"]:  # the pickled pipeline is in use
+            registry.reload()
+        st.rerun()
+
+# ===============================
+# 🩺 DIAGNOSTICS (hidden)
+# ===============================
+# Shown with ?diagnostics=1 or CHURN_DIAGNOSTICS=1; spans of every rerun are
+# aggregated per process and, with CHURN_TRACE_FILE, appended to a JSONL file.
+@st.cache_resource(show_spinner=False)
+def get_span_stats():
+    return SpanStats()
+
+
+span_stats = get_span_stats()
+trace.finish()
+span_stats.record(trace)
+append_trace(trace)
+
+if DIAGNOSTICS_ENABLED or st.query_params.get("diagnostics") == "1":
+    with st.sidebar.expander("🩺 Diagnostics", expanded=True):
+        st.write(f"This rerun: {trace.elapsed() * 1000:.1f} ms")
+        st.dataframe([{"span": "  " * span["depth"] + span["name"], "ms": round(span["seconds"] * 1000, 2)}
+                      for span in trace.spans], hide_index=True)
+        st.write(f"Across {span_stats.reruns} reruns:")
+        st.dataframe(span_stats.summary(), hide_index=True)
+        st.download_button("⬇️ Trace (Chrome trace JSON)", trace.chrome_trace(),
+                           file_name="churn_app_trace.json", mime="application/json")
+        if trace.profiler is not None:
+            st.code(trace.profile_text(), language="text")
+            st.download_button("⬇️ cProfile stats (.prof)", trace.profile_bytes(), file_name="churn_app.prof")
+        else:
+            st.caption("Set CHURN_PROFILE=1 to profile each rerun with cProfile.")
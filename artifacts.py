@@ -0,0 +1,227 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import namedtuple
+
+# ===============================
+# 📦 MODEL ARTIFACT REGISTRY
+# ===============================
+# A model directory is either flat (the artifact files themselves) or
+# versioned: one immutable directory per export under versions/, and a
+# CURRENT file naming the one to serve. Promotion (model_store.py) swaps
+# CURRENT with os.replace, so readers see the old or the new version, never
+# a mix; running registries pick the switch up on their next check.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+
+PIPELINE_FILES = {"pipeline": "churn_pipeline.pkl"}
+
+# Pre-pipeline artifacts, still served through ChurnPipeline.from_legacy.
+ARTIFACT_FILES = {
+    "model": "churn_model.pkl",
+    "model_columns": "model_columns.pkl",
+    "scaler": "scaler.pkl",
+}
+
+Artifacts = namedtuple("Artifacts", ["pipeline", "model", "model_columns", "scaler", "version"])
+
+# Process-wide disk counters, so callers can check that a rerun served
+# everything from memory.
+io_stats = {"reads": 0, "bytes": 0, "seconds": 0.0}
+_io_lock = threading.Lock()
+
+
+def default_artifact_dir():
+    """CHURN_MODEL_DIR, else models/ once training has promoted a version there, else the app directory."""
+    if "CHURN_MODEL_DIR" in os.environ:
+        return os.environ["CHURN_MODEL_DIR"]
+    return MODELS_DIR if os.path.exists(os.path.join(MODELS_DIR, CURRENT_FILE)) else BASE_DIR
+
+
+def current_version(model_dir):
+    """The version CURRENT points at, or None for a flat directory."""
+    try:
+        with open(os.path.join(model_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_artifact_dir(model_dir):
+    """Directory holding the artifact files to serve from ``model_dir``."""
+    version = current_version(model_dir)
+    return os.path.join(model_dir, VERSIONS_DIR, version) if version else model_dir
+
+
+def _read_bytes(path):
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        data = f.read()
+    with _io_lock:
+        io_stats["reads"] += 1
+        io_stats["bytes"] += len(data)
+        io_stats["seconds"] += time.perf_counter() - start
+    return data
+
+
+def load_asset_base64(path):
+    """Read a static asset and return it base64-encoded, or None if missing."""
+    if not os.path.exists(path):
+        return None
+    return base64.b64encode(_read_bytes(path)).decode()
+
+
+class ArtifactRegistry:
+    """Loads the churn pipeline once and shares it across sessions.
+
+    ``churn_pipeline.pkl`` is preferred; without it the legacy model,
+    columns and scaler files are loaded and wrapped. The files are
+    re-checked at most every ``check_interval`` seconds; when any
+    path/mtime/size changes the set is reloaded and the version changes
+    with it: the content hash ChurnPipeline.save recorded, or for older and
+    legacy files a hash of their bytes.
+
+    ``artifact_dir`` may be a versioned model directory; the files are then
+    read from the version CURRENT names. After the first load, a new set is
+    loaded on a background thread while callers keep getting the artifacts
+    already in memory, so a promotion never stalls requests.
+    """
+
+    def __init__(self, artifact_dir=None, files=None, check_interval=5.0):
+        self.model_dir = artifact_dir or default_artifact_dir()
+        self._fixed_files = dict(files) if files else None
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._artifacts = None
+        self._signature = None
+        self._last_check = 0.0
+        self._loading = False
+        self.stats = {"loads": 0, "checks": 0, "last_load_seconds": 0.0, "last_error": None}
+
+    @property
+    def artifact_dir(self):
+        return resolve_artifact_dir(self.model_dir)
+
+    def _files_in(self, artifact_dir):
+        if self._fixed_files is not None:
+            return self._fixed_files
+        if os.path.exists(os.path.join(artifact_dir, PIPELINE_FILES["pipeline"])):
+            return PIPELINE_FILES
+        return ARTIFACT_FILES
+
+    @property
+    def files(self):
+        return self._files_in(self.artifact_dir)
+
+    def version_dir(self, version):
+        """Directory of ``version`` (which stays put after a newer promotion), else the current one."""
+        path = os.path.join(self.model_dir, VERSIONS_DIR, version) if version else None
+        return path if path and os.path.isdir(path) else self.artifact_dir
+
+    def path(self, name):
+        return os.path.join(self.artifact_dir, self.files[name])
+
+    def _stat_signature(self):
+        # resolved once, so a promotion mid-check can't mix two versions' files
+        artifact_dir = self.artifact_dir
+        files = self._files_in(artifact_dir)
+        sig = []
+        for name in sorted(files):
+            path = os.path.join(artifact_dir, files[name])
+            st = os.stat(path)
+            sig.append((name, path, st.st_mtime_ns, st.st_size))
+        return tuple(sig)
+
+    def file_version(self):
+        """The version ``get()`` would report, without unpickling.
+
+        A versioned directory names its versions after the pipeline's
+        version; only flat directories are hashed.
+        """
+        version = current_version(self.model_dir) if self._fixed_files is None else None
+        if version and os.path.isdir(os.path.join(self.model_dir, VERSIONS_DIR, version)):
+            return version
+        digest = hashlib.sha256()
+        for name in sorted(self.files):
+            digest.update(_read_bytes(self.path(name)))
+        return digest.hexdigest()[:12]
+
+    def _load(self, signature):
+        # Deferred so that importing this module (e.g. for the lightweight
+        # inference path in app.py) pulls in neither joblib nor pandas.
+        import joblib
+
+        from churn_pipeline import ChurnPipeline
+
+        start = time.perf_counter()
+        digest = hashlib.sha256()
+        loaded = {}
+        for name, path, _, _ in signature:
+            data = _read_bytes(path)
+            digest.update(data)
+            loaded[name] = joblib.load(io.BytesIO(data))
+        pipeline = loaded.get("pipeline")
+        if pipeline is None:
+            pipeline = ChurnPipeline.from_legacy(loaded["model"], loaded["scaler"], loaded["model_columns"])
+        self._artifacts = Artifacts(
+            pipeline=pipeline,
+            model=pipeline.model,
+            model_columns=list(pipeline.feature_columns),
+            scaler=pipeline.scaler,
+            version=getattr(pipeline, "version", None) or digest.hexdigest()[:12],
+        )
+        self._signature = signature
+        self.stats["loads"] += 1
+        self.stats["last_load_seconds"] = time.perf_counter() - start
+
+    def get(self):
+        """Return the current artifacts; changed files are picked up without blocking the caller."""
+        now = time.monotonic()
+        artifacts = self._artifacts
+        if artifacts is not None and now - self._last_check < self.check_interval:
+            return artifacts
+        if artifacts is None:
+            with self._lock:
+                if self._artifacts is None:
+                    self._load(self._stat_signature())
+                    self._last_check = time.monotonic()
+            return self._artifacts
+        # One caller checks the signature (a few stat calls); a changed set
+        # loads on a background thread and replaces the old one in a single
+        # assignment. Until then every caller keeps serving what is loaded.
+        if self._lock.acquire(blocking=False):
+            try:
+                if now - self._last_check >= self.check_interval:
+                    self._last_check = now
+                    self.stats["checks"] += 1
+                    signature = self._stat_signature()
+                    if signature != self._signature and not self._loading:
+                        self._loading = True
+                        threading.Thread(target=self._load_in_background, args=(signature,),
+                                         name="artifact-reload", daemon=True).start()
+            except OSError:
+                pass  # files mid-replacement; keep the loaded set and look again next interval
+            finally:
+                self._lock.release()
+        return artifacts
+
+    def _load_in_background(self, signature):
+        try:
+            self._load(signature)
+        except Exception as e:
+            self.stats["last_error"] = repr(e)  # the old set stays; the next check retries
+        finally:
+            self._loading = False
+
+    def reload(self):
+        """Force a reload from disk regardless of the file signatures."""
+        with self._lock:
+            self._load(self._stat_signature())
+            self._last_check = time.monotonic()
+        return self._artifacts
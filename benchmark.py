@@ -0,0 +1,507 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.base import clone
+
+from artifacts import ArtifactRegistry, PIPELINE_FILES
+from churn_pipeline import COMPACT_BLOCK_ROWS, ID_COLUMN, TARGET_COLUMN, ChurnPipeline, ChurnPreprocessor
+from compiled_model import COMPILED_FILE, compile_pipeline, save_compiled
+from data_ingest import DEFAULT_DATA_PATH, load_telco, read_csv_typed
+from feature_engineering import CHARGES_BINS, TENURE_BINS
+
+# ===============================
+# ⏱️ BENCHMARK SUITE
+# ===============================
+# Times the hot paths on synthetic Telco exports of a chosen size:
+#
+#   ingest      CSV parse, Feather snapshot write, snapshot read
+#   preprocess  ChurnPreprocessor.fit and encode_frame
+#   features    engineered columns three ways: the pandas path (pd.cut +
+#               fillna), searching the bin edges, and the lookup tables
+#               of feature_engineering.py (batch and single row)
+#   fit         every model from build_models(), one at a time
+#   predict     predict_row latency (p50/p99), the same for the compiled
+#               runtime, and predict_frame throughput
+#   load        pipeline artifact load through ArtifactRegistry
+#   memory      scoring a file the old way (untyped read, float64 matrix
+#               plus a scaled copy) vs. typed read + CompactFeatures;
+#               measured frame/feature bytes and the tracemalloc peak
+#   cold_start  fresh interpreter: import inference.py, load the compiled
+#               model, score one customer; fails over --cold-start-budget
+#               or if pandas/sklearn/xgboost/plotly get imported
+#
+# Everything runs offline on the CPU. Results are written as JSON;
+# --compare flags benchmarks that got slower than a saved baseline.
+#
+#   python benchmark.py --sizes 10k,100k,1m --output baseline.json
+#   python benchmark.py --sizes 10k,100k,1m --compare baseline.json
+#   python benchmark.py --cold-start-only --model-dir models
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_WORK_DIR = os.path.join(BASE_DIR, ".cache", "benchmarks")
+
+MIN_ROWS = 10_000
+MAX_ROWS = 10_000_000
+SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+COLD_START_BUDGET = 1.0
+HEAVY_MODULES = ("pandas", "sklearn", "xgboost", "joblib", "plotly", "matplotlib")
+COLD_START_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import inference
+imported = time.perf_counter()
+model = inference.load_inference_model(sys.argv[1])
+loaded = time.perf_counter()
+model.predict_row(json.loads(sys.argv[2]))
+done = time.perf_counter()
+heavy = sorted({name.split(".")[0] for name in sys.modules} & set(sys.argv[3].split(",")))
+print(json.dumps({"import_seconds": imported - start, "load_seconds": loaded - imported,
+                  "predict_seconds": done - loaded, "heavy_modules": heavy}))
+"""
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1m' -> 1000000."""
+    text = text.strip().lower()
+    multiplier = SUFFIXES.get(text[-1:], 1)
+    rows = int(float(text.rstrip("km")) * multiplier)
+    if not MIN_ROWS <= rows <= MAX_ROWS:
+        raise argparse.ArgumentTypeError(f"size must be between 10k and 10m rows, got {text}")
+    return rows
+
+
+# ---- synthetic data ----
+def synthetic_telco(n_rows, seed=42, source=None):
+    """A Telco-shaped frame of ``n_rows`` customers.
+
+    Rows are resampled from the bundled export so the category mix and the
+    churn correlations stay realistic; tenure and charges are jittered so
+    the numeric columns are not just repeats, and TotalCharges is blank for
+    brand-new customers exactly as in the real file.
+    """
+    rng = np.random.default_rng(seed)
+    base = read_csv_typed(source or DEFAULT_DATA_PATH)
+    df = base.iloc[rng.integers(0, len(base), n_rows)].reset_index(drop=True)
+
+    tenure = np.clip(df["tenure"].to_numpy(np.int16) + rng.integers(-2, 3, n_rows), 0, 72)
+    monthly = np.clip(df["MonthlyCharges"].to_numpy(np.float64) + rng.normal(0, 2.0, n_rows), 18.25, 118.75)
+    total = monthly * tenure * rng.uniform(0.9, 1.1, n_rows)
+    total[tenure == 0] = np.nan
+
+    df[ID_COLUMN] = [f"SYN-{i:08d}" for i in range(n_rows)]
+    df["tenure"] = tenure.astype(np.int8)
+    df["MonthlyCharges"] = monthly.round(2)
+    df["TotalCharges"] = total.round(2)
+    return df
+
+
+def synthetic_csv(n_rows, work_dir, seed=42):
+    """Write (or reuse) a synthetic export of ``n_rows`` rows and return its path."""
+    data_dir = os.path.join(work_dir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"telco-synthetic-{n_rows}-{seed}.csv")
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        synthetic_telco(n_rows, seed).to_csv(tmp_path, index=False, na_rep=" ")
+        os.replace(tmp_path, path)
+    return path
+
+
+# ---- timing ----
+def timed(func, repeats=3):
+    """Run ``func`` ``repeats`` times; return (last result, list of seconds)."""
+    times = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, times
+
+
+def record(results, benchmark, size, rows, times, **extra):
+    """Append one result; ``size`` is the dataset size, ``rows`` the rows each timed call handled."""
+    row = {
+        "benchmark": benchmark,
+        "size": size,
+        "rows": rows,
+        "seconds": float(np.median(times)),
+        "min_seconds": float(np.min(times)),
+        "repeats": len(times),
+        "rows_per_second": rows / float(np.median(times)) if np.median(times) > 0 else None,
+    }
+    row.update(extra)
+    results.append(row)
+    print(f"  {benchmark:<44}{rows:>11,} rows {row['seconds'] * 1000:>11.3f} ms")
+    return row
+
+
+# ---- benchmarks ----
+def bench_ingest(results, path, rows, repeats):
+    _, times = timed(lambda: read_csv_typed(path), repeats)
+    record(results, "ingest.csv_parse", rows, rows, times)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        _, times = timed(lambda: load_telco(path, cache_dir=cache_dir), 1)
+        record(results, "ingest.snapshot_write", rows, rows, times)
+        df, times = timed(lambda: load_telco(path, cache_dir=cache_dir), repeats)
+        record(results, "ingest.snapshot_read", rows, rows, times)
+    return df
+
+
+def bench_preprocess(results, df, repeats):
+    rows = len(df)
+    preprocessor, times = timed(lambda: ChurnPreprocessor.fit(df), repeats)
+    record(results, "preprocess.fit", rows, rows, times)
+    features, times = timed(lambda: preprocessor.encode_frame(df), repeats)
+    record(results, "preprocess.encode_frame", rows, rows, times)
+    return preprocessor, features
+
+
+def pandas_engineered(df, fill_values):
+    """AvgMonthlyCharges, TenureGroup, ChargesGroup the way the training script first built them."""
+    total = pd.to_numeric(df["TotalCharges"], errors="coerce").astype("float64").fillna(fill_values["TotalCharges"])
+    tenure = df["tenure"].astype("float64")
+    avg = total / (tenure + 1)
+    tenure_group = pd.cut(tenure, bins=TENURE_BINS, labels=False).fillna(fill_values["TenureGroup"])
+    charges_group = pd.cut(df["MonthlyCharges"].astype("float64"), bins=CHARGES_BINS,
+                           labels=False).fillna(fill_values["ChargesGroup"])
+    return np.column_stack([avg, tenure_group, charges_group])
+
+
+def _searchsorted_groups(values, bins, fill):
+    codes = np.searchsorted(bins, values, side="left").astype(np.float64) - 1
+    codes[(values <= bins[0]) | (values > bins[-1]) | np.isnan(values)] = fill
+    return codes
+
+
+def bench_features(results, df, preprocessor, features, repeats):
+    """Engineered columns: pandas path vs. searching the bins vs. lookup tables."""
+    rows = len(df)
+    index = preprocessor._index
+    engineer = preprocessor._engineer
+    fills = preprocessor.fill_values
+    columns = [index[col] for col in ("AvgMonthlyCharges", "TenureGroup", "ChargesGroup")]
+    expected, times = timed(lambda: pandas_engineered(df, fills), repeats)
+    record(results, "features.pandas", rows, rows, times)
+
+    def searchsorted():
+        total = np.where(np.isnan(features[:, index["TotalCharges"]]), fills["TotalCharges"],
+                         features[:, index["TotalCharges"]])
+        tenure = features[:, index["tenure"]]
+        return np.column_stack([total / (tenure + 1), _searchsorted_groups(tenure, TENURE_BINS, fills["TenureGroup"]),
+                                _searchsorted_groups(features[:, index["MonthlyCharges"]], CHARGES_BINS,
+                                                     fills["ChargesGroup"])])
+
+    derived, times = timed(searchsorted, repeats)
+    record(results, "features.searchsorted", rows, rows, times,
+           matches_pandas=bool(np.allclose(derived, expected, rtol=1e-12, atol=0)))
+
+    work = features.copy()
+    _, times = timed(lambda: engineer.derive(work, index), repeats)
+    record(results, "features.lookup_table", rows, rows, times,
+           matches_pandas=bool(np.allclose(work[:, columns], expected, rtol=1e-12, atol=0)))
+
+    single = features[:1000].copy()
+    _, times = timed(lambda: [engineer.derive_row(single[i], index) for i in range(len(single))], repeats)
+    record(results, "features.lookup_table_row", rows, len(single), times)
+
+
+def bench_models(results, df, preprocessor, features, models, max_fit_rows, single_repeats, batch_rows, repeats,
+                 cold_start_budget=COLD_START_BUDGET):
+    from sklearn.preprocessing import StandardScaler
+
+    size = len(df)
+    n_fit = min(size, max_fit_rows)
+    X = features[:n_fit]
+    y = (df[TARGET_COLUMN].iloc[:n_fit] == "Yes").to_numpy(dtype=np.int8)
+    scaler = StandardScaler().fit(X)
+    X_scaled = scaler.transform(X)
+
+    records = df.head(single_repeats).to_dict("records")
+    batch = df.head(batch_rows)
+
+    for name, model in models.items():
+        model, times = timed(lambda: clone(model).fit(X_scaled, y), 1)
+        record(results, f"fit[{name}]", size, n_fit, times)
+        pipeline = ChurnPipeline(preprocessor, scaler, model, {"model_name": name})
+
+        pipeline.predict_row(records[0])  # warm-up
+        latencies = []
+        for customer in records:
+            start = time.perf_counter()
+            pipeline.predict_row(customer)
+            latencies.append(time.perf_counter() - start)
+        record(results, f"predict.single[{name}]", size, 1, latencies,
+               p99_seconds=float(np.percentile(latencies, 99)))
+
+        try:
+            compiled = compile_pipeline(pipeline)
+        except TypeError:
+            compiled = None
+        if compiled is not None:
+            encoded = [pipeline.encode_row(customer).reshape(1, -1) for customer in records]
+            latencies = []
+            for row in encoded:
+                start = time.perf_counter()
+                compiled.predict_proba(row)
+                latencies.append(time.perf_counter() - start)
+            record(results, f"predict.single_compiled[{name}]", size, 1, latencies,
+                   p99_seconds=float(np.percentile(latencies, 99)))
+            bench_cold_start(results, size, name, compiled, records[0], repeats, cold_start_budget)
+
+        _, times = timed(lambda: pipeline.predict_frame(batch), repeats)
+        record(results, f"predict.batch[{name}]", size, len(batch), times)
+
+        with tempfile.TemporaryDirectory() as artifact_dir:
+            pipeline.save(os.path.join(artifact_dir, PIPELINE_FILES["pipeline"]))
+            registry = ArtifactRegistry(artifact_dir)
+            _, times = timed(registry.reload, repeats)
+            artifact_bytes = os.path.getsize(registry.path("pipeline"))
+        record(results, f"load[{name}]", size, 1, times, artifact_bytes=artifact_bytes)
+
+
+def traced_peak(func):
+    """Run ``func`` under tracemalloc; return (result, peak bytes allocated while it ran)."""
+    tracemalloc.start()
+    try:
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def bench_memory(results, path, rows, preprocessor, features, repeats):
+    """Dense float64 scoring path vs. typed read + CompactFeatures on the same file."""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+
+    n_fit = min(len(features), 10_000)
+    scaler = StandardScaler().fit(features[:n_fit])
+    y = np.arange(n_fit) % 2  # the model only has to exist; its predictions are not checked
+    model = LogisticRegression(max_iter=200).fit(scaler.transform(features[:n_fit]), y)
+    pipeline = ChurnPipeline(preprocessor, scaler, model)
+
+    raw = pd.read_csv(path, skipinitialspace=True)
+    typed = read_csv_typed(path, skipinitialspace=True)
+
+    def dense():
+        return pipeline.predict_proba(pipeline.scale(preprocessor.encode_frame(raw)))
+
+    def compact():
+        return pipeline.predict_compact(preprocessor.encode_compact(typed))
+
+    n_features = len(preprocessor.feature_columns)
+    layouts = {
+        "dense": (dense, raw, 2 * rows * n_features * 8),
+        "compact": (compact, typed, preprocessor.encode_compact(typed).nbytes + min(rows, COMPACT_BLOCK_ROWS) * n_features * 8),
+    }
+    for layout, (func, frame, feature_bytes) in layouts.items():
+        _, peak = traced_peak(func)
+        _, times = timed(func, repeats)
+        frame_bytes = int(frame.memory_usage(deep=True).sum())
+        record(results, f"memory.{layout}", rows, rows, times, frame_bytes=frame_bytes,
+               feature_bytes=int(feature_bytes), peak_bytes=int(peak),
+               bytes_per_row=(frame_bytes + feature_bytes) / rows)
+        print(f"  {'':<44}frame {frame_bytes / 2**20:>8.1f} MiB, features {feature_bytes / 2**20:>8.1f} MiB, "
+              f"peak while scoring {peak / 2**20:>8.1f} MiB")
+
+
+def _slowest_imports(importtime_log, top=5):
+    """Top-level imports with the largest cumulative time from ``python -X importtime``."""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            rows.append((int(cumulative) / 1e6, name.strip()))
+    return [{"module": name, "seconds": seconds} for seconds, name in sorted(rows, reverse=True)[:top]]
+
+
+def cold_start(artifact_dir, customer, repeats=3):
+    """Time a fresh interpreter importing inference.py and scoring ``customer``.
+
+    Returns (wall seconds per run, details of the last run); wall time
+    includes interpreter start-up, as a new container would see it.
+    """
+    command = [sys.executable, "-X", "importtime", "-c", COLD_START_SCRIPT,
+               artifact_dir, json.dumps(customer, default=str), ",".join(HEAVY_MODULES)]
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        proc = subprocess.run(command, cwd=BASE_DIR, capture_output=True, text=True, check=True)
+        times.append(time.perf_counter() - start)
+    details = json.loads(proc.stdout.strip().splitlines()[-1])
+    details["slowest_imports"] = _slowest_imports(proc.stderr)
+    return times, details
+
+
+def bench_cold_start(results, size, name, compiled, customer, repeats, budget=COLD_START_BUDGET):
+    with tempfile.TemporaryDirectory() as artifact_dir:
+        save_compiled(compiled, os.path.join(artifact_dir, COMPILED_FILE))
+        times, details = cold_start(artifact_dir, customer, repeats)
+    return record(results, f"cold_start[{name}]", size, 1, times, budget_seconds=budget,
+                  within_budget=bool(np.median(times) <= budget and not details["heavy_modules"]), **details)
+
+
+def check_cold_start(artifact_dir=None, repeats=3, budget=COLD_START_BUDGET):
+    """Cold-start check for a deployed artifact directory (compiles it first if needed)."""
+    registry = ArtifactRegistry(artifact_dir)
+    artifacts = registry.get()
+    customer = load_telco().drop(columns=[ID_COLUMN, TARGET_COLUMN]).iloc[0].to_dict()
+    results = []
+    name = artifacts.pipeline.metadata.get("model_name", type(artifacts.model).__name__)
+    bench_cold_start(results, 0, name, compile_pipeline(artifacts.pipeline), customer, repeats, budget)
+    return {"environment": environment(), "results": results}
+
+
+def cold_start_failures(report):
+    failures = [row for row in report["results"] if row["benchmark"].startswith("cold_start")
+                and not row["within_budget"]]
+    for row in failures:
+        print(f"❌ {row['benchmark']}: {row['seconds'] * 1000:.0f} ms (budget {row['budget_seconds'] * 1000:.0f} ms)"
+              + (f", imported {', '.join(row['heavy_modules'])}" if row["heavy_modules"] else "")
+              + "; slowest imports: " + ", ".join(f"{i['module']} {i['seconds'] * 1000:.0f} ms"
+                                                  for i in row["slowest_imports"]))
+    return failures
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def run_benchmarks(sizes, work_dir=None, models=None, repeats=3, max_fit_rows=100_000,
+                   single_repeats=200, batch_rows=10_000, seed=42, cold_start_budget=COLD_START_BUDGET):
+    """Run every benchmark for each size; returns the JSON-ready report."""
+    work_dir = work_dir or DEFAULT_WORK_DIR
+    if models is None:
+        from predicting_customer_churn import build_models
+        models = build_models()
+
+    results = []
+    for rows in sizes:
+        print(f"\n📏 {rows:,} rows")
+        path = synthetic_csv(rows, work_dir, seed)
+        df = bench_ingest(results, path, rows, repeats)
+        preprocessor, features = bench_preprocess(results, df, repeats)
+        bench_features(results, df, preprocessor, features, repeats)
+        bench_memory(results, path, rows, preprocessor, features, repeats)
+        bench_models(results, df, preprocessor, features, models, max_fit_rows,
+                     single_repeats, min(batch_rows, rows), repeats, cold_start_budget)
+    return {"environment": environment(), "results": results}
+
+
+def compare(report, baseline, tolerance=0.25):
+    """Print current vs. baseline seconds; return the rows slower than ``1 + tolerance``."""
+    previous = {(r["benchmark"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\n{'Benchmark':<44}{'Size':>11}{'Baseline ms':>13}{'Current ms':>12}{'Ratio':>8}")
+    for row in report["results"]:
+        old = previous.get((row["benchmark"], row["size"]))
+        if old is None or not old["seconds"]:
+            continue
+        ratio = row["seconds"] / old["seconds"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append({**row, "baseline_seconds": old["seconds"], "ratio": ratio})
+            flag = "  ⚠️"
+        print(f"{row['benchmark']:<44}{row['size']:>11,}{old['seconds'] * 1000:>13.2f}"
+              f"{row['seconds'] * 1000:>12.2f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion, preprocessing, training and inference.")
+    parser.add_argument("--sizes", default="10k,100k",
+                        help="comma-separated row counts between 10k and 10m (default: 10k,100k)")
+    parser.add_argument("--models", default=None,
+                        help="comma-separated subset of build_models() names (default: all)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-fit-rows", type=int, default=100_000,
+                        help="cap on training rows per model fit (default: 100000)")
+    parser.add_argument("--single-repeats", type=int, default=200,
+                        help="single-row predictions timed per model (default: 200)")
+    parser.add_argument("--batch-rows", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--work-dir", default=None, help="where synthetic CSVs are kept (default: .cache/benchmarks)")
+    parser.add_argument("--output", default=None, help="results JSON (default: .cache/benchmarks/bench-<time>.json)")
+    parser.add_argument("--compare", default=None, help="baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown vs. the baseline before failing (default: 0.25)")
+    parser.add_argument("--cold-start-budget", type=float, default=COLD_START_BUDGET,
+                        help=f"seconds allowed for a cold start of inference.py (default: {COLD_START_BUDGET})")
+    parser.add_argument("--cold-start-only", action="store_true",
+                        help="only check the cold start of the model in --model-dir")
+    parser.add_argument("--model-dir", default=None, help="artifact directory for --cold-start-only")
+    args = parser.parse_args()
+
+    if args.cold_start_only:
+        report = check_cold_start(args.model_dir, args.repeats, args.cold_start_budget)
+        if cold_start_failures(report):
+            sys.exit(1)
+        print(f"\n✅ Cold start within {args.cold_start_budget:.2f}s without heavy imports")
+        return
+
+    from predicting_customer_churn import build_models
+    models = build_models()
+    if args.models:
+        wanted = [name.strip() for name in args.models.split(",")]
+        unknown = [name for name in wanted if name not in models]
+        if unknown:
+            parser.error(f"unknown model(s) {unknown}; choose from {list(models)}")
+        models = {name: models[name] for name in wanted}
+
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    report = run_benchmarks(sizes, args.work_dir, models, args.repeats, args.max_fit_rows,
+                            args.single_repeats, args.batch_rows, args.seed, args.cold_start_budget)
+
+    output = args.output or os.path.join(args.work_dir or DEFAULT_WORK_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"\n✅ Results written to '{output}'")
+
+    failures = cold_start_failures(report)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} benchmark(s) slower than the baseline by more than {args.tolerance:.0%}")
+            sys.exit(1)
+        print("\n✅ No regressions against the baseline")
+    if failures:
+        print(f"\n❌ {len(failures)} cold start(s) over {args.cold_start_budget:.2f}s or importing heavy modules")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
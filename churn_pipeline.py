@@ -0,0 +1,358 @@
+import hashlib
+import io
+import json
+import pickle
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from feature_engineering import CHARGES_BINS, TENURE_BINS, FeatureEngineer, bin_codes
+from inference import RowEncoder
+
+# ===============================
+# 🔗 PREPROCESSING + MODEL PIPELINE
+# ===============================
+# One object, fitted by predicting_customer_churn.py and loaded by every
+# serving path (Streamlit, batch scoring, HTTP service), so the encoding
+# the model was trained on is the encoding it is served with.
+
+PIPELINE_FORMAT = 1
+
+TARGET_COLUMN = "Churn"
+ID_COLUMN = "customerID"
+
+CATEGORICAL_COLUMNS = [
+    "gender", "Partner", "Dependents", "PhoneService", "MultipleLines",
+    "InternetService", "OnlineSecurity", "OnlineBackup", "DeviceProtection",
+    "TechSupport", "StreamingTV", "StreamingMovies", "Contract",
+    "PaperlessBilling", "PaymentMethod",
+]
+NUMERIC_COLUMNS = ["SeniorCitizen", "tenure", "MonthlyCharges", "TotalCharges"]
+RAW_COLUMNS = [
+    "gender", "SeniorCitizen", "Partner", "Dependents", "tenure",
+    "PhoneService", "MultipleLines", "InternetService", "OnlineSecurity",
+    "OnlineBackup", "DeviceProtection", "TechSupport", "StreamingTV",
+    "StreamingMovies", "Contract", "PaperlessBilling", "PaymentMethod",
+    "MonthlyCharges", "TotalCharges",
+]
+ENGINEERED_COLUMNS = ["AvgMonthlyCharges", "TenureGroup", "ChargesGroup"]
+FEATURE_COLUMNS = RAW_COLUMNS + ENGINEERED_COLUMNS
+
+# Compact layout for large scoring runs (CompactFeatures): every code-valued
+# raw column as int8, the three raw numerics as float32. Charges are rounded
+# back to cents and the engineered columns recomputed in float64, block by
+# block at prediction time, so the features equal the float64 encoding.
+CODE_COLUMNS = CATEGORICAL_COLUMNS + ["SeniorCitizen"]
+VALUE_COLUMNS = ["tenure", "MonthlyCharges", "TotalCharges"]
+COMPACT_BLOCK_ROWS = 65_536
+
+# Levels of the Telco export, in LabelEncoder (sorted) order. Only used to
+# rebuild a pipeline around artifacts saved before pipelines existed.
+TELCO_CATEGORIES = {
+    "gender": ["Female", "Male"],
+    "Partner": ["No", "Yes"],
+    "Dependents": ["No", "Yes"],
+    "PhoneService": ["No", "Yes"],
+    "MultipleLines": ["No", "No phone service", "Yes"],
+    "InternetService": ["DSL", "Fiber optic", "No"],
+    "OnlineSecurity": ["No", "No internet service", "Yes"],
+    "OnlineBackup": ["No", "No internet service", "Yes"],
+    "DeviceProtection": ["No", "No internet service", "Yes"],
+    "TechSupport": ["No", "No internet service", "Yes"],
+    "StreamingTV": ["No", "No internet service", "Yes"],
+    "StreamingMovies": ["No", "No internet service", "Yes"],
+    "Contract": ["Month-to-month", "One year", "Two year"],
+    "PaperlessBilling": ["No", "Yes"],
+    "PaymentMethod": [
+        "Bank transfer (automatic)", "Credit card (automatic)",
+        "Electronic check", "Mailed check",
+    ],
+}
+TELCO_FILL_VALUES = {"TotalCharges": 1397.475, "TenureGroup": 2.0, "ChargesGroup": 2.0}
+
+
+def _category_codes(values, levels):
+    """Codes of ``values`` within ``levels`` (-1 when unknown).
+
+    Categorical columns are remapped through their (small) category index
+    instead of comparing every row's string.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        remap = pd.Index(levels).get_indexer(values.cat.categories.astype(str))
+        codes = values.cat.codes.to_numpy()
+        return np.where(codes >= 0, remap[codes], -1)
+    return pd.Categorical(values.astype(str), categories=levels).codes
+
+
+def _checked_codes(df, col, levels):
+    codes = _category_codes(df[col], levels)
+    if (codes < 0).any():
+        unknown = df[col][codes < 0].astype(str).unique()[:5].tolist()
+        raise ValueError(f"Unknown values in column '{col}': {unknown}")
+    return codes
+
+
+class CompactFeatures:
+    """Encoded rows as contiguous int8 codes plus float32 raw numerics.
+
+    28 bytes per customer instead of 176 for the float64 feature matrix;
+    ChurnPreprocessor.expand turns any slice back into model features.
+    """
+
+    def __init__(self, codes, values):
+        self.codes = np.ascontiguousarray(codes, dtype=np.int8)
+        self.values = np.ascontiguousarray(values, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, rows):
+        return CompactFeatures(self.codes[rows], self.values[rows])
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.values.nbytes
+
+
+class ChurnPreprocessor:
+    """Raw Telco columns -> unscaled model features, exactly as training saw them."""
+
+    def __init__(self, categories, fill_values):
+        self.categories = {col: list(levels) for col, levels in categories.items()}
+        self.fill_values = dict(fill_values)
+        self.feature_columns = list(FEATURE_COLUMNS)
+        self._compile()
+
+    def _compile(self):
+        self._index = {col: i for i, col in enumerate(self.feature_columns)}
+        self._engineer = FeatureEngineer(self.fill_values, TENURE_BINS, CHARGES_BINS)
+        self._row_encoder = RowEncoder(self.spec())
+
+    def spec(self):
+        """JSON-serializable encoding, enough for inference.RowEncoder on its own."""
+        return {
+            "raw_columns": list(RAW_COLUMNS),
+            "feature_columns": list(self.feature_columns),
+            "categories": self.categories,
+            "fill_values": self.fill_values,
+            "tenure_bins": list(TENURE_BINS),
+            "charges_bins": list(CHARGES_BINS),
+        }
+
+    def __getstate__(self):
+        return {"categories": self.categories, "fill_values": self.fill_values}
+
+    def __setstate__(self, state):
+        self.__init__(state["categories"], state["fill_values"])
+
+    @classmethod
+    def fit(cls, df):
+        """Learn category levels and median fills from a raw training frame."""
+        categories = {col: sorted(str(v) for v in df[col].dropna().unique()) for col in CATEGORICAL_COLUMNS}
+        total = pd.to_numeric(df["TotalCharges"], errors="coerce")
+        fill_values = {
+            "TotalCharges": float(total.median()),
+            "TenureGroup": float(np.nanmedian(bin_codes(df["tenure"], TENURE_BINS))),
+            "ChargesGroup": float(np.nanmedian(bin_codes(df["MonthlyCharges"], CHARGES_BINS))),
+        }
+        return cls(categories, fill_values)
+
+    def encode_frame(self, df):
+        """Encode a raw frame into a float64 (n, n_features) matrix."""
+        out = np.empty((len(df), len(self.feature_columns)), dtype=np.float64)
+        idx = self._index
+        for col in CATEGORICAL_COLUMNS:
+            out[:, idx[col]] = _checked_codes(df, col, self.categories[col])
+        for col in ("SeniorCitizen", "tenure", "MonthlyCharges"):
+            out[:, idx[col]] = pd.to_numeric(df[col], errors="raise")
+        out[:, idx["TotalCharges"]] = pd.to_numeric(df["TotalCharges"], errors="coerce").to_numpy(dtype=np.float64)
+        return self._derive(out)
+
+    def encode_compact(self, df):
+        """Encode a raw frame into CompactFeatures (int8 codes, float32 numerics)."""
+        codes = np.empty((len(df), len(CODE_COLUMNS)), dtype=np.int8)
+        for j, col in enumerate(CATEGORICAL_COLUMNS):
+            codes[:, j] = _checked_codes(df, col, self.categories[col])
+        codes[:, -1] = pd.to_numeric(df["SeniorCitizen"], errors="raise")
+        values = np.empty((len(df), len(VALUE_COLUMNS)), dtype=np.float32)
+        values[:, 0] = pd.to_numeric(df["tenure"], errors="raise")
+        values[:, 1] = pd.to_numeric(df["MonthlyCharges"], errors="raise")
+        # Blank stays NaN until expand(), so the fill is applied in float64.
+        values[:, 2] = pd.to_numeric(df["TotalCharges"], errors="coerce").to_numpy(dtype=np.float64)
+        return CompactFeatures(codes, values)
+
+    def expand(self, compact, out=None):
+        """CompactFeatures -> the float64 (n, n_features) matrix encode_frame would give."""
+        if out is None:
+            out = np.empty((len(compact), len(self.feature_columns)), dtype=np.float64)
+        idx = self._index
+        out[:, [idx[col] for col in CODE_COLUMNS]] = compact.codes
+        out[:, [idx[col] for col in VALUE_COLUMNS]] = compact.values
+        charges = [idx["MonthlyCharges"], idx["TotalCharges"]]
+        out[:, charges] = np.round(out[:, charges], 2)  # 56.950001 (float32) -> 56.95
+        return self._derive(out)
+
+    def _derive(self, out):
+        """Fill blank TotalCharges and compute the engineered columns, in place (feature_engineering.py)."""
+        return self._engineer.derive(out, self._index)
+
+    def encode_row(self, record, out=None):
+        """Encode one customer dict without going through pandas."""
+        return self._row_encoder.encode_row(record, out)
+
+
+def _digest_state(digest, value):
+    """Feed a canonical form of fitted state into ``digest``.
+
+    Pickle bytes are not canonical (a model restored from a cache pickles
+    differently from a fresh fit), so estimators are reduced to their class,
+    get_params() and fitted ``attr_`` values, arrays to dtype/shape/data.
+    """
+    if isinstance(value, np.ndarray):
+        digest.update(f"array {value.dtype.str} {value.shape}".encode())
+        if value.dtype.names:  # structured (sklearn tree nodes): per field, skipping padding bytes
+            for name in value.dtype.names:
+                _digest_state(digest, value[name])
+        elif value.dtype == object:
+            for item in value.ravel():
+                _digest_state(digest, item)
+        else:
+            digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(f"dict {len(value)}".encode())
+        for key in sorted(value, key=str):
+            _digest_state(digest, str(key))
+            _digest_state(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__} {len(value)}".encode())
+        for item in value:
+            _digest_state(digest, item)
+    elif value is None or isinstance(value, (bool, int, float, str, np.generic)):
+        digest.update(f"{type(value).__name__} {value!r};".encode())
+    elif hasattr(value, "get_booster"):  # XGBoost: the booster holds the fitted state
+        digest.update(type(value).__qualname__.encode())
+        _digest_state(digest, value.get_params())
+        digest.update(bytes(value.get_booster().save_raw("json")))
+    elif hasattr(value, "get_params"):  # scikit-learn estimator
+        digest.update(type(value).__qualname__.encode())
+        _digest_state(digest, value.get_params(deep=False))
+        _digest_state(digest, {key: item for key, item in vars(value).items()
+                               if key.endswith("_") and not key.startswith("_")})
+    elif type(value).__name__ == "Tree" and hasattr(value, "__getstate__"):  # sklearn.tree._tree.Tree
+        _digest_state(digest, value.__getstate__())
+    else:
+        digest.update(pickle.dumps(value))
+
+
+class ChurnPipeline:
+    """Fitted preprocessor + scaler + model, saved and loaded as one artifact."""
+
+    def __init__(self, preprocessor, scaler, model, metadata=None):
+        self.preprocessor = preprocessor
+        self.scaler = scaler
+        self.model = model
+        self.metadata = dict(metadata or {})
+        # No timestamp here; model_store records when a version was exported.
+        self.metadata.setdefault("format", PIPELINE_FORMAT)
+        self._compile()
+
+    def _compile(self):
+        self._mean = np.asarray(self.scaler.mean_, dtype=np.float64)
+        self._scale = np.asarray(self.scaler.scale_, dtype=np.float64)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_mean"], state["_scale"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
+
+    @classmethod
+    def from_legacy(cls, model, scaler, model_columns):
+        """Wrap artifacts saved before pipelines existed (LabelEncoder codes)."""
+        if list(model_columns) != FEATURE_COLUMNS:
+            raise ValueError("model_columns.pkl does not match the expected feature layout")
+        preprocessor = ChurnPreprocessor(TELCO_CATEGORIES, TELCO_FILL_VALUES)
+        return cls(preprocessor, scaler, model, {"source": "legacy"})
+
+    @property
+    def feature_columns(self):
+        return self.preprocessor.feature_columns
+
+    @property
+    def categories(self):
+        return self.preprocessor.categories
+
+    def encode_row(self, record, out=None):
+        return self.preprocessor.encode_row(record, out)
+
+    def scale(self, features):
+        """StandardScaler.transform without the per-call validation overhead."""
+        features = np.array(features, dtype=np.float64, copy=True)
+        features -= self._mean
+        features /= self._scale
+        return features
+
+    def transform_frame(self, df):
+        return self.scale(self.preprocessor.encode_frame(df))
+
+    def transform_row(self, record):
+        row = self.encode_row(record)
+        row -= self._mean
+        row /= self._scale
+        return row.reshape(1, -1)
+
+    def predict_proba(self, scaled):
+        """Churn probability for already-scaled rows."""
+        return self.model.predict_proba(scaled)[:, 1]
+
+    def predict_frame(self, df):
+        return self.predict_proba(self.transform_frame(df))
+
+    def predict_compact(self, compact, block_rows=COMPACT_BLOCK_ROWS):
+        """Churn probabilities for CompactFeatures.
+
+        Rows are expanded and scaled one block at a time into a reused
+        buffer, so the float64 matrix never exists for the whole batch.
+        """
+        out = np.empty(len(compact), dtype=np.float64)
+        buffer = np.empty((min(block_rows, len(compact)), len(self.feature_columns)), dtype=np.float64)
+        for start in range(0, len(compact), block_rows):
+            block = compact[start:start + block_rows]
+            features = self.preprocessor.expand(block, buffer[:len(block)])
+            features -= self._mean
+            features /= self._scale
+            out[start:start + len(block)] = self.predict_proba(features)
+        return out
+
+    def predict_row(self, record):
+        return float(self.predict_proba(self.transform_row(record))[0])
+
+    def dumps(self):
+        buffer = io.BytesIO()
+        joblib.dump(self, buffer)
+        return buffer.getvalue()
+
+    def content_version(self):
+        """Hash of the fitted preprocessor, scaler and model; metadata does not count."""
+        digest = hashlib.sha256()
+        digest.update(json.dumps(self.preprocessor.spec(), sort_keys=True).encode())
+        _digest_state(digest, self.scaler)
+        _digest_state(digest, self.model)
+        return digest.hexdigest()[:12]
+
+    @property
+    def version(self):
+        """The content version recorded by save(), or None for pipelines saved before it was."""
+        return self.metadata.get("version")
+
+    def save(self, path):
+        """Write the pipeline with its content version in the metadata; returns the version."""
+        self.metadata["version"] = self.content_version()
+        data = self.dumps()
+        with open(path, "wb") as f:
+            f.write(data)
+        return self.metadata["version"]
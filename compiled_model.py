@@ -0,0 +1,373 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+# ===============================
+# ⚡ COMPILED INFERENCE
+# ===============================
+# The fitted model plus scaler, flattened into plain NumPy arrays:
+#
+#   linear  logistic models with the scaler fused into the weights, so a
+#           prediction is one dot product on the encoded (unscaled) row
+#   trees   decision trees, forests, gradient boosting and XGBoost as
+#           flat node arrays, walked level by level for every row and
+#           tree at once
+#
+# predicting_customer_churn.py writes models/churn_compiled.npz next to
+# the pipeline after checking parity on the test set; app.py picks the
+# runtime with CHURN_RUNTIME ("compiled", the default, or "sklearn").
+
+COMPILED_FILE = "churn_compiled.npz"
+COMPILED_FORMAT = 1
+RUNTIMES = ("compiled", "sklearn")
+
+PARITY_ATOL = 1e-6
+TREE_BATCH_ROWS = 4096
+
+
+def default_runtime():
+    return os.environ.get("CHURN_RUNTIME", "compiled")
+
+
+def _sigmoid(raw):
+    return 1.0 / (1.0 + np.exp(-raw))
+
+
+class CompiledLinear:
+    """Logistic model with the StandardScaler folded in: p = sigmoid(x · w + b)."""
+
+    kind = "linear"
+
+    def __init__(self, weights, bias, meta=None):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.meta = dict(meta or {})
+
+    @classmethod
+    def from_model(cls, model, mean, scale, meta=None):
+        coef = np.asarray(model.coef_, dtype=np.float64)
+        if coef.shape[0] != 1:
+            raise TypeError("only binary linear models can be compiled")
+        coef = coef[0]
+        weights = coef / scale
+        bias = float(np.ravel(model.intercept_)[0]) - float(np.dot(weights, mean))
+        return cls(weights, bias, meta)
+
+    def predict_proba(self, features):
+        """Churn probability for encoded, unscaled rows of shape (n, n_features)."""
+        return _sigmoid(np.asarray(features, dtype=np.float64) @ self.weights + self.bias)
+
+    def arrays(self):
+        return {"weights": self.weights, "bias": np.array([self.bias])}
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        return cls(arrays["weights"], arrays["bias"][0], meta)
+
+
+class CompiledTrees:
+    """Tree ensemble as flat node arrays.
+
+    Leaves point to themselves and split on +inf, so rows that reached a
+    leaf simply stay put while the others keep walking; the walk ends once
+    no row moves. The score is ``link(base + factor * sum(leaf values))``; splits compare the
+    scaled row cast to float32, exactly as sklearn and XGBoost do.
+    """
+
+    kind = "trees"
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth,
+                 base, factor, link, mean, scale, meta=None):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.base = float(base)
+        self.factor = float(factor)
+        self.link = link
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.meta = dict(meta or {})
+        # children[2 * node] is the left child, children[2 * node + 1] the right.
+        self._children = np.stack([self.left, self.right], axis=1).ravel()
+
+    def descend(self, features):
+        """Yield the (rows, trees) node matrix at each level, roots first, until every row sits on a leaf."""
+        scaled = ((features - self.mean) / self.scale).astype(np.float32)
+        nodes = np.repeat(self.roots[None, :], len(scaled), axis=0)
+        rows = np.arange(len(scaled))[:, None]
+        yield nodes
+        for _ in range(self.max_depth):
+            go_right = scaled[rows, self.feature[nodes]] > self.threshold[nodes]
+            next_nodes = self._children[2 * nodes + go_right]
+            if np.array_equal(next_nodes, nodes):
+                return  # every row reached a leaf in every tree
+            nodes = next_nodes
+            yield nodes
+
+    def _raw(self, features):
+        for nodes in self.descend(features):
+            pass
+        return self.base + self.factor * self.value[nodes].sum(axis=1)
+
+    def predict_proba(self, features):
+        """Churn probability for encoded, unscaled rows of shape (n, n_features)."""
+        features = np.asarray(features, dtype=np.float64)
+        raw = np.concatenate([self._raw(features[start:start + TREE_BATCH_ROWS])
+                              for start in range(0, len(features), TREE_BATCH_ROWS)] or [np.empty(0)])
+        return _sigmoid(raw) if self.link == "logistic" else raw
+
+    def arrays(self):
+        return {
+            "feature": self.feature, "threshold": self.threshold, "left": self.left,
+            "right": self.right, "value": self.value, "roots": self.roots,
+            "mean": self.mean, "scale": self.scale,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        return cls(arrays["feature"], arrays["threshold"], arrays["left"], arrays["right"],
+                   arrays["value"], arrays["roots"], meta["max_depth"], meta["base"],
+                   meta["factor"], meta["link"], arrays["mean"], arrays["scale"], meta)
+
+
+class _TreeBuilder:
+    """Appends trees into shared node arrays and tracks the deepest one."""
+
+    def __init__(self):
+        self.feature, self.threshold, self.left, self.right, self.value = [], [], [], [], []
+        self.roots = []
+        self.max_depth = 0
+
+    def add_sklearn_tree(self, tree, leaf_values):
+        offset = len(self.feature)
+        self.roots.append(offset)
+        leaf = tree.children_left == -1
+        ids = np.arange(tree.node_count) + offset
+        self.feature.extend(np.where(leaf, 0, tree.feature))
+        self.threshold.extend(np.where(leaf, np.inf, tree.threshold))
+        self.left.extend(np.where(leaf, ids, tree.children_left + offset))
+        self.right.extend(np.where(leaf, ids, tree.children_right + offset))
+        self.value.extend(np.where(leaf, leaf_values, 0.0))
+        self.max_depth = max(self.max_depth, tree.max_depth)
+
+    def add_xgboost_tree(self, root, feature_index):
+        # XGBoost sends x < t left; as float32, that is x <= the next float32 below t.
+        nodes = {}
+
+        def walk(node, depth):
+            nodes[node["nodeid"]] = node
+            self.max_depth = max(self.max_depth, depth)
+            for child in node.get("children", []):
+                walk(child, depth + 1)
+
+        walk(root, 0)
+        offset = len(self.feature)
+        self.roots.append(offset)
+        for node_id in range(len(nodes)):
+            node = nodes[node_id]
+            if "leaf" in node:
+                self.feature.append(0)
+                self.threshold.append(np.inf)
+                self.left.append(offset + node_id)
+                self.right.append(offset + node_id)
+                self.value.append(float(node["leaf"]))
+            else:
+                split = np.float32(node["split_condition"])
+                self.feature.append(feature_index(node["split"]))
+                self.threshold.append(float(np.nextafter(split, np.float32(-np.inf))))
+                self.left.append(offset + node["yes"])
+                self.right.append(offset + node["no"])
+                self.value.append(0.0)
+
+
+def _compile_sklearn_trees(model, mean, scale, meta):
+    builder = _TreeBuilder()
+    name = type(model).__name__
+    if name == "DecisionTreeClassifier":
+        trees, base, factor, link = [model], 0.0, 1.0, "identity"
+    elif name in ("RandomForestClassifier", "ExtraTreesClassifier"):
+        trees, base, factor, link = model.estimators_, 0.0, 1.0 / len(model.estimators_), "identity"
+    else:  # GradientBoostingClassifier
+        if model.estimators_.shape[1] != 1:
+            raise TypeError("only binary gradient boosting can be compiled")
+        if model.init_ == "zero":
+            base = 0.0
+        else:
+            prior = model.init_.predict_proba(np.zeros((1, len(mean))))[0, 1]
+            base = float(np.log(prior / (1 - prior)))
+        trees, factor, link = model.estimators_[:, 0], model.learning_rate, "logistic"
+
+    for estimator in trees:
+        tree = estimator.tree_
+        if link == "identity":
+            counts = tree.value[:, 0, :]
+            leaf_values = counts[:, 1] / counts.sum(axis=1)
+        else:
+            leaf_values = tree.value[:, 0, 0]
+        builder.add_sklearn_tree(tree, leaf_values)
+    meta.update(base=base, factor=factor, link=link)
+    return builder, meta
+
+
+def _compile_xgboost(model, mean, scale, meta):
+    booster = model.get_booster()
+    config = json.loads(booster.save_config())
+    objective = config["learner"]["objective"]["name"]
+    if objective != "binary:logistic":
+        raise TypeError(f"XGBoost objective {objective!r} cannot be compiled")
+    base_score = float(config["learner"]["learner_model_param"]["base_score"].strip("[]"))
+    names = booster.feature_names
+
+    def feature_index(split):
+        if names:
+            return names.index(split)
+        return int(split.lstrip("f"))
+
+    builder = _TreeBuilder()
+    for dump in booster.get_dump(dump_format="json"):
+        builder.add_xgboost_tree(json.loads(dump), feature_index)
+    meta.update(base=float(np.log(base_score / (1 - base_score))), factor=1.0, link="logistic")
+    return builder, meta
+
+
+TREE_COMPILERS = {
+    "DecisionTreeClassifier": _compile_sklearn_trees,
+    "RandomForestClassifier": _compile_sklearn_trees,
+    "ExtraTreesClassifier": _compile_sklearn_trees,
+    "GradientBoostingClassifier": _compile_sklearn_trees,
+    "XGBClassifier": _compile_xgboost,
+}
+
+
+def compile_pipeline(pipeline):
+    """Compile a fitted ChurnPipeline's scaler + model; TypeError if the model is unsupported."""
+    model = pipeline.model
+    name = type(model).__name__
+    mean, scale = pipeline._mean, pipeline._scale
+    meta = {"format": COMPILED_FORMAT, "model_class": name,
+            "model_name": pipeline.metadata.get("model_name", name),
+            "n_features": len(pipeline.feature_columns),
+            # the fitted encoding travels with the model, for inference.py
+            "preprocessor": pipeline.preprocessor.spec()}
+
+    if name == "LogisticRegression" or (name == "SGDClassifier" and model.loss == "log_loss"):
+        return CompiledLinear.from_model(model, mean, scale, meta)
+    if name not in TREE_COMPILERS:
+        raise TypeError(f"no compiled runtime for {name}")
+    builder, meta = TREE_COMPILERS[name](model, mean, scale, meta)
+    meta["max_depth"] = builder.max_depth
+    return CompiledTrees(builder.feature, builder.threshold, builder.left, builder.right, builder.value,
+                         builder.roots, builder.max_depth, meta["base"], meta["factor"], meta["link"],
+                         mean, scale, meta)
+
+
+def save_compiled(compiled, path, pipeline_version=None):
+    meta = dict(compiled.meta, kind=compiled.kind, pipeline_version=pipeline_version)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, meta=np.array(json.dumps(meta)), **compiled.arrays())
+    os.replace(tmp_path, path)
+
+
+def load_compiled(path):
+    """Load a compiled model; plain arrays, no pickle involved."""
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+    meta = json.loads(str(arrays.pop("meta")))
+    if meta.get("format") != COMPILED_FORMAT:
+        raise ValueError(f"unsupported compiled model format {meta.get('format')!r}")
+    cls = CompiledLinear if meta["kind"] == "linear" else CompiledTrees
+    return cls.from_arrays(arrays, meta)
+
+
+def check_parity(pipeline, compiled, features, atol=PARITY_ATOL):
+    """Compare compiled and sklearn probabilities on encoded (unscaled) rows."""
+    features = np.asarray(features, dtype=np.float64)
+    expected = pipeline.predict_proba(pipeline.scale(features))
+    actual = compiled.predict_proba(features)
+    diff = np.abs(expected - actual)
+    return {
+        "rows": len(features),
+        "max_abs_diff": float(diff.max()) if len(diff) else 0.0,
+        "label_mismatches": int(((expected > 0.5) != (actual > 0.5)).sum()),
+        "passed": bool(len(diff) == 0 or diff.max() <= atol),
+    }
+
+
+# ---- runtimes ----
+class SklearnRuntime:
+    """The fitted sklearn/XGBoost model behind the same interface as the compiled one."""
+
+    name = "sklearn"
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    def predict_proba(self, features):
+        return self.pipeline.predict_proba(self.pipeline.scale(features))
+
+
+class CompiledRuntime:
+    name = "compiled"
+
+    def __init__(self, compiled, source):
+        self.compiled = compiled
+        self.source = source
+
+    def predict_proba(self, features):
+        return self.compiled.predict_proba(features)
+
+
+def load_runtime(pipeline, artifact_dir=None, version=None, name=None):
+    """Runtime for ``pipeline``: its exported compiled file when it matches
+    ``version``, else compiled in memory, else the sklearn model itself."""
+    name = name or default_runtime()
+    if name not in RUNTIMES:
+        raise ValueError(f"CHURN_RUNTIME must be one of {RUNTIMES}, got {name!r}")
+    if name == "sklearn":
+        return SklearnRuntime(pipeline)
+
+    path = os.path.join(artifact_dir, COMPILED_FILE) if artifact_dir else None
+    if path and os.path.exists(path):
+        compiled = load_compiled(path)
+        if version is not None and compiled.meta.get("pipeline_version") == version:
+            return CompiledRuntime(compiled, COMPILED_FILE)
+    try:
+        return CompiledRuntime(compile_pipeline(pipeline), "compiled at load")
+    except TypeError:
+        return SklearnRuntime(pipeline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the deployed churn pipeline and check parity.")
+    parser.add_argument("--model-dir", default=None, help="artifact directory (default: CHURN_MODEL_DIR)")
+    parser.add_argument("--data", default=None, help="CSV to check parity on (default: the bundled export)")
+    parser.add_argument("--write", action="store_true", help=f"write {COMPILED_FILE} when parity holds")
+    args = parser.parse_args()
+
+    from artifacts import ArtifactRegistry
+    from data_ingest import load_telco
+
+    registry = ArtifactRegistry(args.model_dir)
+    artifacts = registry.get()
+    compiled = compile_pipeline(artifacts.pipeline)
+    features = artifacts.pipeline.preprocessor.encode_frame(load_telco(args.data))
+    parity = check_parity(artifacts.pipeline, compiled, features)
+    print(f"{compiled.meta['model_name']} ({compiled.kind}): max |Δp| {parity['max_abs_diff']:.2e} "
+          f"over {parity['rows']} rows, {parity['label_mismatches']} label mismatches")
+    if not parity["passed"]:
+        raise SystemExit(f"❌ Parity check failed (tolerance {PARITY_ATOL})")
+    print("✅ Parity check passed")
+    if args.write:
+        path = os.path.join(registry.artifact_dir, COMPILED_FILE)
+        save_compiled(compiled, path, artifacts.version)
+        print(f"✅ Compiled model saved to '{path}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import RepeatedStratifiedKFold
+from sklearn.preprocessing import StandardScaler
+
+from training_engine import cpu_budget, evaluate_model, limit_threads
+
+# ===============================
+# 🔁 REPEATED K-FOLD EVALUATION
+# ===============================
+# Scores every model on repeated stratified k-fold splits instead of a
+# single 80/20 split. Each fold is split and scaled once (the scaler is fit
+# on that fold's training rows only) and written as .npy files under
+# .cache/folds/<data hash>; the (model, fold) tasks then run in the process
+# pool and open those matrices memory-mapped, so no model re-scales a fold
+# and no task ships feature data through pickling. A rerun on the same data
+# and settings reuses the folds from disk.
+#
+#   python cross_validation.py --folds 5 --repeats 3
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, ".cache", "folds")
+
+CV_FOLDS = int(os.environ.get("CHURN_CV_FOLDS", "5"))
+CV_REPEATS = int(os.environ.get("CHURN_CV_REPEATS", "2"))
+MAX_CACHED_SPLITS = 4
+
+METRICS = ['Accuracy', 'Precision', 'Recall', 'F1-Score', 'ROC-AUC']
+FOLD_ARRAYS = ['X_train', 'y_train', 'X_test', 'y_test']
+
+
+def folds_key(X, y, n_splits, n_repeats, random_state):
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(y, dtype=np.int8).tobytes())
+    digest.update(f"{n_splits}|{n_repeats}|{random_state}".encode())
+    return digest.hexdigest()[:16]
+
+
+def _evict(cache_dir, keep):
+    entries = sorted((os.path.join(cache_dir, name) for name in os.listdir(cache_dir)), key=os.path.getmtime)
+    for path in entries[:-keep]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def prepare_folds(X, y, n_splits=CV_FOLDS, n_repeats=CV_REPEATS, random_state=42, cache_dir=None):
+    """Split and scale every fold once; return ``(fold directories, cache hit)``."""
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.int8)
+    cache_dir = cache_dir or os.environ.get("CHURN_FOLD_CACHE_DIR", DEFAULT_CACHE_DIR)
+    root = os.path.join(cache_dir, folds_key(X, y, n_splits, n_repeats, random_state))
+    n_folds = n_splits * n_repeats
+    folds = [os.path.join(root, f"fold-{i:03d}") for i in range(n_folds)]
+    if os.path.exists(os.path.join(root, "manifest.json")):
+        os.utime(root)
+        return folds, True
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_root = f"{root}.{os.getpid()}.tmp"
+    splitter = RepeatedStratifiedKFold(n_splits=n_splits, n_repeats=n_repeats, random_state=random_state)
+    for i, (train_idx, test_idx) in enumerate(splitter.split(X, y)):
+        scaler = StandardScaler().fit(X[train_idx])
+        arrays = {
+            'X_train': scaler.transform(X[train_idx]), 'y_train': y[train_idx],
+            'X_test': scaler.transform(X[test_idx]), 'y_test': y[test_idx],
+        }
+        fold_dir = os.path.join(tmp_root, f"fold-{i:03d}")
+        os.makedirs(fold_dir)
+        for name, array in arrays.items():
+            np.save(os.path.join(fold_dir, f"{name}.npy"), array)
+    with open(os.path.join(tmp_root, "manifest.json"), "w") as f:
+        json.dump({"folds": n_folds, "n_splits": n_splits, "n_repeats": n_repeats,
+                   "random_state": random_state, "rows": len(X)}, f)
+    try:
+        os.replace(tmp_root, root)
+    except OSError:  # another process got there first
+        shutil.rmtree(tmp_root, ignore_errors=True)
+    _evict(cache_dir, MAX_CACHED_SPLITS)
+    return folds, False
+
+
+def load_fold(fold_dir):
+    """The fold's scaled matrices, memory-mapped read-only."""
+    return {name: np.load(os.path.join(fold_dir, f"{name}.npy"), mmap_mode='r') for name in FOLD_ARRAYS}
+
+
+def _fit_fold(name, model, fold, fold_dir, n_threads):
+    data = load_fold(fold_dir)
+    model = limit_threads(clone(model), n_threads)
+    start = time.time()
+    model.fit(data['X_train'], data['y_train'])
+    fit_seconds = time.time() - start
+    metrics = evaluate_model(model, data['X_test'], data['y_test'])
+    return {'Model': name, 'Fold': fold, **metrics, 'Fit Seconds': fit_seconds,
+            'Started': start, 'Finished': time.time()}
+
+
+def summarize(fold_results):
+    """Mean and std of every metric per model, plus fit time and wall-clock window."""
+    df = pd.DataFrame(fold_results)
+    grouped = df.groupby('Model', sort=False)
+    summary = grouped[METRICS].mean()
+    for metric in METRICS:
+        summary[f'{metric} Std'] = grouped[metric].std(ddof=1)
+    summary['Folds'] = grouped.size()
+    summary['Fit Seconds'] = grouped['Fit Seconds'].sum()
+    summary['Wall Seconds'] = grouped['Finished'].max() - grouped['Started'].min()
+    columns = [col for metric in METRICS for col in (metric, f'{metric} Std')] + ['Folds', 'Fit Seconds', 'Wall Seconds']
+    return summary[columns].reset_index().sort_values('ROC-AUC', ascending=False, ignore_index=True)
+
+
+def cross_validate(models, X, y, n_splits=CV_FOLDS, n_repeats=CV_REPEATS, random_state=42, n_jobs=None,
+                   cache_dir=None):
+    """Repeated stratified k-fold evaluation of every model, folds x models in parallel.
+
+    Returns ``(summary, fold_results, info)``: the per-model mean/std table
+    sorted by ROC-AUC, one dict per (model, fold), and run timings.
+    """
+    start = time.perf_counter()
+    folds, cache_hit = prepare_folds(X, y, n_splits, n_repeats, random_state, cache_dir)
+    prepare_seconds = time.perf_counter() - start
+
+    tasks = [(name, model, i, fold_dir) for name, model in models.items() for i, fold_dir in enumerate(folds)]
+    workers, threads = cpu_budget(len(tasks), n_jobs)
+    fold_results = Parallel(n_jobs=workers)(
+        delayed(_fit_fold)(name, model, i, fold_dir, threads) for name, model, i, fold_dir in tasks
+    )
+    info = {
+        'folds': len(folds), 'cache_hit': cache_hit, 'prepare_seconds': prepare_seconds,
+        'wall_seconds': time.perf_counter() - start, 'workers': workers,
+    }
+    return summarize(fold_results), fold_results, info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Repeated stratified k-fold evaluation of the model zoo.")
+    parser.add_argument("--data", default=None, help="CSV export (default: CHURN_DATA_PATH or the bundled file)")
+    parser.add_argument("--folds", type=int, default=CV_FOLDS)
+    parser.add_argument("--repeats", type=int, default=CV_REPEATS)
+    parser.add_argument("--models", default=None, help="comma-separated subset of build_models() names")
+    parser.add_argument("--n-jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--output", default="cv_results.csv")
+    args = parser.parse_args()
+
+    from churn_pipeline import TARGET_COLUMN, ChurnPreprocessor
+    from data_ingest import load_telco
+    from predicting_customer_churn import build_models
+
+    df = load_telco(args.data)
+    X = ChurnPreprocessor.fit(df).encode_frame(df)
+    y = (df[TARGET_COLUMN] == 'Yes').to_numpy(dtype=np.int8)
+    models = build_models()
+    if args.models:
+        models = {name.strip(): models[name.strip()] for name in args.models.split(",")}
+
+    summary, _, info = cross_validate(models, X, y, args.folds, args.repeats, n_jobs=args.n_jobs)
+    print(summary.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print(f"\n{len(models)} models x {info['folds']} folds on {info['workers']} worker(s) in {info['wall_seconds']:.1f}s "
+          f"(folds {'reused from cache' if info['cache_hit'] else 'prepared'} in {info['prepare_seconds']:.2f}s)")
+    summary.to_csv(args.output, index=False)
+    print(f"✅ Results written to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from artifacts import ArtifactRegistry
+from batch_scoring import DEFAULT_CHUNKSIZE, read_chunks, result_frame, score_chunk
+from churn_pipeline import ID_COLUMN, RAW_COLUMNS
+from data_ingest import have_pyarrow
+
+# ===============================
+# 🔁 DELTA SCORING
+# ===============================
+# Keeps a snapshot of (customerID hash, row hash, last score) from the previous
+# run. A new export is streamed in chunks; rows whose raw feature hash and
+# customerID match the snapshot reuse their score, and only new or changed
+# customers go through preprocessing and predict_proba. The output is
+# still the full score table.
+#
+# The hash covers the raw model inputs, which the fitted pipeline encodes
+# deterministically, so unchanged rows can skip encoding as well. The
+# snapshot records the model version; a different model rescores everyone.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SNAPSHOT = os.path.join(BASE_DIR, ".cache", "scores", "snapshot.feather")
+
+SNAPSHOT_FORMAT = 1
+STATUS_NEW, STATUS_CHANGED, STATUS_UNCHANGED = "new", "changed", "unchanged"
+
+
+def default_snapshot_path():
+    return os.environ.get("CHURN_SCORE_SNAPSHOT", DEFAULT_SNAPSHOT)
+
+
+def row_hashes(chunk):
+    """uint64 hash of each row's raw model inputs (dtype-stable via the typed reader)."""
+    return pd.util.hash_pandas_object(chunk[RAW_COLUMNS], index=False).to_numpy()
+
+
+def id_hashes(ids):
+    """uint64 hash of each customerID; joining on these beats joining on strings."""
+    return pd.util.hash_pandas_object(pd.Series(ids).astype(str), index=False).to_numpy()
+
+
+def _meta_path(path):
+    return f"{path}.json"
+
+
+def load_snapshot(path):
+    """Return ``(frame indexed by customerID hash, meta)`` or ``(None, None)`` if there is none."""
+    if not (os.path.exists(path) and os.path.exists(_meta_path(path))):
+        return None, None
+    with open(_meta_path(path)) as f:
+        meta = json.load(f)
+    if meta.get("format") != SNAPSHOT_FORMAT:
+        return None, None
+    snapshot = pd.read_feather(path) if have_pyarrow() else pd.read_pickle(path)
+    return snapshot.set_index("id_hash"), meta
+
+
+def save_snapshot(path, snapshot, model_version):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if have_pyarrow():
+        snapshot.to_feather(tmp_path)
+    else:
+        snapshot.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+    meta = {"format": SNAPSHOT_FORMAT, "model_version": model_version, "rows": len(snapshot),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    with open(f"{_meta_path(path)}.tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(f"{_meta_path(path)}.tmp", _meta_path(path))
+
+
+def delta_score(source, destination, artifacts=None, snapshot_path=None, chunksize=DEFAULT_CHUNKSIZE, full=False):
+    """Score ``source`` against the snapshot, write the merged table to ``destination``.
+
+    The output has customerID, churn_probability, prediction,
+    retention_tier and status (new / changed / unchanged). The snapshot is replaced by this run's
+    scores; customers missing from the export are dropped from it.
+    Returns a summary dict.
+    """
+    artifacts = artifacts or ArtifactRegistry().get()
+    snapshot_path = snapshot_path or default_snapshot_path()
+    start = time.perf_counter()
+
+    previous, meta = (None, None) if full else load_snapshot(snapshot_path)
+    if meta is not None and meta.get("model_version") != artifacts.version:
+        previous = None  # scores from another model can't be reused
+    if previous is not None:
+        previous = previous[~previous.index.duplicated(keep="last")]
+        prev_hash = previous["row_hash"].to_numpy()
+        prev_prob = previous["churn_probability"].to_numpy()
+        seen = np.zeros(len(previous), dtype=bool)
+
+    counts = {STATUS_NEW: 0, STATUS_CHANGED: 0, STATUS_UNCHANGED: 0}
+    parts = []
+    header = True
+    for chunk in read_chunks(source, chunksize):
+        hashes = row_hashes(chunk)
+        prob = np.empty(len(chunk), dtype=np.float64)
+        status = np.full(len(chunk), STATUS_NEW, dtype=object)
+        rescore = np.ones(len(chunk), dtype=bool)
+        if previous is not None:
+            pos = previous.index.get_indexer(id_hashes(chunk[ID_COLUMN]))
+            known = pos >= 0
+            seen[pos[known]] = True
+            same = np.zeros(len(chunk), dtype=bool)
+            same[known] = prev_hash[pos[known]] == hashes[known]
+            prob[same] = prev_prob[pos[same]]
+            status[known] = STATUS_CHANGED
+            status[same] = STATUS_UNCHANGED
+            rescore = ~same
+        if rescore.any():
+            prob[rescore] = score_chunk(chunk[rescore], artifacts)["churn_probability"].to_numpy()
+
+        result = result_frame(prob, chunk[ID_COLUMN].to_numpy()).assign(status=status)
+        result.to_csv(destination, mode="w" if header else "a", header=header, index=False)
+        header = False
+        for key, n in zip(*np.unique(status, return_counts=True)):
+            counts[key] += int(n)
+        parts.append(pd.DataFrame({"id_hash": id_hashes(result[ID_COLUMN]), "row_hash": hashes,
+                                   "churn_probability": prob}))
+
+    snapshot = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(
+        {"id_hash": np.empty(0, np.uint64), "row_hash": np.empty(0, np.uint64), "churn_probability": np.empty(0)})
+    save_snapshot(snapshot_path, snapshot, artifacts.version)
+
+    elapsed = time.perf_counter() - start
+    rows = sum(counts.values())
+    return {
+        "rows": rows,
+        "new": counts[STATUS_NEW],
+        "changed": counts[STATUS_CHANGED],
+        "unchanged": counts[STATUS_UNCHANGED],
+        "removed": int((~seen).sum()) if previous is not None else 0,
+        "scored": counts[STATUS_NEW] + counts[STATUS_CHANGED],
+        "full_rescore": previous is None,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else 0.0,
+        "model_version": artifacts.version,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore only new or changed customers and emit the full score table.")
+    parser.add_argument("input", help="CSV shaped like Telco-Customer-Churn-data.csv")
+    parser.add_argument("output", help="Where to write customerID,churn_probability,prediction,retention_tier,status")
+    parser.add_argument("--snapshot", default=None, help="Score snapshot (default: CHURN_SCORE_SNAPSHOT or .cache/scores)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--model-dir", default=None, help="Directory holding the .pkl artifacts")
+    parser.add_argument("--full", action="store_true", help="Ignore the snapshot and rescore everyone")
+    args = parser.parse_args()
+
+    artifacts = ArtifactRegistry(args.model_dir).get()
+    summary = delta_score(args.input, args.output, artifacts, args.snapshot, args.chunksize, args.full)
+    mode = "full rescore" if summary["full_rescore"] else "delta"
+    print(f"✅ {summary['rows']} customers ({mode}): {summary['scored']} scored "
+          f"({summary['new']} new, {summary['changed']} changed), {summary['unchanged']} reused, "
+          f"{summary['removed']} removed — {summary['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
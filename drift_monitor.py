@@ -0,0 +1,284 @@
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+
+# ===============================
+# 📉 DRIFT MONITORING
+# ===============================
+# Compares live traffic with the training population without keeping rows.
+# Every model feature (and the churn probability) gets a histogram whose
+# edges are fixed by the training data: training quantiles for numeric
+# columns, one bin per level for code columns (categoricals, SeniorCitizen,
+# the tenure/charges groups) plus an overflow bin. The reference sketch is
+# saved next to the model as drift_reference.json; a live sketch is just
+# counts over the same edges, so it takes constant memory and sketches from
+# several workers or runs merge by adding counts.
+#
+#   PSI  population stability index per column: < 0.1 stable,
+#        0.1-0.25 watch, >= 0.25 drift
+#   KS   largest gap between the two CDFs at the bin edges (numeric
+#        columns), with the 5% critical value for the two sample sizes
+#
+#   python drift_monitor.py live.csv                # score + sketch + report
+#   python drift_monitor.py a.json b.json           # merge saved sketches
+#   python drift_monitor.py --write-reference Telco-Customer-Churn-data.csv
+
+DRIFT_REFERENCE_FILE = "drift_reference.json"
+DRIFT_FORMAT = 1
+DRIFT_BINS = 20
+PROBABILITY_COLUMN = "churn_probability"
+
+PSI_WATCH = 0.1
+PSI_DRIFT = 0.25
+KS_C_ALPHA = 1.358  # two-sample KS constant for alpha = 0.05
+PSI_EPSILON = 1e-4  # floor on bin proportions, so empty bins stay finite
+
+
+def code_levels(spec):
+    """Levels of every code-valued model feature, from ChurnPreprocessor.spec()."""
+    levels = {col: len(values) for col, values in spec["categories"].items()}
+    levels["SeniorCitizen"] = 2
+    levels["TenureGroup"] = len(spec["tenure_bins"]) - 1
+    levels["ChargesGroup"] = len(spec["charges_bins"]) - 1
+    return levels
+
+
+def quantile_edges(values, bins=DRIFT_BINS):
+    """Interior edges at the reference quantiles; ties collapse into fewer bins."""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return []
+    return np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1])).tolist()
+
+
+def drift_status(psi):
+    if psi >= PSI_DRIFT:
+        return "drift"
+    return "watch" if psi >= PSI_WATCH else "stable"
+
+
+class DriftSketch:
+    """Fixed-edge histograms per column.
+
+    ``layout`` maps each column to its interior edges (numeric) or its
+    level count (codes). Column ``j`` of the feature matrix is
+    ``columns[j]``; ``churn_probability`` is kept separately when given.
+    """
+
+    def __init__(self, columns, layout, counts=None, meta=None):
+        self.columns = list(columns)
+        self.layout = {col: (int(spec) if isinstance(spec, int) else list(spec)) for col, spec in layout.items()}
+        self.meta = dict(meta or {})
+        self._edges = {col: np.asarray(spec, dtype=np.float64)
+                       for col, spec in self.layout.items() if not isinstance(spec, int)}
+        if counts is None:
+            counts = {col: np.zeros(self.n_bins(col), dtype=np.int64) for col in self.layout}
+        self.counts = {col: np.asarray(counts[col], dtype=np.int64) for col in self.layout}
+
+    def n_bins(self, col):
+        spec = self.layout[col]
+        return spec + 1 if isinstance(spec, int) else len(spec) + 1
+
+    @classmethod
+    def fit(cls, features, spec, probabilities=None, bins=DRIFT_BINS, meta=None):
+        """Reference sketch from encoded (unscaled) training rows and, optionally, their churn probabilities."""
+        features = np.asarray(features, dtype=np.float64)
+        columns = list(spec["feature_columns"])
+        levels = code_levels(spec)
+        layout = {col: levels[col] if col in levels else quantile_edges(features[:, j], bins)
+                  for j, col in enumerate(columns)}
+        if probabilities is not None:
+            layout[PROBABILITY_COLUMN] = quantile_edges(probabilities, bins)
+        sketch = cls(columns, layout, meta=meta)
+        sketch.update(features, probabilities)
+        return sketch
+
+    def empty(self):
+        """A sketch with the same edges and no counts, for live traffic."""
+        return DriftSketch(self.columns, self.layout, meta={"reference_version": self.meta.get("pipeline_version")})
+
+    def _bin(self, col, values):
+        spec = self.layout[col]
+        if isinstance(spec, int):
+            # unknown or out-of-range codes go to the overflow bin
+            return np.where((values >= 0) & (values < spec), values, spec).astype(np.intp)
+        return np.searchsorted(self._edges[col], values, side="right")
+
+    def update(self, features, probabilities=None):
+        """Add encoded (unscaled) rows and their churn probabilities."""
+        features = np.asarray(features, dtype=np.float64).reshape(-1, len(self.columns))
+        for j, col in enumerate(self.columns):
+            self.counts[col] += np.bincount(self._bin(col, features[:, j]), minlength=self.n_bins(col))
+        if probabilities is not None and PROBABILITY_COLUMN in self.layout:
+            probabilities = np.asarray(probabilities, dtype=np.float64).ravel()
+            self.counts[PROBABILITY_COLUMN] += np.bincount(self._bin(PROBABILITY_COLUMN, probabilities),
+                                                           minlength=self.n_bins(PROBABILITY_COLUMN))
+        return self
+
+    def merge(self, other):
+        """Add another sketch's counts (same edges required), in place."""
+        if other.layout != self.layout:
+            raise ValueError("drift sketches with different edges cannot be merged")
+        for col in self.layout:
+            self.counts[col] += other.counts[col]
+        return self
+
+    @property
+    def rows(self):
+        return int(self.counts[self.columns[0]].sum()) if self.columns else 0
+
+    def to_dict(self):
+        return {"format": DRIFT_FORMAT, "columns": self.columns, "layout": self.layout,
+                "counts": {col: counts.tolist() for col, counts in self.counts.items()}, "meta": self.meta}
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("format") != DRIFT_FORMAT:
+            raise ValueError(f"unsupported drift sketch format {data.get('format')!r}")
+        return cls(data["columns"], data["layout"], data["counts"], data.get("meta"))
+
+    def save(self, path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def psi(expected_counts, actual_counts):
+    expected = np.maximum(expected_counts / max(expected_counts.sum(), 1), PSI_EPSILON)
+    actual = np.maximum(actual_counts / max(actual_counts.sum(), 1), PSI_EPSILON)
+    return float(((actual - expected) * np.log(actual / expected)).sum())
+
+
+def ks_statistic(expected_counts, actual_counts):
+    expected = np.cumsum(expected_counts) / max(expected_counts.sum(), 1)
+    actual = np.cumsum(actual_counts) / max(actual_counts.sum(), 1)
+    return float(np.abs(expected - actual).max())
+
+
+def compare(reference, live):
+    """PSI / KS per column of ``live`` against ``reference``, most drifted first."""
+    if live.layout != reference.layout:
+        raise ValueError("live sketch was not built from this reference")
+    n_ref, n_live = reference.rows, live.rows
+    critical = KS_C_ALPHA * np.sqrt((n_ref + n_live) / (n_ref * n_live)) if n_ref and n_live else None
+    rows = []
+    for col in reference.layout:
+        expected, actual = reference.counts[col], live.counts[col]
+        if not actual.sum():
+            continue
+        value = psi(expected, actual)
+        row = {"column": col, "psi": value, "status": drift_status(value), "ks": None, "ks_critical": critical}
+        if not isinstance(reference.layout[col], int):
+            row["ks"] = ks_statistic(expected, actual)
+        rows.append(row)
+    return sorted(rows, key=lambda row: -row["psi"])
+
+
+def load_reference(artifact_dir, version=None):
+    """The artifact directory's drift reference, or None if missing or saved for another model version."""
+    path = os.path.join(artifact_dir, DRIFT_REFERENCE_FILE)
+    if not os.path.exists(path):
+        return None
+    reference = DriftSketch.load(path)
+    if version is not None and reference.meta.get("pipeline_version") != version:
+        return None
+    return reference
+
+
+class DriftMonitor:
+    """Live sketch for whichever model version is serving; a new version starts a new sketch."""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.version = None
+        self.reference = None
+        self.live = None
+        self._lock = threading.Lock()
+
+    def update(self, version, features, probabilities):
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self.reference = load_reference(self.registry.version_dir(version), version)
+                self.live = self.reference.empty() if self.reference is not None else None
+            if self.live is not None:
+                self.live.update(features, probabilities)
+
+    def report(self):
+        with self._lock:
+            if self.live is None:
+                return {"model_version": self.version, "rows": 0, "columns": [],
+                        "error": f"no {DRIFT_REFERENCE_FILE} for this model version"}
+            return {"model_version": self.version, "rows": self.live.rows,
+                    "columns": compare(self.reference, self.live), "sketch": self.live.to_dict()}
+
+
+def print_report(rows, top=None):
+    print(f"{'Column':<20}{'PSI':>9}{'KS':>9}{'KS 5%':>9}  Status")
+    for row in rows[:top]:
+        ks = f"{row['ks']:.4f}" if row["ks"] is not None else "-"
+        critical = f"{row['ks_critical']:.4f}" if row["ks"] is not None and row["ks_critical"] is not None else "-"
+        print(f"{row['column']:<20}{row['psi']:>9.4f}{ks:>9}{critical:>9}  {row['status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare scored traffic with the training distribution.")
+    parser.add_argument("inputs", nargs="*", help="customer CSVs to score and sketch, and/or saved sketch .json files")
+    parser.add_argument("--model-dir", default=None, help="artifact directory (default: CHURN_MODEL_DIR)")
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--save", default=None, help="write the merged live sketch here")
+    parser.add_argument("--write-reference", default=None, metavar="CSV",
+                        help=f"build {DRIFT_REFERENCE_FILE} for the current model from this training CSV")
+    args = parser.parse_args()
+
+    from artifacts import ArtifactRegistry
+    from data_ingest import iter_csv_chunks
+
+    registry = ArtifactRegistry(args.model_dir)
+    artifacts = registry.get()
+    pipeline = artifacts.pipeline
+
+    if args.write_reference:
+        from data_ingest import load_telco
+
+        features = pipeline.preprocessor.encode_frame(load_telco(args.write_reference))
+        reference = DriftSketch.fit(features, pipeline.preprocessor.spec(),
+                                    pipeline.predict_proba(pipeline.scale(features)),
+                                    meta={"pipeline_version": artifacts.version})
+        path = os.path.join(registry.artifact_dir, DRIFT_REFERENCE_FILE)
+        reference.save(path)
+        print(f"✅ Drift reference from {reference.rows} rows saved to '{path}'")
+        return
+
+    if not args.inputs:
+        parser.error("give CSVs or sketch files to compare, or --write-reference")
+    reference = load_reference(registry.artifact_dir, artifacts.version)
+    if reference is None:
+        parser.error(f"no {DRIFT_REFERENCE_FILE} for model version {artifacts.version}; "
+                     "build one with --write-reference")
+    live = reference.empty()
+    for path in args.inputs:
+        if path.endswith(".json"):
+            live.merge(DriftSketch.load(path))
+            continue
+        for chunk in iter_csv_chunks(path, args.chunksize, skipinitialspace=True):
+            compact = pipeline.preprocessor.encode_compact(chunk)
+            live.update(pipeline.preprocessor.expand(compact), pipeline.predict_compact(compact))
+    if args.save:
+        live.save(args.save)
+    print(f"{live.rows:,} live rows vs {reference.rows:,} reference rows (model {artifacts.version})\n")
+    print_report(compare(reference, live))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from compiled_model import TREE_BATCH_ROWS, compile_pipeline, load_compiled
+
+# ===============================
+# 🔍 PER-CUSTOMER EXPLANATIONS
+# ===============================
+# Additive per-feature contributions for the compiled model, computed for
+# whole batches with NumPy:
+#
+#   linear  closed form: w_i * (x_i - mean_i), in log-odds
+#   trees   path attribution: every split a row passes credits its feature
+#           with the change in expected score from parent to child, for
+#           all rows and trees at once, level by level
+#
+# The background (training feature means and, for trees, the expected
+# score of every node under the training rows) is computed once when the
+# model is exported and saved as models/churn_explainer.npz, so serving an
+# explanation is one pass over the row's paths. For every row
+#
+#   expected_value + contributions.sum() == the model's raw score
+#
+# (log-odds for logistic models and boosting, churn probability for a
+# single tree or a forest; see Explainer.units). Artifacts exported before
+# this file existed need `python explanations.py --write`.
+
+EXPLAINER_FILE = "churn_explainer.npz"
+EXPLAINER_FORMAT = 1
+TOP_DRIVERS = 3
+
+
+def _logit(p):
+    with np.errstate(divide="ignore"):
+        return np.log(p) - np.log1p(-p)
+
+
+def node_cover(compiled, background):
+    """Background rows reaching each node of a CompiledTrees."""
+    cover = np.zeros(len(compiled.feature), dtype=np.float64)
+    for start in range(0, len(background), TREE_BATCH_ROWS):
+        previous = None
+        for nodes in compiled.descend(background[start:start + TREE_BATCH_ROWS]):
+            visited = nodes if previous is None else nodes[nodes != previous]
+            cover += np.bincount(visited.ravel(), minlength=len(cover))
+            previous = nodes
+    return cover
+
+
+def node_expectation(compiled, cover):
+    """Expected leaf value below every node, weighted by ``cover``; computed bottom-up, one depth at a time."""
+    ids = np.arange(len(compiled.feature))
+    leaf = compiled.left == ids
+    depth = np.full(len(ids), -1)
+    frontier, level = compiled.roots, 0
+    while len(frontier):
+        depth[frontier] = level
+        internal = frontier[~leaf[frontier]]
+        frontier, level = np.concatenate([compiled.left[internal], compiled.right[internal]]), level + 1
+
+    expectation = np.where(leaf, compiled.value, 0.0)
+    for level in range(depth.max(), -1, -1):
+        nodes = ids[(depth == level) & ~leaf]
+        left, right = compiled.left[nodes], compiled.right[nodes]
+        total = cover[left] + cover[right]
+        weighted = (cover[left] * expectation[left] + cover[right] * expectation[right]) / np.maximum(total, 1)
+        # a split no background row reached counts both children equally
+        expectation[nodes] = np.where(total > 0, weighted, 0.5 * (expectation[left] + expectation[right]))
+    return expectation
+
+
+class Explainer:
+    """Per-feature contributions for a compiled model (compiled_model.py)."""
+
+    def __init__(self, compiled, mean, expectation=None, meta=None):
+        self.compiled = compiled
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.meta = dict(meta or {})
+        self.spec = compiled.meta["preprocessor"]
+        self.feature_columns = list(self.spec["feature_columns"])
+        if compiled.kind == "linear":
+            self.link = "logistic"
+            self.expectation = None
+            self.expected_value = float(self.mean @ compiled.weights + compiled.bias)
+        else:
+            if expectation is None:
+                raise ValueError("tree models need node expectations from Explainer.fit")
+            self.link = compiled.link
+            self.expectation = np.asarray(expectation, dtype=np.float64)
+            if len(self.expectation) != len(compiled.feature):
+                raise ValueError("explainer background does not match the compiled model")
+            self.expected_value = float(compiled.base + compiled.factor * self.expectation[compiled.roots].sum())
+
+    @classmethod
+    def fit(cls, compiled, background):
+        """Background statistics from encoded (unscaled) training rows."""
+        background = np.asarray(background, dtype=np.float64)
+        meta = {"background_rows": len(background)}
+        if compiled.kind == "linear":
+            return cls(compiled, background.mean(axis=0), meta=meta)
+        return cls(compiled, background.mean(axis=0), node_expectation(compiled, node_cover(compiled, background)), meta)
+
+    @property
+    def units(self):
+        return "log-odds" if self.link == "logistic" else "probability"
+
+    def _tree_contributions(self, features):
+        compiled, expectation = self.compiled, self.expectation
+        n, n_features = len(features), len(self.feature_columns)
+        out = np.zeros(n * n_features, dtype=np.float64)
+        offsets = (np.arange(n) * n_features)[:, None]
+        previous = None
+        for nodes in compiled.descend(features):
+            if previous is not None:
+                out += np.bincount((offsets + compiled.feature[previous]).ravel(),
+                                   weights=(expectation[nodes] - expectation[previous]).ravel(),
+                                   minlength=len(out))
+            previous = nodes
+        return compiled.factor * out.reshape(n, n_features)
+
+    def contributions(self, features):
+        """(n, n_features) contributions for encoded, unscaled rows, in ``units``."""
+        features = np.asarray(features, dtype=np.float64)
+        if self.compiled.kind == "linear":
+            return (features - self.mean) * self.compiled.weights
+        return np.concatenate([self._tree_contributions(features[start:start + TREE_BATCH_ROWS])
+                               for start in range(0, len(features), TREE_BATCH_ROWS)]
+                              or [np.empty((0, len(self.feature_columns)))])
+
+    def additivity_error(self, features):
+        """Largest |expected_value + sum(contributions) - raw score| over ``features``."""
+        prob = self.compiled.predict_proba(features)
+        raw = _logit(prob) if self.link == "logistic" else prob
+        error = np.abs(self.expected_value + self.contributions(features).sum(axis=1) - raw)
+        return float(error[np.isfinite(raw)].max(initial=0.0))  # p of exactly 0 or 1 has no finite log-odds
+
+    @staticmethod
+    def top_drivers(contributions, k=TOP_DRIVERS):
+        """Column indices and values of the ``k`` largest |contributions| per row."""
+        order = np.argsort(-np.abs(contributions), axis=1, kind="stable")[:, :k]
+        return order, np.take_along_axis(contributions, order, axis=1)
+
+    def value_label(self, feature, value):
+        """Readable raw value of an encoded feature."""
+        if feature in self.spec["categories"]:
+            return self.spec["categories"][feature][int(value)]
+        if feature == "SeniorCitizen":
+            return "Yes" if value else "No"
+        if feature in ("TenureGroup", "ChargesGroup"):
+            bins = self.spec["tenure_bins" if feature == "TenureGroup" else "charges_bins"]
+            return f"{bins[int(value)]}–{bins[int(value) + 1]}"
+        return f"{value:,.2f}"
+
+    def explain_row(self, row, k=TOP_DRIVERS):
+        """Top ``k`` drivers of one encoded row as dicts (feature, value, contribution)."""
+        row = np.asarray(row, dtype=np.float64).reshape(1, -1)
+        order, values = self.top_drivers(self.contributions(row), k)
+        return [{"feature": self.feature_columns[j], "value": self.value_label(self.feature_columns[j], row[0, j]),
+                 "contribution": float(c)} for j, c in zip(order[0], values[0])]
+
+
+def save_explainer(explainer, path, pipeline_version=None):
+    meta = dict(explainer.meta, format=EXPLAINER_FORMAT, kind=explainer.compiled.kind,
+                pipeline_version=pipeline_version)
+    arrays = {"mean": explainer.mean}
+    if explainer.expectation is not None:
+        arrays["expectation"] = explainer.expectation
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp_path, path)
+
+
+def read_explainer(path, compiled):
+    """Load saved background statistics for ``compiled``; plain arrays, no pickle."""
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+    meta = json.loads(str(arrays.pop("meta")))
+    if meta.get("format") != EXPLAINER_FORMAT:
+        raise ValueError(f"unsupported explainer format {meta.get('format')!r}")
+    if meta.get("kind") != compiled.kind:
+        raise ValueError("explainer background does not match the compiled model")
+    return Explainer(compiled, arrays["mean"], arrays.get("expectation"), meta)
+
+
+def load_explainer(artifact_dir, compiled, version=None, mean=None):
+    """Explainer for ``compiled`` from the artifact directory's churn_explainer.npz
+    when it matches ``version``; a linear model can instead use the scaler
+    ``mean`` (the training mean). None when neither is available."""
+    path = os.path.join(artifact_dir, EXPLAINER_FILE) if artifact_dir else None
+    if path and os.path.exists(path):
+        try:
+            explainer = read_explainer(path, compiled)
+        except ValueError:
+            explainer = None
+        if explainer is not None and (version is None or explainer.meta.get("pipeline_version") == version):
+            return explainer
+    if compiled.kind == "linear" and mean is not None:
+        return Explainer(compiled, mean)
+    return None
+
+
+def pipeline_explainer(pipeline, artifact_dir=None, version=None):
+    """Explainer for a loaded ChurnPipeline, or None when its model cannot be compiled
+    or has no saved background."""
+    try:
+        compiled = compile_pipeline(pipeline)
+    except TypeError:
+        return None
+    return load_explainer(artifact_dir, compiled, version, pipeline.scaler.mean_)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Explain churn scores per customer, or build the explainer background.")
+    parser.add_argument("--model-dir", default=None, help="artifact directory (default: CHURN_MODEL_DIR)")
+    parser.add_argument("--data", default=None, help="CSV to explain or to build the background from (default: the bundled export)")
+    parser.add_argument("--rows", type=int, default=5, help="customers to explain")
+    parser.add_argument("--top", type=int, default=TOP_DRIVERS, help="drivers per customer")
+    parser.add_argument("--write", action="store_true", help=f"build {EXPLAINER_FILE} from --data and save it")
+    args = parser.parse_args()
+
+    from artifacts import ArtifactRegistry
+    from compiled_model import COMPILED_FILE
+    from data_ingest import load_telco
+
+    registry = ArtifactRegistry(args.model_dir)
+    artifacts = registry.get()
+    df = load_telco(args.data)
+    features = artifacts.pipeline.preprocessor.encode_frame(df)
+
+    if args.write:
+        compiled_path = os.path.join(registry.artifact_dir, COMPILED_FILE)
+        compiled = load_compiled(compiled_path) if os.path.exists(compiled_path) else None
+        if compiled is None or compiled.meta.get("pipeline_version") != artifacts.version:
+            compiled = compile_pipeline(artifacts.pipeline)
+        explainer = Explainer.fit(compiled, features)
+        path = os.path.join(registry.artifact_dir, EXPLAINER_FILE)
+        save_explainer(explainer, path, artifacts.version)
+        print(f"✅ Explainer background from {len(features)} rows saved to '{path}' "
+              f"(max additivity error {explainer.additivity_error(features):.1e})")
+        return
+
+    explainer = pipeline_explainer(artifacts.pipeline, registry.artifact_dir, artifacts.version)
+    if explainer is None:
+        raise SystemExit("❌ No explainer for this model; build one with `python explanations.py --write`")
+    contributions = explainer.contributions(features)
+    ranking = np.argsort(-np.abs(contributions).mean(axis=0))
+    print(f"Mean |contribution| over {len(features)} customers ({explainer.units}):")
+    for j in ranking[:10]:
+        print(f"  {explainer.feature_columns[j]:<20}{np.abs(contributions[:, j]).mean():.4f}")
+    ids = df["customerID"].to_numpy() if "customerID" in df else np.arange(len(df))
+    for i in range(min(args.rows, len(features))):
+        drivers = explainer.explain_row(features[i], args.top)
+        print(f"\n{ids[i]}: " + ", ".join(f"{d['feature']}={d['value']} ({d['contribution']:+.3f})" for d in drivers))
+
+
+if __name__ == "__main__":
+    main()
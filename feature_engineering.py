@@ -0,0 +1,95 @@
+import math
+
+import numpy as np
+
+# ===============================
+# 🧮 ENGINEERED FEATURES
+# ===============================
+# AvgMonthlyCharges, TenureGroup and ChargesGroup from raw tenure and
+# charges, shared by training (ChurnPreprocessor), batch scoring (its
+# compact path) and the UI / lightweight inference (RowEncoder).
+#
+# The groups are pd.cut codes over right-closed bins with integer edges, so
+# every value in (k - 1, k] falls in the same group as k: the code is one
+# index into a table over ceil(value) -- 0..72 for tenure -- instead of a
+# search over the bin edges. Values outside the bins (and NaN) land on the
+# table's last slot, which holds the fitted fill, so no separate fillna pass
+# is needed. Feature matrices are row-major, so the columns are strided:
+# derive() works through them in cache-sized row blocks, making one trip
+# through memory instead of one per column operation.
+
+# pd.cut bins used at training time: right-closed, anything outside -> NaN.
+TENURE_BINS = [0, 12, 24, 48, 72]
+CHARGES_BINS = [0, 35, 70, 105, 120]
+
+DERIVE_BLOCK_ROWS = 8192
+
+
+def bin_table(bins, fill=np.nan):
+    """Group code per ceil(value) for 0..bins[-1], then ``fill`` for anything outside."""
+    if any(int(edge) != edge for edge in bins) or bins[0] < 0:
+        raise ValueError(f"bin lookup tables need non-negative integer edges, got {bins}")
+    table = np.empty(int(bins[-1]) + 2, dtype=np.float64)
+    edges = np.arange(int(bins[-1]) + 1)
+    table[:-1] = np.searchsorted(bins, edges, side="left") - 1
+    table[:-1][edges <= bins[0]] = fill
+    table[-1] = fill
+    return table
+
+
+def table_index(values, table_size):
+    """Index of each value into a bin_table: ceil(value), with NaN / out of range -> the last slot."""
+    index = np.ceil(values)
+    index[~(index >= 0) | (index >= table_size - 1)] = table_size - 1
+    return index.astype(np.intp)
+
+
+def bin_codes(values, bins):
+    """Vectorized ``pd.cut(values, bins, labels=range(...))``; NaN outside the bins."""
+    table = bin_table(bins)
+    return table[table_index(np.asarray(values, dtype=np.float64), len(table))]
+
+
+class FeatureEngineer:
+    """Engineered columns for encoded rows, with the fitted fills baked into the tables."""
+
+    def __init__(self, fill_values, tenure_bins=TENURE_BINS, charges_bins=CHARGES_BINS):
+        self.total_fill = float(fill_values["TotalCharges"])
+        self.tenure_table = bin_table(tenure_bins, fill_values["TenureGroup"])
+        self.charges_table = bin_table(charges_bins, fill_values["ChargesGroup"])
+
+    @classmethod
+    def from_spec(cls, spec):
+        return cls(spec["fill_values"], spec["tenure_bins"], spec["charges_bins"])
+
+    def derive(self, out, index):
+        """Fill blank TotalCharges and compute the engineered columns of ``out`` (n, n_features), in place."""
+        for start in range(0, len(out), DERIVE_BLOCK_ROWS):
+            self._derive_block(out[start:start + DERIVE_BLOCK_ROWS], index)
+        return out
+
+    def _derive_block(self, out, index):
+        total = out[:, index["TotalCharges"]]
+        total[np.isnan(total)] = self.total_fill
+        tenure = out[:, index["tenure"]]
+        np.divide(total, tenure + 1, out=out[:, index["AvgMonthlyCharges"]])
+        out[:, index["TenureGroup"]] = self.tenure_table[table_index(tenure, len(self.tenure_table))]
+        charges = out[:, index["MonthlyCharges"]]
+        out[:, index["ChargesGroup"]] = self.charges_table[table_index(charges, len(self.charges_table))]
+
+    @staticmethod
+    def _lookup(table, value):
+        if not 0 <= value < len(table) - 1:  # also False for NaN
+            return table[-1]
+        return table[math.ceil(value)]
+
+    def derive_row(self, out, index):
+        """derive() for a single encoded row (1-D), without array temporaries."""
+        total = out[index["TotalCharges"]]
+        if total != total:
+            total = out[index["TotalCharges"]] = self.total_fill
+        tenure = out[index["tenure"]]
+        out[index["AvgMonthlyCharges"]] = total / (tenure + 1)
+        out[index["TenureGroup"]] = self._lookup(self.tenure_table, tenure)
+        out[index["ChargesGroup"]] = self._lookup(self.charges_table, out[index["MonthlyCharges"]])
+        return out
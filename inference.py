@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from artifacts import default_artifact_dir, resolve_artifact_dir
+from compiled_model import COMPILED_FILE, load_compiled
+from feature_engineering import FeatureEngineer
+from retention_policy import DEFAULT_THRESHOLD, TIER_NAMES, assign_tiers
+
+# ===============================
+# 🪶 LIGHTWEIGHT INFERENCE
+# ===============================
+# Single-customer scoring with nothing but NumPy: the exported
+# churn_compiled.npz carries the compiled model *and* the fitted encoding
+# (category levels, fills, bins), so serving never unpickles the pipeline
+# and never imports pandas, scikit-learn or XGBoost. Meant for
+# containers that scale out and must answer quickly after a cold start:
+#
+#   python inference.py customer.json     # or JSON on stdin
+#
+# Artifacts exported before the encoding was stored in the compiled file
+# need a `python compiled_model.py --write` first.
+
+
+def default_model_path(artifact_dir=None):
+    return os.path.join(resolve_artifact_dir(artifact_dir or default_artifact_dir()), COMPILED_FILE)
+
+
+class RowEncoder:
+    """One customer dict -> unscaled feature row, from ChurnPreprocessor.spec().
+
+    Pure Python + NumPy; ChurnPreprocessor.encode_row delegates here, so
+    the lightweight path and the full pipeline share one implementation.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.raw_columns = list(spec["raw_columns"])
+        self.feature_columns = list(spec["feature_columns"])
+        self.fill_values = dict(spec["fill_values"])
+        self.engineer = FeatureEngineer.from_spec(spec)
+        self._lookups = {
+            col: {level: float(code) for code, level in enumerate(levels)}
+            for col, levels in spec["categories"].items()
+        }
+        self._index = {col: i for i, col in enumerate(self.feature_columns)}
+
+    def encode_row(self, record, out=None):
+        if out is None:
+            out = np.empty(len(self.feature_columns), dtype=np.float64)
+        lookups = self._lookups
+        for i, col in enumerate(self.raw_columns):
+            value = record[col]
+            if col in lookups:
+                try:
+                    out[i] = lookups[col][value]
+                except KeyError:
+                    raise ValueError(f"Unknown value in column '{col}': {value!r}") from None
+            else:
+                try:
+                    out[i] = float(value)
+                except (TypeError, ValueError):
+                    if col != "TotalCharges":
+                        raise
+                    out[i] = np.nan
+        return self.engineer.derive_row(out, self._index)
+
+    def encode_records(self, records):
+        out = np.empty((len(records), len(self.feature_columns)), dtype=np.float64)
+        for i, record in enumerate(records):
+            self.encode_row(record, out[i])
+        return out
+
+
+class InferenceModel:
+    """Compiled model + row encoder loaded from one .npz file."""
+
+    def __init__(self, compiled, encoder):
+        self.compiled = compiled
+        self.encoder = encoder
+        self.version = compiled.meta.get("pipeline_version")
+        self.model_name = compiled.meta.get("model_name")
+
+    @classmethod
+    def load(cls, path):
+        compiled = load_compiled(path)
+        spec = compiled.meta.get("preprocessor")
+        if spec is None:
+            raise ValueError(f"'{path}' has no stored encoding; re-export it with `python compiled_model.py --write`")
+        return cls(compiled, RowEncoder(spec))
+
+    @property
+    def feature_columns(self):
+        return self.encoder.feature_columns
+
+    @property
+    def categories(self):
+        return self.encoder.spec["categories"]
+
+    def predict_proba(self, features):
+        """Churn probability for encoded (unscaled) rows."""
+        return self.compiled.predict_proba(features)
+
+    def predict_row(self, record):
+        return float(self.compiled.predict_proba(self.encoder.encode_row(record).reshape(1, -1))[0])
+
+    def predict_records(self, records):
+        return self.compiled.predict_proba(self.encoder.encode_records(records))
+
+
+def load_inference_model(artifact_dir=None):
+    return InferenceModel.load(default_model_path(artifact_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score customers with the compiled model only (NumPy, no pandas/sklearn).")
+    parser.add_argument("input", nargs="?", help="JSON customer or list of customers (default: stdin)")
+    parser.add_argument("--model-dir", default=None, help=f"directory holding {COMPILED_FILE} (default: CHURN_MODEL_DIR)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model = load_inference_model(args.model_dir)
+    loaded = time.perf_counter()
+    if args.input:
+        with open(args.input) as f:
+            payload = json.load(f)
+    else:
+        payload = json.load(sys.stdin)
+    records = payload if isinstance(payload, list) else [payload]
+    churn_prob = model.predict_records(records)
+    for prob, tier in zip(churn_prob, assign_tiers(churn_prob)):
+        print(json.dumps({"churn_probability": round(float(prob), 6), "prediction": int(prob > DEFAULT_THRESHOLD),
+                          "retention_tier": TIER_NAMES[tier]}))
+    print(f"model {model.model_name} ({model.version}) loaded in {(loaded - start) * 1000:.1f} ms, "
+          f"{len(records)} scored in {(time.perf_counter() - loaded) * 1000:.2f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
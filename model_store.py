@@ -0,0 +1,304 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+
+from artifacts import (BASE_DIR, CURRENT_FILE, PIPELINE_FILES, VERSIONS_DIR, ArtifactRegistry, current_version,
+                       default_artifact_dir)
+from retention_policy import DEFAULT_THRESHOLD
+
+# ===============================
+# 🏆 MODEL VERSIONS & PROMOTION
+# ===============================
+# Every export becomes an immutable models/versions/<pipeline version>/
+# directory: the artifacts are written to a staging directory and renamed
+# into place whole. The new model (challenger) is then scored against the
+# one being served (champion) on the same holdout rows, and CURRENT is
+# switched to it -- one os.replace -- only if it is strictly better:
+#
+#   challenger ROC-AUC > champion ROC-AUC + CHURN_PROMOTION_MARGIN
+#
+# Versions are ChurnPipeline.content_version(), a hash of the fitted
+# preprocessor, scaler and model (not of the pickle bytes), so retraining to
+# the same fit, or restoring it from a cache, gives the champion's own
+# version back; that is reported as identical and nothing is switched or
+# rewritten.
+#
+# Both models score the raw holdout through their own preprocessing, so a
+# champion fitted on different category levels or fills is still compared
+# fairly. The champion's holdout scores are cached per (champion version,
+# holdout hash), so repeated retrains against the same champion score only
+# the challenger. Running ArtifactRegistry instances swap to a promoted
+# version on their next check (artifacts.py).
+#
+#   python model_store.py list
+#   python model_store.py promote <version>
+#   python model_store.py rollback
+
+PROMOTION_MARGIN = float(os.environ.get("CHURN_PROMOTION_MARGIN", "0.0"))
+KEEP_VERSIONS = int(os.environ.get("CHURN_KEEP_VERSIONS", "5"))
+PROMOTION_METRIC = "ROC-AUC"
+PROMOTION_FILE = "promotion.json"
+PROMOTION_LOG = "promotions.jsonl"
+
+HOLDOUT_CACHE_DIR = os.path.join(BASE_DIR, ".cache", "holdout")
+MAX_CACHED_SCORES = 16
+
+
+def versions_dir(model_dir):
+    return os.path.join(model_dir, VERSIONS_DIR)
+
+
+def new_staging_dir(model_dir):
+    path = os.path.join(versions_dir(model_dir), f".staging-{os.getpid()}-{time.time_ns()}")
+    os.makedirs(path)
+    return path
+
+
+def commit_version(model_dir, staging, version):
+    """Move a finished staging directory to versions/<version>; an identical export already there wins."""
+    path = os.path.join(versions_dir(model_dir), version)
+    try:
+        os.rename(staging, path)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+        shutil.rmtree(staging, ignore_errors=True)
+    return path
+
+
+def promote(model_dir, version, reason="manual"):
+    """Point CURRENT at ``version`` atomically and log the switch."""
+    if not os.path.isdir(os.path.join(versions_dir(model_dir), version)):
+        raise ValueError(f"no model version {version!r} in {versions_dir(model_dir)}")
+    previous = current_version(model_dir)
+    tmp_path = os.path.join(model_dir, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(model_dir, CURRENT_FILE))
+    with open(os.path.join(model_dir, PROMOTION_LOG), "a") as f:
+        f.write(json.dumps({"version": version, "previous": previous, "reason": reason,
+                            "promoted_at": time.strftime("%Y-%m-%dT%H:%M:%S")}) + "\n")
+    return previous
+
+
+def promotion_log(model_dir):
+    try:
+        with open(os.path.join(model_dir, PROMOTION_LOG)) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def rollback_target(model_dir):
+    """The version ``rollback`` returns to, or None.
+
+    The log is replayed as a stack: a promotion pushes, a rollback pops
+    the promotion it undid, so repeated rollbacks keep walking back.
+    """
+    stack = []
+    for entry in promotion_log(model_dir):
+        if entry["reason"] != "rollback":
+            stack.append(entry)
+        elif stack:
+            stack.pop()
+    return stack[-1]["previous"] if stack else None
+
+
+def list_versions(model_dir):
+    """Saved versions, oldest first, with the promotion record written at export."""
+    root = versions_dir(model_dir)
+    if not os.path.isdir(root):
+        return []
+    current = current_version(model_dir)
+    rows = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name.startswith(".") or not os.path.isdir(path):
+            continue
+        try:
+            with open(os.path.join(path, PROMOTION_FILE)) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            record = {}
+        rows.append({"version": name, "path": path, "mtime": os.path.getmtime(path),
+                     "current": name == current, "record": record})
+    return sorted(rows, key=lambda row: row["mtime"])
+
+
+def prune_versions(model_dir, keep=KEEP_VERSIONS):
+    """Delete all but the ``keep`` newest versions; the current one and the rollback target stay."""
+    protected = {current_version(model_dir), rollback_target(model_dir)}
+    versions = [row for row in list_versions(model_dir) if row["version"] not in protected]
+    removed = versions[:max(0, len(versions) - keep)]
+    for row in removed:
+        shutil.rmtree(row["path"], ignore_errors=True)
+    return [row["version"] for row in removed]
+
+
+def holdout_metrics(y_true, proba, threshold=DEFAULT_THRESHOLD):
+    """training_engine.evaluate_model's metrics, from probabilities."""
+    y_true = np.asarray(y_true)
+    y_pred = (proba > threshold).astype(int)
+    return {
+        'Accuracy': accuracy_score(y_true, y_pred),
+        'Precision': precision_score(y_true, y_pred, zero_division=0),
+        'Recall': recall_score(y_true, y_pred),
+        'F1-Score': f1_score(y_true, y_pred),
+        'ROC-AUC': roc_auc_score(y_true, proba),
+    }
+
+
+def holdout_key(holdout, y_holdout):
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(holdout, index=False).to_numpy().tobytes())
+    digest.update(np.asarray(y_holdout, dtype=np.int8).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def cached_scores(artifacts, holdout, key, cache_dir=None):
+    """Churn probabilities of ``artifacts`` on the holdout, from .cache/holdout when scored before."""
+    cache_dir = cache_dir or os.environ.get("CHURN_HOLDOUT_CACHE_DIR", HOLDOUT_CACHE_DIR)
+    path = os.path.join(cache_dir, f"{key}-{artifacts.version}.npy")
+    if os.path.exists(path):
+        return np.load(path), True
+    proba = artifacts.pipeline.predict_frame(holdout)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, proba)
+    os.replace(tmp_path, path)
+    entries = sorted((os.path.join(cache_dir, name) for name in os.listdir(cache_dir)), key=os.path.getmtime)
+    for stale in entries[:-MAX_CACHED_SCORES]:
+        os.remove(stale)
+    return proba, False
+
+
+def load_champion(model_dir):
+    """``(artifacts, error)`` for the model ``model_dir`` serves now.
+
+    Both are None when it holds no model yet. A champion that can't be
+    loaded (missing or truncated files, a pickle from another library
+    version) gives ``(None, "<error>")`` so the caller can record why.
+    """
+    try:
+        return ArtifactRegistry(model_dir).get(), None
+    except FileNotFoundError:
+        if current_version(model_dir) is None:
+            return None, None
+        error = f"CURRENT names {current_version(model_dir)!r}, whose files are missing"
+    except Exception as e:  # unpickling fails in many ways: EOFError, ModuleNotFoundError, AttributeError, ...
+        error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+    return None, error
+
+
+def challenge(challenger, holdout, y_holdout, champion, margin=PROMOTION_MARGIN, cache_dir=None, version=None):
+    """Score challenger and champion on the holdout; ``promote`` says whether the challenger should serve.
+
+    ``version`` is the challenger's saved version; a challenger identical
+    to the champion is never promoted over it, and a tie keeps the champion.
+    """
+    decision = {"metric": PROMOTION_METRIC, "margin": margin, "holdout_rows": len(holdout),
+                "challenger": holdout_metrics(y_holdout, challenger.predict_frame(holdout)),
+                "champion_version": None, "champion": None}
+    if champion is None:
+        return dict(decision, promote=True, reason="no champion")
+    decision["champion_version"] = champion.version
+    if version is not None and version == champion.version:
+        return dict(decision, champion=decision["challenger"], promote=False, reason="identical to the champion")
+    try:
+        proba, cache_hit = cached_scores(champion, holdout, holdout_key(holdout, y_holdout), cache_dir)
+    except ValueError as e:  # e.g. category levels the champion never saw
+        return dict(decision, promote=True, reason=f"champion cannot score the holdout: {e}")
+    decision["champion"] = holdout_metrics(y_holdout, proba)
+    decision["champion_cache_hit"] = cache_hit
+    gain = decision["challenger"][PROMOTION_METRIC] - decision["champion"][PROMOTION_METRIC]
+    if gain > margin:
+        return dict(decision, promote=True, reason=f"{PROMOTION_METRIC} {gain:+.4f} vs. champion")
+    return dict(decision, promote=False, reason=f"{PROMOTION_METRIC} {gain:+.4f} vs. champion (margin {margin:+.4f})")
+
+
+def publish(model_dir, pipeline, holdout, y_holdout, write_artifacts=None, force=False, margin=PROMOTION_MARGIN,
+            record=None):
+    """Save ``pipeline`` as a new version and promote it if it beats the champion.
+
+    ``write_artifacts(out_dir, version)`` adds the derived files (compiled
+    model, explainer, drift reference) before the version becomes visible.
+    ``record`` adds details of the run to promotion.json; kept out of the
+    pipeline so they don't change its version. Returns ``(version
+    directory, decision)``; an export identical to a saved version reuses
+    that directory.
+    """
+    champion, champion_error = load_champion(model_dir)
+    os.makedirs(versions_dir(model_dir), exist_ok=True)
+    staging = new_staging_dir(model_dir)
+    try:
+        version = pipeline.save(os.path.join(staging, PIPELINE_FILES["pipeline"]))
+        if write_artifacts is not None:
+            write_artifacts(staging, version)
+        decision = challenge(pipeline, holdout, y_holdout, champion, margin, version=version)
+        if champion_error:
+            decision.update(champion_error=champion_error, reason=f"champion could not be loaded ({champion_error})")
+        if force and not decision["promote"] and decision["champion_version"] != version:
+            decision.update(promote=True, reason=f"forced ({decision['reason']})")
+        decision.update(record or {}, version=version, created_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        with open(os.path.join(staging, PROMOTION_FILE), "w") as f:
+            json.dump(decision, f, indent=2)
+        path = commit_version(model_dir, staging, version)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if decision["promote"]:
+        promote(model_dir, version, decision["reason"])
+    prune_versions(model_dir)
+    return path, decision
+
+
+def print_decision(decision):
+    print(f"\n{'':<12}{'Version':<14}" + "".join(f"{metric:>11}" for metric in decision["challenger"]))
+    for role in ("champion", "challenger"):
+        metrics = decision[role]
+        if metrics is None:
+            continue
+        version = decision["champion_version"] if role == "champion" else decision["version"]
+        print(f"{role.title():<12}{version:<14}" + "".join(f"{value:>11.4f}" for value in metrics.values()))
+    verdict = "✅ Promoted" if decision["promote"] else "⏸️ Kept the champion"
+    print(f"{verdict}: {decision['reason']} on {decision['holdout_rows']:,} holdout rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List, promote or roll back versioned churn models.")
+    parser.add_argument("command", choices=["list", "promote", "rollback"])
+    parser.add_argument("version", nargs="?", help="version to promote")
+    parser.add_argument("--model-dir", default=None, help="versioned model directory (default: CHURN_MODEL_DIR or models/)")
+    args = parser.parse_args()
+    model_dir = args.model_dir or default_artifact_dir()
+
+    if args.command == "list":
+        for row in list_versions(model_dir):
+            record = row["record"]
+            auc = record.get("challenger", {}).get(PROMOTION_METRIC)
+            print(f"{'*' if row['current'] else ' '} {row['version']}  {record.get('created_at', '-'):<20}"
+                  f"{'-' if auc is None else f'{auc:.4f}':>8}  {record.get('reason', '')}")
+        return
+    if args.command == "promote":
+        if not args.version:
+            parser.error("promote needs a version")
+        previous = promote(model_dir, args.version)
+    else:
+        target = rollback_target(model_dir)
+        if not target:
+            raise SystemExit("❌ Nothing to roll back to")
+        previous = promote(model_dir, target, reason="rollback")
+    print(f"✅ CURRENT: {previous} -> {current_version(model_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from artifacts import ArtifactRegistry
+from batch_scoring import DEFAULT_CHUNKSIZE, READ_OPTIONS, read_chunks, result_frame
+from churn_pipeline import CODE_COLUMNS, ID_COLUMN, VALUE_COLUMNS, CompactFeatures
+from training_engine import limit_threads
+
+# ===============================
+# 🧵 PARALLEL BATCH SCORING
+# ===============================
+# The parent encodes each chunk once into shared-memory CompactFeatures
+# blocks (int8 codes, float32 numerics); pool workers attach to them by
+# name, score fixed row ranges and write the probabilities into a shared
+# output vector. Tasks carry only (start, stop), so no feature data is
+# pickled per task, and every range lands at its own offset, which keeps
+# the input row order.
+
+DEFAULT_BLOCK_ROWS = 32_768
+
+_worker = {}
+
+
+# (name, dtype, columns per row; None for a vector) of each shared block
+SHARED_BLOCKS = (
+    ("codes", np.int8, len(CODE_COLUMNS)),
+    ("values", np.float32, len(VALUE_COLUMNS)),
+    ("output", np.float64, None),
+)
+
+
+def _block_shape(capacity, columns):
+    return (capacity,) if columns is None else (capacity, columns)
+
+
+def _attach(name, dtype, shape):
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _init_worker(pipeline, block_names, capacity):
+    # One model thread per worker process; the pool provides the parallelism.
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+    limit_threads(pipeline.model, 1)
+    _worker["pipeline"] = pipeline
+    for (key, dtype, columns), name in zip(SHARED_BLOCKS, block_names):
+        _worker[key] = _attach(name, dtype, _block_shape(capacity, columns))
+
+
+def _score_range(start, stop):
+    compact = CompactFeatures(_worker["codes"][1][start:stop], _worker["values"][1][start:stop])
+    _worker["output"][1][start:stop] = _worker["pipeline"].predict_compact(compact)
+    return stop - start
+
+
+class ParallelScorer:
+    """Score CompactFeatures across a process pool via shared memory.
+
+    Use as a context manager; the pool and the shared blocks (codes,
+    numerics and output, sized for ``capacity`` rows) live until
+    ``close()``. With ``workers=1`` scoring runs inline, which is the
+    baseline to compare against.
+    """
+
+    def __init__(self, pipeline, workers=None, capacity=DEFAULT_CHUNKSIZE, block_rows=DEFAULT_BLOCK_ROWS):
+        self.pipeline = pipeline
+        self.workers = workers or os.cpu_count() or 1
+        self.capacity = capacity
+        self.block_rows = block_rows
+        self._pool = None
+        self._blocks = []
+        self._arrays = {}
+
+    def __enter__(self):
+        if self.workers > 1:
+            for key, dtype, columns in SHARED_BLOCKS:
+                shape = _block_shape(self.capacity, columns)
+                block = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * np.dtype(dtype).itemsize)
+                self._blocks.append(block)
+                self._arrays[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=(self.pipeline, [block.name for block in self._blocks], self.capacity))
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self._arrays = {}
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def score(self, compact):
+        """Churn probabilities for CompactFeatures, in input order."""
+        if self._pool is None:
+            return self.pipeline.predict_compact(compact)
+        result = np.empty(len(compact), dtype=np.float64)
+        for offset in range(0, len(compact), self.capacity):
+            part = compact[offset:offset + self.capacity]
+            n = len(part)
+            self._arrays["codes"][:n] = part.codes
+            self._arrays["values"][:n] = part.values
+            # About 4 ranges per worker evens out stragglers without tiny tasks.
+            step = max(1, min(self.block_rows, -(-n // (self.workers * 4))))
+            ranges = [(start, min(start + step, n)) for start in range(0, n, step)]
+            list(self._pool.map(_score_range, *zip(*ranges)))
+            result[offset:offset + n] = self._arrays["output"][:n]
+        return result
+
+
+def score_csv_parallel(source, destination, artifacts=None, workers=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Like batch_scoring.score_csv, with each chunk scored across ``workers`` processes."""
+    artifacts = artifacts or ArtifactRegistry().get()
+    pipeline = artifacts.pipeline
+    start = time.perf_counter()
+    rows = churners = 0
+    header = True
+    with ParallelScorer(pipeline, workers, capacity=chunksize) as scorer:
+        for chunk in read_chunks(source, chunksize):
+            churn_prob = scorer.score(pipeline.preprocessor.encode_compact(chunk))
+            result = result_frame(churn_prob, chunk[ID_COLUMN].to_numpy() if ID_COLUMN in chunk else None)
+            result.to_csv(destination, mode="w" if header else "a", header=header, index=False)
+            header = False
+            rows += len(result)
+            churners += int(result["prediction"].sum())
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "churners": churners,
+        "workers": scorer.workers,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else 0.0,
+        "model_version": artifacts.version,
+    }
+
+
+def throughput_report(pipeline, features, worker_counts, capacity=DEFAULT_CHUNKSIZE, repeats=3):
+    """rows/sec of ParallelScorer.score on CompactFeatures ``features`` for each worker count.
+
+    Pool start-up is excluded; every run is checked against the inline scores.
+    """
+    expected = None
+    report = []
+    for workers in worker_counts:
+        with ParallelScorer(pipeline, workers, capacity=min(capacity, len(features))) as scorer:
+            scorer.score(features[:1000])  # warm the workers
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                scores = scorer.score(features)
+                times.append(time.perf_counter() - start)
+        if expected is None:
+            expected = scores
+        seconds = float(np.median(times))
+        report.append({
+            "workers": workers,
+            "rows": len(features),
+            "seconds": seconds,
+            "rows_per_second": len(features) / seconds,
+            "matches_first_run": bool(np.allclose(scores, expected, rtol=0, atol=1e-12)),
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a customer CSV across worker processes.")
+    parser.add_argument("input", help="CSV shaped like Telco-Customer-Churn-data.csv")
+    parser.add_argument("output", nargs="?", help="Where to write customerID,churn_probability,prediction,retention_tier")
+    parser.add_argument("--workers", default=str(os.cpu_count() or 1),
+                        help="worker count, or a comma-separated list with --report (default: all cores)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--model-dir", default=None, help="Directory holding the .pkl artifacts")
+    parser.add_argument("--report", action="store_true",
+                        help="measure rows/sec for each --workers count instead of writing scores")
+    parser.add_argument("--report-json", default=None, help="also write the throughput report here")
+    args = parser.parse_args()
+
+    artifacts = ArtifactRegistry(args.model_dir).get()
+    worker_counts = [int(w) for w in args.workers.split(",")]
+
+    if args.report:
+        from data_ingest import read_csv_typed
+
+        features = artifacts.pipeline.preprocessor.encode_compact(read_csv_typed(args.input, **READ_OPTIONS))
+        report = throughput_report(artifacts.pipeline, features, worker_counts, args.chunksize)
+        print(f"{'Workers':>8}{'Rows':>12}{'Seconds':>10}{'Rows/s':>14}{'Speedup':>9}  Same scores")
+        for row in report:
+            print(f"{row['workers']:>8}{row['rows']:>12,}{row['seconds']:>10.3f}{row['rows_per_second']:>14,.0f}"
+                  f"{row['rows_per_second'] / report[0]['rows_per_second']:>9.2f}  {row['matches_first_run']}")
+        if args.report_json:
+            with open(args.report_json, "w") as f:
+                json.dump({"cpu_count": os.cpu_count(), "model_version": artifacts.version, "results": report}, f, indent=1)
+        return
+
+    if not args.output:
+        parser.error("output is required unless --report is given")
+    summary = score_csv_parallel(args.input, args.output, artifacts, worker_counts[0], args.chunksize)
+    print(f"✅ Scored {summary['rows']} customers ({summary['churners']} likely to churn) with "
+          f"{summary['workers']} worker(s) in {summary['seconds']:.2f}s — {summary['rows_per_second']:.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,382 +1,390 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
-from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.tree import DecisionTreeClassifier
-from sklearn.metrics import (accuracy_score, precision_score, recall_score,
-                             f1_score, roc_auc_score, confusion_matrix,
+from sklearn.metrics import (roc_auc_score, confusion_matrix,
                              classification_report, roc_curve)
 import xgboost as xgb
+import churn_pipeline
+import cross_validation
+import report_plots
+import retention_policy
+import training_engine
+from churn_pipeline import CATEGORICAL_COLUMNS, NUMERIC_COLUMNS, ChurnPipeline, ChurnPreprocessor
+from compiled_model import COMPILED_FILE, check_parity, compile_pipeline, save_compiled
+from cross_validation import CV_FOLDS, CV_REPEATS, cross_validate
+from data_ingest import content_hash, default_data_path, load_telco
+from drift_monitor import DRIFT_REFERENCE_FILE, DriftSketch
+from explanations import EXPLAINER_FILE, Explainer, save_explainer
+from model_store import print_decision, publish
+from report_plots import (eda_figures, eda_summary, plot_dpi, render_confusion_matrix, render_feature_importance,
+                          render_figures, render_model_comparison, render_roc_curve)
+from retention_policy import SWEEP_COLUMNS, best_threshold, campaign_table, threshold_sweep
+from stage_cache import StageCache
+from training_engine import train_models, tune_models
+import joblib
+import os
 import warnings
 warnings.filterwarnings('ignore')
 
+# Worker processes for training/tuning (default: all cores).
+N_JOBS = int(os.environ.get("CHURN_N_JOBS", "-1"))
+TUNE_HYPERPARAMETERS = os.environ.get("CHURN_TUNE", "0") == "1"
+# Pick the best model on repeated k-fold CV of the training set rather than
+# the single test split (CHURN_CV=0 falls back to the test split).
+CROSS_VALIDATE = os.environ.get("CHURN_CV", "1") == "1"
+# Exports go to <dir>/versions/<version>; CHURN_FORCE_PROMOTE=1 serves the
+# new model even if it scores below the current one.
+MODEL_DIR = os.environ.get("CHURN_MODEL_DIR", "models")
+FORCE_PROMOTE = os.environ.get("CHURN_FORCE_PROMOTE", "0") == "1"
+
+# The script runs as named stages (load -> EDA -> preprocess -> feature
+# engineering -> split/scale -> train -> cross-validate -> evaluate -> export). Loading reuses
+# the Feather snapshot; the stages after it are memoized in .cache/stages on
+# the data hash plus their own code and params, so a rerun only recomputes
+# the stages that changed (CHURN_STAGE_CACHE=0 turns this off).
 
-sns.set_style('whitegrid')
-plt.rcParams['figure.figsize'] = (12, 6)
 
 # DATA LOADING AND INITIAL EXPLORATION
-df = pd.read_csv(r'C:\Users\VIVEK\Documents\MJ\Customer-churn\Telco-Customer-Churn-data.csv')
+def load_data(path):
+    # Typed load (categoricals as category, compact numerics); repeated runs read
+    # a cached Feather snapshot. Set CHURN_DATA_PATH to use another export.
+    df = load_telco(path, verbose=True)
 
-print(df.head(10))
+    print(df.head(10))
 
-print(df.info())
+    print(df.info())
 
-print(df.describe().T)
+    print(df.describe().T)
+
+    print(df.isnull().sum())
+    churn_counts = df['Churn'].value_counts()
+    print(churn_counts)
+    print(f"\nChurn Rate: {(churn_counts['Yes'] / len(df)) * 100:.2f}%")
+    return df
 
-print(df.isnull().sum())
-churn_counts = df['Churn'].value_counts()
-print(churn_counts)
-print(f"\nChurn Rate: {(churn_counts['Yes'] / len(df)) * 100:.2f}%")
 
 # EXPLORATORY DATA ANALYSIS (EDA)
-# Plot 1: Churn Distribution
-plt.figure(figsize=(8, 6))
-churn_counts.plot(kind='bar', color=['#2ecc71', '#e74c3c'])
-plt.title('Customer Churn Distribution', fontsize=16, fontweight='bold')
-plt.xlabel('Churn Status')
-plt.ylabel('Number of Customers')
-plt.xticks(rotation=0)
-plt.tight_layout()
-plt.savefig('churn_distribution.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-
-
-# Plot 2: Churn by Contract Type
-plt.figure(figsize=(10, 6))
-contract_churn = pd.crosstab(df['Contract'], df['Churn'], normalize='index') * 100
-contract_churn.plot(kind='bar', stacked=False, color=['#2ecc71', '#e74c3c'])
-plt.title('Churn Rate by Contract Type', fontsize=16, fontweight='bold')
-plt.xlabel('Contract Type')
-plt.ylabel('Percentage (%)')
-plt.xticks(rotation=45)
-plt.legend(['No Churn', 'Churn'])
-plt.tight_layout()
-plt.savefig('churn_by_contract.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-
-# Plot 3: Tenure Distribution
-fig, axes = plt.subplots(1, 2, figsize=(14, 5))
-df[df['Churn'] == 'No']['tenure'].hist(bins=30, color='#2ecc71', alpha=0.7, ax=axes[0])
-axes[0].set_title('Tenure Distribution - No Churn', fontsize=14, fontweight='bold')
-axes[0].set_xlabel('Tenure (months)')
-axes[0].set_ylabel('Frequency')
-
-df[df['Churn'] == 'Yes']['tenure'].hist(bins=30, color='#e74c3c', alpha=0.7, ax=axes[1])
-axes[1].set_title('Tenure Distribution - Churn', fontsize=14, fontweight='bold')
-axes[1].set_xlabel('Tenure (months)')
-axes[1].set_ylabel('Frequency')
-plt.tight_layout()
-plt.savefig('tenure_distribution.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-
-# Plot 4: Monthly Charges Distribution
-plt.figure(figsize=(12, 6))
-plt.subplot(1, 2, 1)
-sns.boxplot(x='Churn', y='MonthlyCharges', data=df, palette=['#2ecc71', '#e74c3c'])
-plt.title('Monthly Charges by Churn Status', fontsize=14, fontweight='bold')
-
-plt.subplot(1, 2, 2)
-# Convert TotalCharges to numeric for plotting
-df_plot = df.copy()
-df_plot['TotalCharges'] = pd.to_numeric(df_plot['TotalCharges'], errors='coerce')
-df_plot = df_plot.dropna(subset=['TotalCharges'])
-sns.boxplot(x='Churn', y='TotalCharges', data=df_plot, palette=['#2ecc71', '#e74c3c'])
-plt.title('Total Charges by Churn Status', fontsize=14, fontweight='bold')
-plt.tight_layout()
-plt.savefig('charges_distribution.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-
-# Plot 5: Correlation Heatmap (for numerical features)
-print("\nCreating Correlation Heatmap...")
-numeric_cols = ['tenure', 'MonthlyCharges']
-correlation_data = df[numeric_cols].corr()
-plt.figure(figsize=(8, 6))
-sns.heatmap(correlation_data, annot=True, cmap='coolwarm', center=0, square=True)
-plt.title('Correlation Heatmap - Numerical Features', fontsize=16, fontweight='bold')
-plt.tight_layout()
-plt.savefig('correlation_heatmap.png', dpi=300, bbox_inches='tight')
-plt.close()
+def run_eda(df, dpi=None):
+    # Aggregate once (counts, crosstab, pre-binned histograms, box stats) and
+    # render the figures in parallel; unchanged figures are skipped.
+    print("\nCreating EDA figures...")
+    report = render_figures(eda_figures(eda_summary(df)), dpi=dpi)
+    print(f"✓ Rendered {len(report['rendered'])} figure(s), {len(report['skipped'])} unchanged")
+    return report['rendered'] + report['skipped']
 
 
 # DATA PREPROCESSING
-# Create a copy for preprocessing
-df_processed = df.copy()
-
-print("\nHandling TotalCharges column...")
-df_processed['TotalCharges'] = pd.to_numeric(df_processed['TotalCharges'], errors='coerce')
-df_processed['TotalCharges'].fillna(df_processed['TotalCharges'].median(), inplace=True)
-
-df_processed.drop('customerID', axis=1, inplace=True)
+def preprocess(df):
+    print("\nHandling TotalCharges column...")
+    print(f"Blank TotalCharges: {df['TotalCharges'].isna().sum()} (filled with the median)")
 
-print("✓ Encoding target variable...")
-df_processed['Churn'] = df_processed['Churn'].map({'Yes': 1, 'No': 0})
+    print("✓ Encoding target variable...")
+    y = (df['Churn'] == 'Yes').astype(int)
 
-categorical_cols = df_processed.select_dtypes(include=['object']).columns.tolist()
-numerical_cols = df_processed.select_dtypes(include=['int64', 'float64']).columns.tolist()
-numerical_cols.remove('Churn')
+    # Category levels, median fills and engineered features all live in one
+    # fitted preprocessor that is exported with the model (churn_pipeline.py).
+    print("\nFitting preprocessing pipeline...")
+    preprocessor = ChurnPreprocessor.fit(df)
+    print(f"\nCategorical Features: {len(CATEGORICAL_COLUMNS)}")
+    print(f"Numerical Features: {len(NUMERIC_COLUMNS)}")
+    print("Data preprocessing completed!")
+    return preprocessor, y
 
-print(f"\nCategorical Features: {len(categorical_cols)}")
-print(f"Numerical Features: {len(numerical_cols)}")
-
-print("\nEncoding categorical variables...")
-label_encoders = {}
-for col in categorical_cols:
-    le = LabelEncoder()
-    df_processed[col] = le.fit_transform(df_processed[col])
-    label_encoders[col] = le
-
-print("Data preprocessing completed!")
 
 # FEATURE ENGINEERING
-# 1. Average monthly charges per tenure
-df_processed['AvgMonthlyCharges'] = df_processed['TotalCharges'] / (df_processed['tenure'] + 1)
-
-# 2. Tenure groups
-df_processed['TenureGroup'] = pd.cut(df_processed['tenure'],
-                                      bins=[0, 12, 24, 48, 72],
-                                      labels=[0, 1, 2, 3])
-
-# 3. Charges groups
-df_processed['ChargesGroup'] = pd.cut(df_processed['MonthlyCharges'],
-                                       bins=[0, 35, 70, 105, 120],
-                                       labels=[0, 1, 2, 3])
+def engineer_features(df, preprocessor):
+    print("\nEncoding categorical variables and engineering features...")
+    X = pd.DataFrame(preprocessor.encode_frame(df), columns=preprocessor.feature_columns, index=df.index)
 
-# Handle any remaining NaN values
-print("\n✓ Handling any missing values...")
-df_processed.fillna(df_processed.median(numeric_only=True), inplace=True)
+    print("Feature engineering completed!")
+    print(f"Total Features: {X.shape[1]}")
+    print(f"Missing values after engineering: {X.isnull().sum().sum()}")
+    return X
 
-print("Feature engineering completed!")
-print(f"Total Features: {df_processed.shape[1] - 1}")
-print(f"Missing values after engineering: {df_processed.isnull().sum().sum()}")
 
 # MODEL PREPARATION
-# Separate features and target
-X = df_processed.drop('Churn', axis=1)
-y = df_processed['Churn']
-
-print(f"\nFeatures shape: {X.shape}")
-print(f"Target shape: {y.shape}")
-print(f"Churn rate in target: {y.mean():.2%}")
-
-# Split the data
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2,
-                                                      random_state=42, stratify=y)
-
-print(f"\nTraining set size: {X_train.shape[0]}")
-print(f"Testing set size: {X_test.shape[0]}")
-
-# Check for NaN values before scaling
-print("\nChecking for missing values...")
-print(f"NaN in X_train: {X_train.isnull().sum().sum()}")
-print(f"NaN in X_test: {X_test.isnull().sum().sum()}")
-
-# Fill any remaining NaN values with median
-if X_train.isnull().sum().sum() > 0:
-    print("Found NaN values, filling with median...")
-    from sklearn.impute import SimpleImputer
-    imputer = SimpleImputer(strategy='median')
-    X_train = pd.DataFrame(imputer.fit_transform(X_train), columns=X_train.columns, index=X_train.index)
-    X_test = pd.DataFrame(imputer.transform(X_test), columns=X_test.columns, index=X_test.index)
-    print("✓ NaN values handled!")
-
-# Scale numerical features
-print("\n✓ Scaling features...")
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
-
-print(" Data preparation completed!")
-print(f"Final X_train_scaled shape: {X_train_scaled.shape}")
-print(f"Final X_test_scaled shape: {X_test_scaled.shape}")
-
-# Initialize models
-models = {
-    'Logistic Regression': LogisticRegression(random_state=42, max_iter=1000),
-    'Decision Tree': DecisionTreeClassifier(random_state=42),
-    'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42),
-    'Gradient Boosting': GradientBoostingClassifier(random_state=42),
-    'XGBoost': xgb.XGBClassifier(random_state=42, eval_metric='logloss')
-}
-
-# Store results
-results = []
-
-print("\nTraining and evaluating models...\n")
-
-for name, model in models.items():
-    print(f"Training {name}...")
-
-    # Train model
-    model.fit(X_train_scaled, y_train)
-
-    # Predictions
-    y_pred = model.predict(X_test_scaled)
-    y_pred_proba = model.predict_proba(X_test_scaled)[:, 1]
-
-    # Calculate metrics
-    accuracy = accuracy_score(y_test, y_pred)
-    precision = precision_score(y_test, y_pred)
-    recall = recall_score(y_test, y_pred)
-    f1 = f1_score(y_test, y_pred)
-    roc_auc = roc_auc_score(y_test, y_pred_proba)
-
-    results.append({
-        'Model': name,
-        'Accuracy': accuracy,
-        'Precision': precision,
-        'Recall': recall,
-        'F1-Score': f1,
-        'ROC-AUC': roc_auc
-    })
-
-    print(f"✓ {name} completed!")
-    print(f"  Accuracy: {accuracy:.4f}, Precision: {precision:.4f}, Recall: {recall:.4f}, F1: {f1:.4f}, ROC-AUC: {roc_auc:.4f}\n")
-
-results_df = pd.DataFrame(results)
-results_df = results_df.sort_values('ROC-AUC', ascending=False)
+def split_and_scale(X, y):
+    print(f"\nFeatures shape: {X.shape}")
+    print(f"Target shape: {y.shape}")
+    print(f"Churn rate in target: {y.mean():.2%}")
+
+    # Split the data
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2,
+                                                          random_state=42, stratify=y)
+
+    print(f"\nTraining set size: {X_train.shape[0]}")
+    print(f"Testing set size: {X_test.shape[0]}")
+
+    # Check for NaN values before scaling
+    print("\nChecking for missing values...")
+    print(f"NaN in X_train: {X_train.isnull().sum().sum()}")
+    print(f"NaN in X_test: {X_test.isnull().sum().sum()}")
+
+    # Fill any remaining NaN values with median
+    if X_train.isnull().sum().sum() > 0:
+        print("Found NaN values, filling with median...")
+        from sklearn.impute import SimpleImputer
+        imputer = SimpleImputer(strategy='median')
+        X_train = pd.DataFrame(imputer.fit_transform(X_train), columns=X_train.columns, index=X_train.index)
+        X_test = pd.DataFrame(imputer.transform(X_test), columns=X_test.columns, index=X_test.index)
+        print("✓ NaN values handled!")
+
+    # Scale numerical features
+    print("\n✓ Scaling features...")
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    print(" Data preparation completed!")
+    print(f"Final X_train_scaled shape: {X_train_scaled.shape}")
+    print(f"Final X_test_scaled shape: {X_test_scaled.shape}")
+    return {
+        'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test,
+        'X_train_scaled': X_train_scaled, 'X_test_scaled': X_test_scaled, 'scaler': scaler,
+    }
+
+
+# MODEL TRAINING
+def build_models():
+    return {
+        'Logistic Regression': LogisticRegression(random_state=42, max_iter=1000),
+        'Decision Tree': DecisionTreeClassifier(random_state=42),
+        'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42),
+        'Gradient Boosting': GradientBoostingClassifier(random_state=42),
+        'XGBoost': xgb.XGBClassifier(random_state=42, eval_metric='logloss')
+    }
+
+
+def train(split, n_jobs, tune=False):
+    models = build_models()
+
+    # Optional successive-halving search (CHURN_TUNE=1); every model's search
+    # runs side by side in the process pool.
+    if tune:
+        print("\nTuning hyperparameters (successive halving, 5-fold CV)...\n")
+        models, tuning_summary = tune_models(models, split['X_train_scaled'], split['y_train'], n_jobs=n_jobs)
+        for row in tuning_summary:
+            print(f"✓ {row['Model']}: CV ROC-AUC {row['CV ROC-AUC']:.4f} in {row['Search Seconds']:.1f}s — {row['Best Params']}")
+
+    print("\nTraining and evaluating models in parallel...\n")
+    models, results = train_models(models, split['X_train_scaled'], split['y_train'],
+                                   split['X_test_scaled'], split['y_test'], n_jobs=n_jobs)
+
+    for row in results:
+        print(f"✓ {row['Model']} completed in {row['Fit Seconds']:.2f}s!")
+        print(f"  Accuracy: {row['Accuracy']:.4f}, Precision: {row['Precision']:.4f}, Recall: {row['Recall']:.4f}, F1: {row['F1-Score']:.4f}, ROC-AUC: {row['ROC-AUC']:.4f}\n")
+    return models, results
+
+
+# CROSS-VALIDATION
+def cross_validate_models(models, split, n_jobs, folds=CV_FOLDS, repeats=CV_REPEATS):
+    # Every (model, fold) pair runs in the process pool; folds are split and
+    # scaled once and shared by all models (cross_validation.py).
+    print(f"\nRepeated {folds}-fold cross-validation ({repeats} repeat(s)) on the training set...\n")
+    cv_results, _, info = cross_validate(models, split['X_train'].to_numpy(), np.asarray(split['y_train']),
+                                         folds, repeats, n_jobs=n_jobs)
+    for row in cv_results.to_dict('records'):
+        print(f"✓ {row['Model']}: ROC-AUC {row['ROC-AUC']:.4f} ± {row['ROC-AUC Std']:.4f}, "
+              f"F1 {row['F1-Score']:.4f} ± {row['F1-Score Std']:.4f} — {row['Wall Seconds']:.1f}s wall, "
+              f"{row['Fit Seconds']:.1f}s fitting")
+    print(f"\n{len(models)} models x {info['folds']} folds on {info['workers']} worker(s) in {info['wall_seconds']:.1f}s "
+          f"(folds {'reused from cache' if info['cache_hit'] else 'prepared'} in {info['prepare_seconds']:.2f}s)")
+    return cv_results
 
-print("\n" + "=" * 80)
-print("MODEL PERFORMANCE COMPARISON")
-print("=" * 80)
-print(results_df.to_string(index=False))
 
 # BEST MODEL ANALYSIS
-
-best_model_name = results_df.iloc[0]['Model']
-best_model = models[best_model_name]
-
-print(f"\nBest Model: {best_model_name}")
-print(f"ROC-AUC Score: {results_df.iloc[0]['ROC-AUC']:.4f}")
-
-y_pred_best = best_model.predict(X_test_scaled)
-y_pred_proba_best = best_model.predict_proba(X_test_scaled)[:, 1]
-
-# Confusion Matrix
-print("\nConfusion Matrix:")
-cm = confusion_matrix(y_test, y_pred_best)
-print(cm)
-
-# Plot Confusion Matrix
-plt.figure(figsize=(8, 6))
-sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', cbar=False)
-plt.title(f'Confusion Matrix - {best_model_name}', fontsize=16, fontweight='bold')
-plt.ylabel('Actual')
-plt.xlabel('Predicted')
-plt.tight_layout()
-plt.savefig('confusion_matrix.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-
-# Classification Report
-print("\nClassification Report:")
-print(classification_report(y_test, y_pred_best, target_names=['No Churn', 'Churn']))
-
-
-fpr, tpr, thresholds = roc_curve(y_test, y_pred_proba_best)
-roc_auc = roc_auc_score(y_test, y_pred_proba_best)
-
-plt.figure(figsize=(10, 6))
-plt.plot(fpr, tpr, color='#e74c3c', lw=2, label=f'ROC Curve (AUC = {roc_auc:.4f})')
-plt.plot([0, 1], [0, 1], color='gray', lw=2, linestyle='--', label='Random Classifier')
-plt.xlim([0.0, 1.0])
-plt.ylim([0.0, 1.05])
-plt.xlabel('False Positive Rate', fontsize=12)
-plt.ylabel('True Positive Rate', fontsize=12)
-plt.title(f'ROC Curve - {best_model_name}', fontsize=16, fontweight='bold')
-plt.legend(loc="lower right")
-plt.grid(alpha=0.3)
-plt.tight_layout()
-plt.savefig('roc_curve.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-
-if hasattr(best_model, 'feature_importances_'):
-    feature_importance = pd.DataFrame({
-        'Feature': X.columns,
-        'Importance': best_model.feature_importances_
-    }).sort_values('Importance', ascending=False)
-
-    print("\nTop 15 Most Important Features:")
-    print(feature_importance.head(15).to_string(index=False))
-
-    plt.figure(figsize=(12, 8))
-    top_features = feature_importance.head(15)
-    plt.barh(range(len(top_features)), top_features['Importance'], color='#3498db')
-    plt.yticks(range(len(top_features)), top_features['Feature'])
-    plt.xlabel('Importance Score', fontsize=12)
-    plt.title('Top 15 Most Important Features', fontsize=16, fontweight='bold')
-    plt.gca().invert_yaxis()
-    plt.tight_layout()
-    plt.savefig('feature_importance.png', dpi=300, bbox_inches='tight')
-    plt.close()
-
-# MODEL COMPARISON VISUALIZATION
-
-
-fig, axes = plt.subplots(2, 2, figsize=(16, 12))
-
-metrics_to_plot = ['Accuracy', 'Precision', 'Recall', 'ROC-AUC']
-colors = ['#3498db', '#2ecc71', '#e74c3c', '#f39c12']
-
-for idx, (metric, color) in enumerate(zip(metrics_to_plot, colors)):
-    ax = axes[idx // 2, idx % 2]
-    data = results_df.sort_values(metric, ascending=True)
-    ax.barh(data['Model'], data[metric], color=color, alpha=0.8)
-    ax.set_xlabel(metric, fontsize=12, fontweight='bold')
-    ax.set_title(f'Model Comparison - {metric}', fontsize=14, fontweight='bold')
-    ax.set_xlim([0, 1])
-
-    # Add value labels
-    for i, v in enumerate(data[metric]):
-        ax.text(v + 0.01, i, f'{v:.3f}', va='center', fontsize=10)
-
-plt.tight_layout()
-plt.savefig('model_comparison.png', dpi=300, bbox_inches='tight')
-plt.close()
+def evaluate(models, results, split, feature_columns, cv_results=None, dpi=None):
+    X_test_scaled, y_test = split['X_test_scaled'], split['y_test']
+    results_df = pd.DataFrame(results)
+    results_df = results_df.sort_values('ROC-AUC', ascending=False)
+    if cv_results is not None:
+        cv_auc = cv_results[['Model', 'ROC-AUC', 'ROC-AUC Std']].rename(
+            columns={'ROC-AUC': 'CV ROC-AUC', 'ROC-AUC Std': 'CV ROC-AUC Std'})
+        results_df = results_df.merge(cv_auc, on='Model').sort_values('CV ROC-AUC', ascending=False)
+
+    print("\n" + "=" * 80)
+    print("MODEL PERFORMANCE COMPARISON")
+    print("=" * 80)
+    print(results_df.to_string(index=False))
+
+    best_model_name = results_df.iloc[0]['Model']
+    best_model = models[best_model_name]
+
+    print(f"\nBest Model: {best_model_name}")
+    print(f"ROC-AUC Score: {results_df.iloc[0]['ROC-AUC']:.4f}")
+    if cv_results is not None:
+        print(f"CV ROC-AUC: {results_df.iloc[0]['CV ROC-AUC']:.4f} ± {results_df.iloc[0]['CV ROC-AUC Std']:.4f}")
+
+    y_pred_best = best_model.predict(X_test_scaled)
+    y_pred_proba_best = best_model.predict_proba(X_test_scaled)[:, 1]
+
+    # Confusion Matrix
+    print("\nConfusion Matrix:")
+    cm = confusion_matrix(y_test, y_pred_best)
+    print(cm)
+
+    # Classification Report
+    print("\nClassification Report:")
+    print(classification_report(y_test, y_pred_best, target_names=['No Churn', 'Churn']))
+
+    # The same model at every cutoff, not just 0.5: one sort + cumulative
+    # sums over the test probabilities (retention_policy.py)
+    sweep = threshold_sweep(y_pred_proba_best, np.asarray(y_test))
+    print("\nThreshold Sweep (churn if probability > threshold):")
+    print(pd.DataFrame(campaign_table(sweep, (0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8))).to_string(index=False))
+    for metric in ('f1', 'cost'):
+        row = best_threshold(sweep, metric)
+        print(f"Best {metric}: threshold {row['threshold']:.4f} — precision {row['precision']:.4f}, "
+              f"recall {row['recall']:.4f}, F1 {row['f1']:.4f}, cost {row['cost']:,.0f}")
+
+    fpr, tpr, thresholds = roc_curve(y_test, y_pred_proba_best)
+    roc_auc = roc_auc_score(y_test, y_pred_proba_best)
+
+    feature_importance = None
+    if hasattr(best_model, 'feature_importances_'):
+        feature_importance = pd.DataFrame({
+            'Feature': feature_columns,
+            'Importance': best_model.feature_importances_
+        }).sort_values('Importance', ascending=False)
+
+        print("\nTop 15 Most Important Features:")
+        print(feature_importance.head(15).to_string(index=False))
+
+    # Figures are rendered from these small arrays in the plot worker pool
+    figures = [
+        ('confusion_matrix.png', render_confusion_matrix, {'cm': cm, 'model_name': best_model_name}),
+        ('roc_curve.png', render_roc_curve, {'fpr': fpr, 'tpr': tpr, 'roc_auc': roc_auc, 'model_name': best_model_name}),
+        ('model_comparison.png', render_model_comparison, results_df[['Model', 'Accuracy', 'Precision', 'Recall', 'ROC-AUC']]),
+    ]
+    if feature_importance is not None:
+        figures.append(('feature_importance.png', render_feature_importance, feature_importance.head(15)))
+    report = render_figures(figures, dpi=dpi)
+    print(f"✓ Rendered {len(report['rendered'])} figure(s), {len(report['skipped'])} unchanged")
+
+    return results_df, best_model_name, feature_importance, sweep
 
 
 # SAVE MODEL AND RESULTS
+def export(results_df, best_model_name, best_model, feature_importance, preprocessor, split, sweep, holdout,
+           cv_results=None):
+    results_df.to_csv('model_performance_results.csv', index=False)
+    print("Model performance saved to 'model_performance_results.csv'")
+
+    if cv_results is not None:
+        cv_results.to_csv('cv_results.csv', index=False)
+        print("Cross-validation results saved to 'cv_results.csv'")
+
+    pd.DataFrame({col: sweep[col] for col in SWEEP_COLUMNS}).to_csv('threshold_sweep.csv', index=False)
+    print("Threshold sweep saved to 'threshold_sweep.csv'")
+
+    if feature_importance is not None:
+        feature_importance.to_csv('feature_importance.csv', index=False)
+        print("Feature importance saved to 'feature_importance.csv'")
+
+    print("PROJECT COMPLETED SUCCESSFULLY!")
+
+    pipeline = ChurnPipeline(preprocessor, split['scaler'], best_model, {
+        "model_name": best_model_name,
+        "roc_auc": float(results_df.iloc[0]['ROC-AUC']),
+        "n_train": int(len(split['X_train'])),
+        "cv_roc_auc": float(results_df.iloc[0]['CV ROC-AUC']) if cv_results is not None else None,
+        "best_f1_threshold": best_threshold(sweep, 'f1')['threshold'],
+        "min_cost_threshold": best_threshold(sweep, 'cost')['threshold'],
+    })
 
-results_df.to_csv('model_performance_results.csv', index=False)
-print("Model performance saved to 'model_performance_results.csv'")
-
-
-if hasattr(best_model, 'feature_importances_'):
-    feature_importance.to_csv('feature_importance.csv', index=False)
-    print("Feature importance saved to 'feature_importance.csv'")
-
-print("PROJECT COMPLETED SUCCESSFULLY!")
-
-
-import joblib
-import os
-
-try:
-    os.makedirs("models", exist_ok=True)
-    joblib.dump(best_model, "models/churn_model.pkl")
-    model_columns = X.columns.tolist()
-    joblib.dump(model_columns, "models/model_columns.pkl")
-    print("\n✅ Model and columns saved successfully inside 'models' folder!")
-except Exception as e:
-    print("\n❌ Error while saving model:", e)
-
-from sklearn.preprocessing import StandardScaler
-joblib.dump(scaler, "models/scaler.pkl")
-print("✅ Scaler saved successfully inside 'models' folder!")
-
-
-
-
-
-
-
-
-
+    # A new version directory under models/versions; it only goes live
+    # (models/CURRENT) if it scores better than the served model on
+    # the test rows (model_store.py).
+    path, decision = publish(MODEL_DIR, pipeline, holdout, split['y_test'],
+                             lambda out_dir, version: save_artifacts(out_dir, pipeline, version, split),
+                             force=FORCE_PROMOTE)
+    print(f"\n✅ Preprocessing + model pipeline saved to '{path}' (version {decision['version']})")
+    print_decision(decision)
+    return pipeline
+
+
+def save_artifacts(out_dir, pipeline, pipeline_version, split):
+    """Files served next to churn_pipeline.pkl, written into ``out_dir``."""
+    # Pre-pipeline artifacts for older consumers
+    joblib.dump(pipeline.model, os.path.join(out_dir, "churn_model.pkl"))
+    joblib.dump(pipeline.feature_columns, os.path.join(out_dir, "model_columns.pkl"))
+    joblib.dump(pipeline.scaler, os.path.join(out_dir, "scaler.pkl"))
+    print("✅ Model, columns and scaler saved")
+
+    # Training-set histograms of every feature and of the churn probability,
+    # the baseline live traffic is compared with (drift_monitor.py).
+    reference = DriftSketch.fit(split['X_train'].to_numpy(), pipeline.preprocessor.spec(),
+                                pipeline.predict_proba(split['X_train_scaled']),
+                                meta={"pipeline_version": pipeline_version})
+    reference.save(os.path.join(out_dir, DRIFT_REFERENCE_FILE))
+    print(f"✅ Drift reference ({reference.rows} training rows) saved as {DRIFT_REFERENCE_FILE}")
+
+    # Flattened NumPy version of scaler + model for the app's fast runtime,
+    # only written if it reproduces the sklearn probabilities on the test set.
+    try:
+        compiled = compile_pipeline(pipeline)
+    except TypeError as e:
+        print(f"⚠️ No compiled runtime for {pipeline.metadata.get('model_name')}: {e}")
+        return
+    parity = check_parity(pipeline, compiled, split['X_test'].to_numpy())
+    print(f"Parity on {parity['rows']} test rows: max |Δp| {parity['max_abs_diff']:.2e}, "
+          f"{parity['label_mismatches']} label mismatches")
+    if not parity['passed']:
+        print("❌ Compiled model does not match sklearn, not saved")
+        return
+    save_compiled(compiled, os.path.join(out_dir, COMPILED_FILE), pipeline_version)
+    print(f"✅ Compiled {compiled.kind} model saved as {COMPILED_FILE}")
+
+    # Background for per-customer explanations, computed once here
+    # from the training rows (explanations.py).
+    explainer = Explainer.fit(compiled, split['X_train'].to_numpy())
+    save_explainer(explainer, os.path.join(out_dir, EXPLAINER_FILE), pipeline_version)
+    print(f"✅ Explainer background ({len(split['X_train'])} training rows) saved as {EXPLAINER_FILE} "
+          f"(max additivity error on the test set {explainer.additivity_error(split['X_test'].to_numpy()):.1e})")
+
+
+def _files_exist(paths):
+    return all(os.path.exists(p) for p in paths)
+
+
+def main():
+    cache = StageCache()
+    data_path = default_data_path()
+    data_key = content_hash(data_path)
+
+    df = load_data(data_path)
+
+    dpi = plot_dpi()
+    cache.run('eda', run_eda, (df,), upstream=[data_key], params={'dpi': dpi},
+              code_deps=[report_plots], validate=_files_exist)
+    (preprocessor, y), pre_key = cache.run('preprocess', preprocess, (df,), upstream=[data_key],
+                                           code_deps=[churn_pipeline])
+    X, fe_key = cache.run('feature_engineer', engineer_features, (df, preprocessor),
+                          upstream=[data_key, pre_key], code_deps=[churn_pipeline])
+    split, split_key = cache.run('split_scale', split_and_scale, (X, y), upstream=[fe_key, pre_key])
+    (models, results), train_key = cache.run('train', train, (split, N_JOBS), upstream=[split_key],
+                                             params={'tune': TUNE_HYPERPARAMETERS},
+                                             code_deps=[build_models, training_engine])
+    cv_results, eval_upstream = None, [train_key, split_key]
+    if CROSS_VALIDATE:
+        cv_results, cv_key = cache.run('cross_validate', cross_validate_models, (models, split, N_JOBS),
+                                       upstream=[train_key, split_key],
+                                       params={'folds': CV_FOLDS, 'repeats': CV_REPEATS},
+                                       code_deps=[cross_validation, training_engine])
+        eval_upstream.append(cv_key)
+    (results_df, best_model_name, feature_importance, sweep), _ = cache.run(
+        'evaluate', evaluate, (models, results, split, preprocessor.feature_columns, cv_results),
+        upstream=eval_upstream, params={'dpi': dpi}, code_deps=[report_plots, retention_policy],
+        validate=lambda out: _files_exist(['confusion_matrix.png', 'roc_curve.png', 'model_comparison.png']))
+
+    export(results_df, best_model_name, models[best_model_name], feature_importance, preprocessor, split, sweep,
+           df.loc[split['X_test'].index], cv_results)
+    cache.report()
+
+
+if __name__ == "__main__":
+    main()
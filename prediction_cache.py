@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# ===============================
+# 🧮 PREDICTION CACHE
+# ===============================
+# Bounded LRU + TTL cache for single-customer predictions, keyed on the
+# encoded feature row and the model version. Shared by every Streamlit
+# session in the process; a new model version empties it.
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("CHURN_PREDICTION_CACHE_SIZE", "1024"))
+DEFAULT_TTL_SECONDS = float(os.environ.get("CHURN_PREDICTION_CACHE_TTL", "3600"))
+
+
+def row_key(encoded_row):
+    """Canonical bytes for an encoded row (float64, -0.0 folded into 0.0)."""
+    row = np.ascontiguousarray(encoded_row, dtype=np.float64).ravel() + 0.0
+    return row.tobytes()
+
+
+class PredictionCache:
+    """Thread-safe LRU cache whose entries also expire ``ttl_seconds`` after insertion."""
+
+    def __init__(self, max_entries=None, ttl_seconds=None, clock=time.monotonic):
+        self.max_entries = DEFAULT_MAX_ENTRIES if max_entries is None else max_entries
+        self.ttl_seconds = DEFAULT_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidations": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.stats["invalidations"] += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, version, encoded_row):
+        """Cached value or None; counts a hit or a miss."""
+        key = row_key(encoded_row)
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self._clock() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+                del self._entries[key]
+                self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, version, encoded_row, value):
+        key = row_key(encoded_row)
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def get_or_compute(self, version, encoded_row, compute):
+        """Return the cached value, or ``compute()`` and store it."""
+        value = self.get(version, encoded_row)
+        if value is None:
+            value = compute()
+            self.put(version, encoded_row, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def hit_rate(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
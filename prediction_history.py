@@ -0,0 +1,292 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from prediction_sink import default_dsn, init_sqlite
+
+# ===============================
+# 📜 PREDICTION HISTORY
+# ===============================
+# Async reads of public.predictions for dashboard pages:
+#
+#   page     keyset pagination, newest first: each page continues from an
+#            opaque cursor holding the last row's (created_at, id), so it is
+#            one index range scan on (user_id, created_at DESC, id DESC)
+#            however deep the reader has paged
+#   summary  count, churn share and mean churn probability from the user's
+#            row in prediction_user_stats, which triggers update as
+#            predictions are written; no scan of the history
+#
+# Postgres goes through psycopg's async connections; the SQLite stand-in
+# runs its queries in worker threads. Same DSNs as prediction_sink.py.
+#
+# Readers use the service DSN, which bypasses the auth.uid() = user_id RLS
+# policies, so HTTP callers must be identified by token_user_id(): the
+# user is the ``sub`` of a Supabase access token verified against
+# CHURN_JWT_SECRET (the project's JWT secret), never a request parameter.
+#
+#   python prediction_history.py USER_ID --summary
+#   python prediction_history.py USER_ID --limit 20 --cursor <next_cursor>
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+TOKEN_AUDIENCE = "authenticated"
+
+STATS_COLUMNS = ("predictions", "churned", "probability_sum", "probability_count", "last_prediction_at")
+
+
+def default_jwt_secret():
+    return os.environ.get("CHURN_JWT_SECRET")
+
+
+class TokenError(ValueError):
+    """Missing, malformed, expired or wrongly signed access token."""
+
+
+def _b64decode(part):
+    return base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+
+
+def token_user_id(authorization, secret):
+    """User id (``sub``) of an HS256 Supabase access token from an ``Authorization: Bearer`` header."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise TokenError("missing bearer token")
+    try:
+        header, payload, signature = token.split(".")
+        alg = json.loads(_b64decode(header))["alg"]
+        claims = dict(json.loads(_b64decode(payload)))
+        signature = _b64decode(signature)
+    except (ValueError, TypeError, KeyError):
+        raise TokenError("malformed token") from None
+    if alg != "HS256":
+        raise TokenError(f"unsupported token algorithm {alg!r}")
+    expected = hmac.new(secret.encode(), f"{header}.{payload}".encode(), hashlib.sha256).digest()
+    if not hmac.compare_digest(signature, expected):
+        raise TokenError("invalid token signature")
+    if not isinstance(claims.get("exp"), (int, float)) or claims["exp"] <= time.time():
+        raise TokenError("token expired")
+    audience = claims.get("aud")
+    if TOKEN_AUDIENCE not in (audience if isinstance(audience, list) else [audience]):
+        raise TokenError("token is not for an authenticated user")
+    if not claims.get("sub"):
+        raise TokenError("token has no subject")
+    return str(claims["sub"])
+
+
+def encode_cursor(created_at, row_id):
+    return base64.urlsafe_b64encode(json.dumps([created_at, row_id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(created_at, id) of the row a page ended on."""
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError(f"invalid history cursor {cursor!r}") from None
+    return str(created_at), str(row_id)
+
+
+def page_size(limit):
+    return max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+
+
+def history_item(row_id, created_at, prediction, features):
+    if isinstance(features, str):
+        features = json.loads(features)
+    return {"id": str(row_id), "created_at": created_at, "prediction": int(prediction),
+            "churn_probability": features.get("churn_probability"), "features": features}
+
+
+def build_page(items, limit):
+    """The first ``limit`` items plus a cursor when the query found one more."""
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["id"])
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def build_summary(user_id, stats):
+    """Summary view of one prediction_user_stats row (None for a user with no predictions)."""
+    predictions, churned, probability_sum, probability_count, last_at = stats or (0, 0, 0.0, 0, None)
+    return {
+        "user_id": user_id,
+        "predictions": int(predictions),
+        "churned": int(churned),
+        "churn_share": churned / predictions if predictions else None,
+        "mean_probability": probability_sum / probability_count if probability_count else None,
+        "last_prediction_at": last_at.isoformat() if hasattr(last_at, "isoformat") else last_at,
+    }
+
+
+class SQLiteHistory:
+    """Reads a SQLite file written by prediction_sink's SQLiteBackend; one connection per worker thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        init_sqlite(self._connection())
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            with self._lock:
+                self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    def _page(self, user_id, limit, cursor):
+        query = "SELECT id, created_at, prediction, features FROM predictions WHERE user_id = ?"
+        params = [user_id]
+        if cursor:
+            query += " AND (created_at, id) < (?, ?)"
+            params.extend(decode_cursor(cursor))
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        rows = self._connection().execute(query, [*params, limit + 1]).fetchall()
+        return build_page([history_item(*row) for row in rows], limit)
+
+    def _summary(self, user_id):
+        stats = self._connection().execute(
+            f"SELECT {', '.join(STATS_COLUMNS)} FROM prediction_user_stats WHERE user_id = ?", (user_id,)).fetchone()
+        return build_summary(user_id, stats)
+
+    async def page(self, user_id, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        return await asyncio.to_thread(self._page, user_id, page_size(limit), cursor)
+
+    async def summary(self, user_id):
+        return await asyncio.to_thread(self._summary, user_id)
+
+    async def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
+
+class PostgresHistory:
+    """Reads public.predictions / public.prediction_user_stats over a small pool of psycopg async connections."""
+
+    def __init__(self, dsn, pool_size=4):
+        try:
+            import psycopg
+        except ImportError:
+            raise ImportError("reading predictions from Postgres needs psycopg (pip install 'psycopg[binary]')") from None
+        self._connect = lambda: psycopg.AsyncConnection.connect(dsn, autocommit=True)
+        self.pool_size = pool_size
+        self._pool = asyncio.LifoQueue()
+        self._created = 0
+
+    async def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        if self._created < self.pool_size:
+            self._created += 1
+            try:
+                return await self._connect()
+            except BaseException:
+                self._created -= 1
+                raise
+        return await self._pool.get()
+
+    async def _fetch(self, query, params):
+        conn = await self._acquire()
+        try:
+            cur = await conn.execute(query, params)
+            rows = await cur.fetchall()
+        except BaseException:
+            await conn.close()
+            self._created -= 1
+            raise
+        self._pool.put_nowait(conn)
+        return rows
+
+    async def page(self, user_id, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        limit = page_size(limit)
+        query = ("SELECT id, created_at, prediction, features FROM public.predictions "
+                 "WHERE user_id = %s::uuid")
+        params = [user_id]
+        if cursor:
+            query += " AND (created_at, id) < (%s::timestamptz, %s::uuid)"
+            params.extend(decode_cursor(cursor))
+        query += " ORDER BY created_at DESC, id DESC LIMIT %s"
+        rows = await self._fetch(query, [*params, limit + 1])
+        return build_page([history_item(row_id, created_at.isoformat(), prediction, features)
+                           for row_id, created_at, prediction, features in rows], limit)
+
+    async def summary(self, user_id):
+        rows = await self._fetch(
+            f"SELECT {', '.join(STATS_COLUMNS)} FROM public.prediction_user_stats WHERE user_id = %s::uuid",
+            [user_id])
+        return build_summary(user_id, rows[0] if rows else None)
+
+    async def close(self):
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            await conn.close()
+            self._created -= 1
+
+
+def open_history(dsn=None):
+    """History reader for ``dsn`` (default: CHURN_PREDICTIONS_DSN), or None when unset."""
+    dsn = dsn or default_dsn()
+    if not dsn:
+        return None
+    if dsn.startswith(("postgres://", "postgresql://")):
+        return PostgresHistory(dsn)
+    if dsn.startswith("sqlite:///"):
+        return SQLiteHistory(dsn[len("sqlite:///"):])
+    raise ValueError(f"unsupported predictions DSN {dsn!r} (use postgresql://... or sqlite:///path)")
+
+
+async def _show(args):
+    history = open_history(args.dsn)
+    if history is None:
+        raise SystemExit("❌ Set CHURN_PREDICTIONS_DSN or pass --dsn")
+    try:
+        summary = await history.summary(args.user_id)
+        share, mean = summary["churn_share"], summary["mean_probability"]
+        print(f"{summary['predictions']:,} predictions, churn share "
+              f"{'-' if share is None else f'{share:.1%}'}, mean churn probability "
+              f"{'-' if mean is None else f'{mean:.3f}'}, last at {summary['last_prediction_at'] or '-'}")
+        if args.summary:
+            return
+        page = await history.page(args.user_id, args.limit, args.cursor)
+        print(f"\n{'Created at':<34}{'Prediction':>11}{'Probability':>13}  Customer")
+        for item in page["items"]:
+            prob = item["churn_probability"]
+            print(f"{item['created_at']:<34}{item['prediction']:>11}{'-' if prob is None else f'{prob:.4f}':>13}  "
+                  f"{item['features'].get('customerID', '-')}")
+        if page["next_cursor"]:
+            print(f"\nnext page: --cursor {page['next_cursor']}")
+    finally:
+        await history.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Page through a user's prediction history and its summary.")
+    parser.add_argument("user_id")
+    parser.add_argument("--dsn", default=None, help="predictions DSN (default: CHURN_PREDICTIONS_DSN)")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--cursor", default=None, help="next_cursor from the previous page")
+    parser.add_argument("--summary", action="store_true", help="print the summary only")
+    asyncio.run(_show(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from retention_policy import DEFAULT_THRESHOLD
+
+# ===============================
+# 🗄️ PREDICTION SINK
+# ===============================
+# Buffers scored rows and writes them to public.predictions in batches
+# from background writer threads:
+#
+#   Postgres  COPY ... FROM STDIN over a small connection pool (psycopg 3)
+#   SQLite    executemany in one transaction per batch (local stand-in)
+#
+# Triggers keep per-user aggregates in prediction_user_stats as rows land;
+# prediction_history.py reads them and pages through the history.
+#
+# The hand-off queue is bounded, so a producer that outruns the database
+# blocks instead of buffering without limit. Configure with
+# CHURN_PREDICTIONS_DSN ("postgresql://..." or "sqlite:///path.db").
+
+DEFAULT_BATCH_SIZE = int(os.environ.get("CHURN_SINK_BATCH_SIZE", "5000"))
+DEFAULT_MAX_PENDING_BATCHES = int(os.environ.get("CHURN_SINK_MAX_PENDING", "8"))
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+COLUMNS = ("user_id", "features", "prediction", "created_at")
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+  id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))),
+  user_id TEXT NOT NULL,
+  features TEXT NOT NULL,
+  prediction INTEGER NOT NULL,
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+CREATE INDEX IF NOT EXISTS predictions_user_id_created_at_id_idx
+  ON predictions (user_id, created_at DESC, id DESC);
+DROP INDEX IF EXISTS predictions_user_id_created_at_idx;
+"""
+
+# Per-user aggregates maintained on insert/update/delete, as the Postgres triggers
+# in 20251029000000_create_prediction_user_stats.sql do (SQLite only has
+# row-level triggers).
+SQLITE_STATS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prediction_user_stats (
+  user_id TEXT PRIMARY KEY,
+  predictions INTEGER NOT NULL DEFAULT 0,
+  churned INTEGER NOT NULL DEFAULT 0,
+  probability_sum REAL NOT NULL DEFAULT 0,
+  probability_count INTEGER NOT NULL DEFAULT 0,
+  last_prediction_at TEXT,
+  updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+CREATE TRIGGER IF NOT EXISTS predictions_add_user_stats AFTER INSERT ON predictions BEGIN
+  INSERT INTO prediction_user_stats (user_id, predictions, churned, probability_sum, probability_count, last_prediction_at)
+  VALUES (NEW.user_id, 1, NEW.prediction = 1,
+          coalesce(json_extract(NEW.features, '$.churn_probability'), 0),
+          json_extract(NEW.features, '$.churn_probability') IS NOT NULL, NEW.created_at)
+  ON CONFLICT (user_id) DO UPDATE SET
+    predictions = predictions + excluded.predictions,
+    churned = churned + excluded.churned,
+    probability_sum = probability_sum + excluded.probability_sum,
+    probability_count = probability_count + excluded.probability_count,
+    last_prediction_at = max(coalesce(last_prediction_at, ''), excluded.last_prediction_at),
+    updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now');
+END;
+CREATE TRIGGER IF NOT EXISTS predictions_remove_user_stats AFTER DELETE ON predictions BEGIN
+  UPDATE prediction_user_stats SET
+    predictions = predictions - 1,
+    churned = churned - (OLD.prediction = 1),
+    probability_sum = probability_sum - coalesce(json_extract(OLD.features, '$.churn_probability'), 0),
+    probability_count = probability_count - (json_extract(OLD.features, '$.churn_probability') IS NOT NULL),
+    last_prediction_at = (SELECT max(created_at) FROM predictions WHERE user_id = OLD.user_id),
+    updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now')
+  WHERE user_id = OLD.user_id;
+  DELETE FROM prediction_user_stats WHERE user_id = OLD.user_id AND predictions <= 0;
+END;
+CREATE TRIGGER IF NOT EXISTS predictions_update_user_stats AFTER UPDATE ON predictions BEGIN
+  UPDATE prediction_user_stats SET
+    predictions = predictions - 1,
+    churned = churned - (OLD.prediction = 1),
+    probability_sum = probability_sum - coalesce(json_extract(OLD.features, '$.churn_probability'), 0),
+    probability_count = probability_count - (json_extract(OLD.features, '$.churn_probability') IS NOT NULL),
+    last_prediction_at = (SELECT max(created_at) FROM predictions WHERE user_id = OLD.user_id),
+    updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now')
+  WHERE user_id = OLD.user_id;
+  INSERT INTO prediction_user_stats (user_id, predictions, churned, probability_sum, probability_count, last_prediction_at)
+  VALUES (NEW.user_id, 1, NEW.prediction = 1,
+          coalesce(json_extract(NEW.features, '$.churn_probability'), 0),
+          json_extract(NEW.features, '$.churn_probability') IS NOT NULL, NEW.created_at)
+  ON CONFLICT (user_id) DO UPDATE SET
+    predictions = predictions + excluded.predictions,
+    churned = churned + excluded.churned,
+    probability_sum = probability_sum + excluded.probability_sum,
+    probability_count = probability_count + excluded.probability_count,
+    last_prediction_at = max(coalesce(last_prediction_at, ''), excluded.last_prediction_at),
+    updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now');
+  DELETE FROM prediction_user_stats WHERE user_id = OLD.user_id AND predictions <= 0;
+END;
+"""
+
+SQLITE_STATS_BACKFILL = """
+INSERT OR IGNORE INTO prediction_user_stats (user_id, predictions, churned, probability_sum, probability_count, last_prediction_at)
+SELECT user_id, count(*), sum(prediction = 1),
+       coalesce(sum(json_extract(features, '$.churn_probability')), 0),
+       count(json_extract(features, '$.churn_probability')), max(created_at)
+FROM predictions GROUP BY user_id
+"""
+
+
+def default_dsn():
+    return os.environ.get("CHURN_PREDICTIONS_DSN")
+
+
+def utc_now():
+    """UTC timestamp shaped like the SQLite column default (strftime '%Y-%m-%dT%H:%M:%fZ').
+
+    SQLite compares created_at as text (trigger max(), history cursors), so
+    every row must use the same format; Postgres parses it as timestamptz.
+    """
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def init_sqlite(conn):
+    """Create the predictions and stats tables; a new stats table is backfilled from existing rows."""
+    conn.executescript(SQLITE_SCHEMA)
+    has_stats = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'prediction_user_stats'").fetchone()
+    if has_stats:
+        conn.executescript(SQLITE_STATS_SCHEMA)
+        return
+    # one transaction, so no insert lands between the backfill and the triggers
+    conn.executescript(f"BEGIN IMMEDIATE; {SQLITE_STATS_SCHEMA} {SQLITE_STATS_BACKFILL}; COMMIT;")
+
+
+class SQLiteBackend:
+    """Writes to a local SQLite file shaped like public.predictions."""
+
+    max_writers = 1  # SQLite serializes writers anyway
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        init_sqlite(self._conn)
+        self._insert = f"INSERT INTO predictions ({', '.join(COLUMNS)}) VALUES (?, ?, ?, ?)"
+
+    def write(self, rows):
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(self._insert, rows)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self):
+        self._conn.close()
+
+
+class PostgresBackend:
+    """COPY batches into public.predictions over a small pool of psycopg connections."""
+
+    def __init__(self, dsn, pool_size=4):
+        try:
+            import psycopg
+        except ImportError:
+            raise ImportError("writing predictions to Postgres needs psycopg (pip install 'psycopg[binary]')") from None
+        self._connect = lambda: psycopg.connect(dsn)
+        self.max_writers = pool_size
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._copy = f"COPY public.predictions ({', '.join(COLUMNS)}) FROM STDIN"
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.max_writers:
+                self._created += 1
+                return self._connect()
+        return self._pool.get()
+
+    def write(self, rows):
+        conn = self._acquire()
+        try:
+            with conn.transaction(), conn.cursor() as cur, cur.copy(self._copy) as copy:
+                for row in rows:
+                    copy.write_row(row)
+        except Exception:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            raise
+        self._pool.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def open_backend(dsn):
+    """Backend for ``postgresql://...`` or ``sqlite:///path`` DSNs."""
+    if dsn.startswith(("postgres://", "postgresql://")):
+        return PostgresBackend(dsn)
+    if dsn.startswith("sqlite:///"):
+        return SQLiteBackend(dsn[len("sqlite:///"):])
+    raise ValueError(f"unsupported predictions DSN {dsn!r} (use postgresql://... or sqlite:///path)")
+
+
+class SinkError(RuntimeError):
+    """A background write failed; raised on the next submit/flush."""
+
+
+class PredictionSink:
+    """Buffered, batched writer for prediction rows.
+
+    Rows collect in a buffer; every ``batch_size`` rows the buffer becomes
+    one batch on a bounded queue drained by the writer threads. When
+    ``max_pending_batches`` are waiting, ``submit`` blocks until a writer
+    catches up. Writers also flush a partial buffer after
+    ``flush_interval`` seconds of quiet, so single predictions are not
+    held back indefinitely.
+    """
+
+    def __init__(self, backend, batch_size=None, max_pending_batches=None, writers=None,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.backend = backend
+        self.batch_size = batch_size or DEFAULT_BATCH_SIZE
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending_batches or DEFAULT_MAX_PENDING_BATCHES)
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._error = None
+        self._closed = False
+        self.stats = {"rows_submitted": 0, "rows_written": 0, "batches": 0,
+                      "write_seconds": 0.0, "blocked_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+        n_writers = max(1, min(writers or getattr(backend, "max_writers", 1), getattr(backend, "max_writers", 1)))
+        self._writers = [threading.Thread(target=self._run, name=f"prediction-sink-{i}", daemon=True)
+                         for i in range(n_writers)]
+        for thread in self._writers:
+            thread.start()
+        # Writers are daemon threads; don't lose the tail of the buffer on exit.
+        atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- producer side ----
+    def submit(self, user_id, features, prediction, created_at=None):
+        """Queue one prediction; ``features`` is a JSON-serializable dict."""
+        self.submit_rows([(user_id, json.dumps(features), int(prediction), created_at or utc_now())])
+
+    def submit_frame(self, user_id, frame, churn_prob, model_version=None, created_at=None):
+        """Queue a scored chunk: raw columns plus probability go into ``features``."""
+        from churn_pipeline import ID_COLUMN, RAW_COLUMNS  # pandas is only needed for frames
+
+        columns = [col for col in [ID_COLUMN, *RAW_COLUMNS] if col in frame]
+        features = frame[columns].assign(churn_probability=churn_prob)
+        for col in features.select_dtypes("float32"):
+            # 29.85 rather than its float32 neighbour 29.8500003815
+            features[col] = features[col].astype("float64").round(6)
+        if model_version is not None:
+            features["model_version"] = model_version
+        payloads = features.to_json(orient="records", lines=True).splitlines()
+        created_at = created_at or utc_now()
+        predictions = (churn_prob > DEFAULT_THRESHOLD).astype(int).tolist()
+        self.submit_rows([(user_id, payload, label, created_at) for payload, label in zip(payloads, predictions)])
+
+    def submit_rows(self, rows):
+        """Queue ``(user_id, features_json, prediction, created_at)`` tuples."""
+        self._raise_if_failed()
+        if self._closed:
+            raise SinkError("prediction sink is closed")
+        batches = []
+        with self._buffer_lock:
+            self._buffer.extend(rows)
+            while len(self._buffer) >= self.batch_size:
+                batches.append(self._buffer[:self.batch_size])
+                del self._buffer[:self.batch_size]
+        with self._stats_lock:
+            self.stats["rows_submitted"] += len(rows)
+        for batch in batches:
+            self._enqueue(batch)
+
+    def _enqueue(self, batch):
+        start = time.perf_counter()
+        self._queue.put(batch)  # blocks while the writers are behind
+        with self._stats_lock:
+            self.stats["blocked_seconds"] += time.perf_counter() - start
+
+    def _take_buffer(self):
+        with self._buffer_lock:
+            batch, self._buffer = self._buffer, []
+        return batch
+
+    def flush(self):
+        """Write everything submitted so far and wait for it to land."""
+        batch = self._take_buffer()
+        if batch:
+            self._enqueue(batch)
+        self._queue.join()
+        self._raise_if_failed()
+
+    def close(self):
+        if self._closed:
+            return
+        atexit.unregister(self.close)
+        try:
+            self.flush()
+        finally:
+            self._closed = True
+            for _ in self._writers:
+                self._queue.put(None)
+            for thread in self._writers:
+                thread.join()
+            self.backend.close()
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise SinkError(f"writing predictions failed: {self._error!r}") from self._error
+
+    # ---- writer side ----
+    def _write(self, batch):
+        if self._error is not None:
+            return  # keep draining so producers never block on a dead sink
+        start = time.perf_counter()
+        try:
+            self.backend.write(batch)
+        except Exception as e:
+            self._error = e
+            return
+        with self._stats_lock:
+            self.stats["rows_written"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["write_seconds"] += time.perf_counter() - start
+
+    def _run(self):
+        while True:
+            try:
+                batch = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                # Quiet for a while: hand the partial buffer over as a batch
+                # (under the lock, so a concurrent flush() still waits for it).
+                # Producers can fill the queue meanwhile; then the buffer
+                # simply waits for the next quiet spell.
+                with self._buffer_lock:
+                    if self._buffer:
+                        try:
+                            self._queue.put_nowait(self._buffer)
+                        except queue.Full:
+                            continue
+                        self._buffer = []
+                continue
+            try:
+                if batch is None:
+                    return
+                self._write(batch)
+            finally:
+                self._queue.task_done()
+
+
+def open_sink(dsn=None, **kwargs):
+    """PredictionSink for ``dsn`` (default: CHURN_PREDICTIONS_DSN), or None when unset."""
+    dsn = dsn or default_dsn()
+    if not dsn:
+        return None
+    return PredictionSink(open_backend(dsn), **kwargs)
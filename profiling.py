@@ -0,0 +1,169 @@
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# ===============================
+# 🩺 RERUN INSTRUMENTATION
+# ===============================
+# Timing spans for each Streamlit rerun, aggregated across reruns, with an
+# opt-in cProfile of the whole script:
+#
+#   CHURN_PROFILE=1       profile every rerun with cProfile
+#   CHURN_DIAGNOSTICS=1   always show the diagnostics panel (otherwise only
+#                         with ?diagnostics=1 in the URL)
+#   CHURN_TRACE_FILE=...  append each rerun's spans to a JSON-lines file
+#
+# Traces export in the Chrome trace-event format (chrome://tracing, Perfetto).
+
+PROFILE_ENABLED = os.environ.get("CHURN_PROFILE", "0") == "1"
+DIAGNOSTICS_ENABLED = os.environ.get("CHURN_DIAGNOSTICS", "0") == "1"
+TRACE_FILE = os.environ.get("CHURN_TRACE_FILE")
+
+RECENT_SAMPLES = 500
+PROFILE_TOP = 30
+
+
+class RerunTrace:
+    """Spans for one rerun.
+
+    ``stage(name)`` closes the current top-level stage and opens the next,
+    so the script can be marked section by section; ``span(name)`` nests
+    inside whatever is open.
+    """
+
+    def __init__(self, profile=None):
+        self.start = time.perf_counter()
+        self.wall_start = time.time()
+        self.spans = []
+        self._stack = []
+        self._stage = None
+        self.finished = False
+        self.profiler = None
+        if PROFILE_ENABLED if profile is None else profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def _open(self, name):
+        span = {"name": name, "start": time.perf_counter() - self.start, "seconds": None,
+                "depth": len(self._stack)}
+        self.spans.append(span)
+        self._stack.append(span)
+        return span
+
+    def _close(self, span):
+        span["seconds"] = time.perf_counter() - self.start - span["start"]
+        while self._stack and self._stack.pop() is not span:
+            pass
+
+    def stage(self, name):
+        if self._stage is not None:
+            self._close(self._stage)
+        self._stage = self._open(name)
+
+    @contextmanager
+    def span(self, name):
+        span = self._open(name)
+        try:
+            yield span
+        finally:
+            self._close(span)
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def finish(self):
+        """Close open spans and stop the profiler; safe to call twice."""
+        if self.finished:
+            return self
+        if self._stage is not None:
+            self._close(self._stage)
+            self._stage = None
+        for span in reversed(self._stack):
+            span["seconds"] = time.perf_counter() - self.start - span["start"]
+        self._stack = []
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.finished = True
+        return self
+
+    def summary(self):
+        return {
+            "timestamp": self.wall_start,
+            "total_seconds": self.elapsed(),
+            "spans": [{"name": s["name"], "depth": s["depth"], "seconds": s["seconds"]} for s in self.spans],
+        }
+
+    def chrome_trace(self):
+        """Trace-event JSON for chrome://tracing or ui.perfetto.dev."""
+        base_us = self.wall_start * 1e6
+        events = [{
+            "name": s["name"], "ph": "X", "pid": os.getpid(), "tid": s["depth"],
+            "ts": base_us + s["start"] * 1e6, "dur": (s["seconds"] or 0.0) * 1e6,
+        } for s in self.spans]
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+    def profile_text(self, limit=PROFILE_TOP):
+        if self.profiler is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    def profile_bytes(self):
+        """The profile in pstats' on-disk format (open with pstats or snakeviz)."""
+        if self.profiler is None:
+            return None
+        self.profiler.create_stats()
+        return marshal.dumps(self.profiler.stats)
+
+
+class SpanStats:
+    """Recent span durations across reruns, for p50/p95 per span."""
+
+    def __init__(self, samples=RECENT_SAMPLES):
+        self._durations = defaultdict(lambda: deque(maxlen=samples))
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+        self.reruns = 0
+
+    def record(self, trace):
+        with self._lock:
+            self.reruns += 1
+            for span in trace.spans:
+                if span["seconds"] is not None:
+                    self._durations[span["name"]].append(span["seconds"])
+                    self._counts[span["name"]] += 1
+            self._durations["(rerun)"].append(trace.elapsed())
+            self._counts["(rerun)"] += 1
+
+    def summary(self):
+        with self._lock:
+            rows = []
+            for name, durations in self._durations.items():
+                values = np.fromiter(durations, dtype=np.float64) * 1000
+                rows.append({
+                    "span": name,
+                    "count": self._counts[name],
+                    "p50 ms": round(float(np.percentile(values, 50)), 2),
+                    "p95 ms": round(float(np.percentile(values, 95)), 2),
+                    "max ms": round(float(values.max()), 2),
+                })
+        return sorted(rows, key=lambda row: -row["p50 ms"])
+
+
+def append_trace(trace, path=None):
+    """Append the rerun's span summary to a JSON-lines file (CHURN_TRACE_FILE)."""
+    path = path or TRACE_FILE
+    if not path:
+        return
+    with open(path, "a") as f:
+        f.write(json.dumps(trace.summary()) + "\n")
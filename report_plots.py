@@ -0,0 +1,255 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+# ===============================
+# 🖼️ REPORT FIGURES
+# ===============================
+# Figures are rendered from small pre-aggregated arrays (counts, binned
+# histograms, box statistics), never from the full frame, in a pool of
+# worker processes on the non-interactive Agg backend. A manifest records a
+# fingerprint of each figure's inputs so unchanged figures are skipped.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MANIFEST = os.path.join(BASE_DIR, ".cache", "plots.json")
+
+FULL_DPI = 300
+PREVIEW_DPI = 72
+
+CHURN_COLORS = ['#2ecc71', '#e74c3c']
+MAX_FLIERS = 500
+
+
+def plot_dpi():
+    """300 dpi by default; CHURN_PLOT_PREVIEW=1 renders quick 72 dpi previews."""
+    if os.environ.get("CHURN_PLOT_PREVIEW", "0") == "1":
+        return PREVIEW_DPI
+    return int(os.environ.get("CHURN_PLOT_DPI", FULL_DPI))
+
+
+# ---- aggregation (runs once, in the parent) ----
+def box_stats(values, label):
+    """The numbers matplotlib's bxp needs, computed in NumPy (1.5 IQR whiskers)."""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    q1, med, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    fliers = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+    if len(fliers) > MAX_FLIERS:
+        fliers = np.random.default_rng(0).choice(fliers, MAX_FLIERS, replace=False)
+    return {"label": label, "q1": q1, "med": med, "q3": q3,
+            "whislo": inside.min(), "whishi": inside.max(), "fliers": fliers}
+
+
+def eda_summary(df, hist_bins=30):
+    """Everything the EDA figures need, reduced to a few small arrays."""
+    churn = (df['Churn'] == 'Yes').to_numpy()
+    tenure = df['tenure'].to_numpy(dtype=np.float64)
+    summary = {
+        'churn_counts': df['Churn'].value_counts(),
+        'contract_churn': pd.crosstab(df['Contract'], df['Churn'], normalize='index') * 100,
+        'correlation': df[['tenure', 'MonthlyCharges']].corr(),
+        'tenure_hist': {},
+        'charges_boxes': {},
+    }
+    for label, mask in (('No', ~churn), ('Yes', churn)):
+        # Each class gets its own bin range, as pandas' .hist(bins=30) did.
+        counts, edges = np.histogram(tenure[mask], bins=hist_bins)
+        summary['tenure_hist'][label] = (counts, edges)
+    for column in ('MonthlyCharges', 'TotalCharges'):
+        values = df[column].to_numpy(dtype=np.float64)
+        summary['charges_boxes'][column] = [box_stats(values[~churn], 'No'), box_stats(values[churn], 'Yes')]
+    return summary
+
+
+# ---- renderers (run in workers; each gets only its aggregates) ----
+def render_churn_distribution(data, path, dpi):
+    plt.figure(figsize=(8, 6))
+    data.plot(kind='bar', color=CHURN_COLORS)
+    plt.title('Customer Churn Distribution', fontsize=16, fontweight='bold')
+    plt.xlabel('Churn Status')
+    plt.ylabel('Number of Customers')
+    plt.xticks(rotation=0)
+    _save(path, dpi)
+
+
+def render_churn_by_contract(data, path, dpi):
+    plt.figure(figsize=(10, 6))
+    data.plot(kind='bar', stacked=False, color=CHURN_COLORS, ax=plt.gca())
+    plt.title('Churn Rate by Contract Type', fontsize=16, fontweight='bold')
+    plt.xlabel('Contract Type')
+    plt.ylabel('Percentage (%)')
+    plt.xticks(rotation=45)
+    plt.legend(['No Churn', 'Churn'])
+    _save(path, dpi)
+
+
+def render_tenure_distribution(data, path, dpi):
+    fig, axes = plt.subplots(1, 2, figsize=(14, 5))
+    for ax, (label, title), color in zip(axes, (('No', 'No Churn'), ('Yes', 'Churn')), CHURN_COLORS):
+        counts, edges = data[label]
+        ax.hist(edges[:-1], bins=edges, weights=counts, color=color, alpha=0.7)
+        ax.grid(True)
+        ax.set_title(f'Tenure Distribution - {title}', fontsize=14, fontweight='bold')
+        ax.set_xlabel('Tenure (months)')
+        ax.set_ylabel('Frequency')
+    _save(path, dpi)
+
+
+def render_charges_distribution(data, path, dpi):
+    fig, axes = plt.subplots(1, 2, figsize=(12, 6))
+    for ax, (column, title) in zip(axes, (('MonthlyCharges', 'Monthly Charges by Churn Status'),
+                                          ('TotalCharges', 'Total Charges by Churn Status'))):
+        boxes = ax.bxp(data[column], patch_artist=True, widths=0.8)
+        for patch, color in zip(boxes['boxes'], CHURN_COLORS):
+            patch.set_facecolor(color)
+        ax.set_xlabel('Churn')
+        ax.set_ylabel(column)
+        ax.set_title(title, fontsize=14, fontweight='bold')
+    _save(path, dpi)
+
+
+def render_correlation_heatmap(data, path, dpi):
+    import seaborn as sns
+
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(data, annot=True, cmap='coolwarm', center=0, square=True)
+    plt.title('Correlation Heatmap - Numerical Features', fontsize=16, fontweight='bold')
+    _save(path, dpi)
+
+
+def render_confusion_matrix(data, path, dpi):
+    import seaborn as sns
+
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(data['cm'], annot=True, fmt='d', cmap='Blues', cbar=False)
+    plt.title(f"Confusion Matrix - {data['model_name']}", fontsize=16, fontweight='bold')
+    plt.ylabel('Actual')
+    plt.xlabel('Predicted')
+    _save(path, dpi)
+
+
+def render_roc_curve(data, path, dpi):
+    plt.figure(figsize=(10, 6))
+    plt.plot(data['fpr'], data['tpr'], color='#e74c3c', lw=2, label=f"ROC Curve (AUC = {data['roc_auc']:.4f})")
+    plt.plot([0, 1], [0, 1], color='gray', lw=2, linestyle='--', label='Random Classifier')
+    plt.xlim([0.0, 1.0])
+    plt.ylim([0.0, 1.05])
+    plt.xlabel('False Positive Rate', fontsize=12)
+    plt.ylabel('True Positive Rate', fontsize=12)
+    plt.title(f"ROC Curve - {data['model_name']}", fontsize=16, fontweight='bold')
+    plt.legend(loc="lower right")
+    plt.grid(alpha=0.3)
+    _save(path, dpi)
+
+
+def render_feature_importance(data, path, dpi):
+    plt.figure(figsize=(12, 8))
+    plt.barh(range(len(data)), data['Importance'], color='#3498db')
+    plt.yticks(range(len(data)), data['Feature'])
+    plt.xlabel('Importance Score', fontsize=12)
+    plt.title('Top 15 Most Important Features', fontsize=16, fontweight='bold')
+    plt.gca().invert_yaxis()
+    _save(path, dpi)
+
+
+def render_model_comparison(data, path, dpi):
+    fig, axes = plt.subplots(2, 2, figsize=(16, 12))
+    metrics_to_plot = ['Accuracy', 'Precision', 'Recall', 'ROC-AUC']
+    colors = ['#3498db', '#2ecc71', '#e74c3c', '#f39c12']
+    for idx, (metric, color) in enumerate(zip(metrics_to_plot, colors)):
+        ax = axes[idx // 2, idx % 2]
+        ordered = data.sort_values(metric, ascending=True)
+        ax.barh(ordered['Model'], ordered[metric], color=color, alpha=0.8)
+        ax.set_xlabel(metric, fontsize=12, fontweight='bold')
+        ax.set_title(f'Model Comparison - {metric}', fontsize=14, fontweight='bold')
+        ax.set_xlim([0, 1])
+        for i, v in enumerate(ordered[metric]):
+            ax.text(v + 0.01, i, f'{v:.3f}', va='center', fontsize=10)
+    _save(path, dpi)
+
+
+def _save(path, dpi):
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close('all')
+
+
+# ---- scheduling ----
+def eda_figures(summary):
+    return [
+        ('churn_distribution.png', render_churn_distribution, summary['churn_counts']),
+        ('churn_by_contract.png', render_churn_by_contract, summary['contract_churn']),
+        ('tenure_distribution.png', render_tenure_distribution, summary['tenure_hist']),
+        ('charges_distribution.png', render_charges_distribution, summary['charges_boxes']),
+        ('correlation_heatmap.png', render_correlation_heatmap, summary['correlation']),
+    ]
+
+
+def _fingerprint(render, data, dpi):
+    digest = hashlib.sha256(inspect.getsource(render).encode())
+    digest.update(pickle.dumps((data, dpi), protocol=4))
+    return digest.hexdigest()
+
+
+_styled = False
+
+
+def _render(render, data, path, dpi):
+    global _styled
+    if not _styled:
+        import seaborn as sns
+
+        sns.set_style('whitegrid')
+        plt.rcParams['figure.figsize'] = (12, 6)
+        _styled = True
+    render(data, path, dpi)
+    return path
+
+
+def render_figures(figures, dpi=None, workers=None, manifest_path=None, force=False):
+    """Render ``(filename, renderer, data)`` figures, skipping unchanged ones.
+
+    Returns ``{"rendered": [...], "skipped": [...]}``.
+    """
+    dpi = dpi or plot_dpi()
+    manifest_path = manifest_path or DEFAULT_MANIFEST
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    todo, skipped = [], []
+    for path, render, data in figures:
+        fingerprint = _fingerprint(render, data, dpi)
+        if not force and manifest.get(os.path.abspath(path)) == fingerprint and os.path.exists(path):
+            skipped.append(path)
+        else:
+            todo.append((path, render, data, fingerprint))
+
+    workers = min(len(todo), workers or os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_render, *zip(*[(r, d, p, dpi) for p, r, d, _ in todo])))
+    else:
+        for path, render, data, _ in todo:
+            _render(render, data, path, dpi)
+
+    for path, _, _, fingerprint in todo:
+        manifest[os.path.abspath(path)] = fingerprint
+    if todo:
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=1)
+    return {"rendered": [p for p, _, _, _ in todo], "skipped": skipped}
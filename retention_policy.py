@@ -0,0 +1,180 @@
+import argparse
+import os
+from collections import namedtuple
+
+import numpy as np
+
+# ===============================
+# 🎯 THRESHOLDS & RETENTION TIERS
+# ===============================
+# Decisions over scored probabilities for a whole population at once:
+#
+#   threshold_sweep  flagged / TP / FP / precision / recall / F1 / campaign
+#                    cost at every distinct threshold, from one sort and a
+#                    cumulative sum (no per-threshold loop)
+#   assign_tiers     retention tier per customer with one searchsorted
+#
+# A customer is flagged when churn_probability > threshold, as everywhere
+# else in the repo. Without labels the probabilities stand in for the
+# outcomes (expected churners caught and missed), which is what sizing a
+# campaign on a fresh export needs. Costs and the default cutoff come from
+# CHURN_THRESHOLD, CHURN_CONTACT_COST, CHURN_LOST_CUSTOMER_COST and
+# CHURN_SAVE_RATE.
+
+DEFAULT_THRESHOLD = float(os.environ.get("CHURN_THRESHOLD", "0.5"))
+CONTACT_COST = float(os.environ.get("CHURN_CONTACT_COST", "10"))
+LOST_CUSTOMER_COST = float(os.environ.get("CHURN_LOST_CUSTOMER_COST", "100"))
+SAVE_RATE = float(os.environ.get("CHURN_SAVE_RATE", "0.5"))
+
+Tier = namedtuple("Tier", ["name", "above", "suggestion"])
+
+# Highest risk first; a customer lands in the first tier whose bound the
+# probability is strictly above.
+RETENTION_TIERS = [
+    Tier("loyalty", 0.8, "Offer a **loyalty discount**, upgrade plan benefits, or assign a **personal relationship manager**."),
+    Tier("targeted", 0.6, "Send **targeted offers** or **personalized recommendations** to improve engagement."),
+    Tier("engage", 0.4, "Encourage through **customer satisfaction surveys** or **reward points**."),
+    Tier("maintain", None, "Customer is satisfied. Maintain service quality and provide **regular engagement**."),
+]
+TIER_NAMES = [tier.name for tier in RETENTION_TIERS]
+_TIER_BOUNDS = np.array([tier.above for tier in RETENTION_TIERS[-2::-1]])  # ascending: 0.4, 0.6, 0.8
+
+SWEEP_COLUMNS = ["threshold", "flagged", "tp", "fp", "fn", "tn", "precision", "recall", "f1", "cost"]
+
+
+def assign_tiers(churn_prob):
+    """Tier index per customer (0 = highest risk) as int8.
+
+    Raises ValueError for NaN or infinite probabilities, which searchsorted
+    would otherwise sort above every bound into the highest-risk tier.
+    """
+    churn_prob = np.asarray(churn_prob, dtype=np.float64)
+    bad = ~np.isfinite(churn_prob)
+    if bad.any():
+        raise ValueError(f"{int(bad.sum())} churn probabilities are not finite (first at row {int(np.argmax(bad))})")
+    above = np.searchsorted(_TIER_BOUNDS, churn_prob, side="left")
+    return (len(_TIER_BOUNDS) - above).astype(np.int8)
+
+
+def assign_tier(churn_prob):
+    """The Tier for a single probability."""
+    return RETENTION_TIERS[int(assign_tiers([churn_prob])[0])]
+
+
+def tier_summary(churn_prob, tiers=None):
+    """Customers and expected churners per tier, highest risk first."""
+    churn_prob = np.asarray(churn_prob, dtype=np.float64)
+    tiers = assign_tiers(churn_prob) if tiers is None else tiers
+    counts = np.bincount(tiers, minlength=len(RETENTION_TIERS))
+    expected = np.bincount(tiers, weights=churn_prob, minlength=len(RETENTION_TIERS))
+    return [{"tier": name, "customers": int(n), "expected_churners": float(e)}
+            for name, n, e in zip(TIER_NAMES, counts, expected)]
+
+
+def threshold_sweep(churn_prob, y_true=None, contact_cost=None, lost_customer_cost=None, save_rate=None):
+    """Confusion counts and campaign cost at every distinct threshold.
+
+    Row ``j`` flags the customers with probability > ``threshold[j]``:
+    row 0 flags nobody (threshold = highest probability) and the last row
+    everyone (threshold = -inf). ``cost`` is contacting the flagged
+    customers plus losing the churners who were missed or not saved::
+
+        contact_cost * flagged + lost_customer_cost * (fn + (1 - save_rate) * tp)
+
+    With ``y_true=None`` the counts are expectations under the scores.
+    Returns a dict of equal-length arrays (SWEEP_COLUMNS) plus ``rows``
+    and ``positives``.
+    """
+    contact_cost = CONTACT_COST if contact_cost is None else contact_cost
+    lost_customer_cost = LOST_CUSTOMER_COST if lost_customer_cost is None else lost_customer_cost
+    save_rate = SAVE_RATE if save_rate is None else save_rate
+
+    prob = np.asarray(churn_prob, dtype=np.float64).ravel()
+    # Order within a run of equal probabilities never matters (only the
+    # cumulative sums at run ends are used), so an unstable sort will do.
+    if y_true is None:
+        ranked = np.sort(prob)[::-1]
+        outcome = ranked
+    else:
+        order = np.argsort(prob)[::-1]
+        ranked = prob[order]
+        outcome = np.asarray(y_true, dtype=np.float64).ravel()[order]
+    n = len(ranked)
+
+    # last position of every run of equal probabilities = one threshold each
+    ends = np.r_[np.flatnonzero(np.diff(ranked)), n - 1] if n else np.empty(0, dtype=np.intp)
+    caught = np.cumsum(outcome)
+    flagged = np.r_[0, ends + 1].astype(np.int64)
+    tp = np.r_[0.0, caught[ends]]
+    positives = float(caught[-1]) if n else 0.0
+    fp = flagged - tp
+    fn = positives - tp
+    tn = (n - flagged) - fn
+    thresholds = np.r_[ranked[ends], -np.inf] if n else np.array([np.inf])
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        precision = np.where(flagged > 0, tp / flagged, 1.0)
+        recall = np.where(positives > 0, tp / positives, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    cost = contact_cost * flagged + lost_customer_cost * (fn + (1 - save_rate) * tp)
+    return {
+        "threshold": thresholds, "flagged": flagged, "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        "precision": precision, "recall": recall, "f1": f1, "cost": cost,
+        "rows": n, "positives": positives,
+    }
+
+
+def _row(sweep, j):
+    return {col: (int(sweep[col][j]) if col == "flagged" else float(sweep[col][j])) for col in SWEEP_COLUMNS}
+
+
+def at_threshold(sweep, threshold):
+    """The sweep row for flagging probability > ``threshold``."""
+    values = sweep["threshold"][:-1][::-1]  # ascending distinct probabilities
+    return _row(sweep, len(values) - np.searchsorted(values, threshold, side="right"))
+
+
+def best_threshold(sweep, metric="cost"):
+    """Sweep row with the lowest cost (``metric="cost"``) or the highest F1/precision/recall."""
+    values = sweep[metric]
+    return _row(sweep, int(np.argmin(values) if metric == "cost" else np.argmax(values)))
+
+
+def campaign_table(sweep, thresholds=(0.3, 0.4, 0.5, 0.6, 0.7, 0.8)):
+    return [at_threshold(sweep, t) | {"threshold": t} for t in thresholds]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Size a retention campaign from a scored file.")
+    parser.add_argument("scores", help="CSV with a churn_probability column (batch_scoring.py output)")
+    parser.add_argument("--labels", default=None,
+                        help="CSV with the actual Churn column in the same row order (default: expected outcomes)")
+    parser.add_argument("--contact-cost", type=float, default=CONTACT_COST)
+    parser.add_argument("--lost-customer-cost", type=float, default=LOST_CUSTOMER_COST)
+    parser.add_argument("--save-rate", type=float, default=SAVE_RATE)
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    churn_prob = pd.read_csv(args.scores, usecols=["churn_probability"])["churn_probability"].to_numpy()
+    y_true = None
+    if args.labels:
+        y_true = (pd.read_csv(args.labels, usecols=["Churn"])["Churn"] == "Yes").to_numpy()
+    sweep = threshold_sweep(churn_prob, y_true, args.contact_cost, args.lost_customer_cost, args.save_rate)
+
+    basis = "actual labels" if y_true is not None else "expected outcomes"
+    print(f"{sweep['rows']:,} customers, {sweep['positives']:,.0f} churners ({basis})\n")
+    for row in tier_summary(churn_prob):
+        print(f"  {row['tier']:<10}{row['customers']:>12,} customers{row['expected_churners']:>14,.0f} expected churners")
+    print(f"\n{'Threshold':>10}{'Flagged':>12}{'Precision':>11}{'Recall':>9}{'F1':>7}{'Cost':>16}")
+    for row in campaign_table(sweep):
+        print(f"{row['threshold']:>10.2f}{row['flagged']:>12,}{row['precision']:>11.3f}{row['recall']:>9.3f}"
+              f"{row['f1']:>7.3f}{row['cost']:>16,.0f}")
+    for metric in ("cost", "f1"):
+        row = best_threshold(sweep, metric)
+        print(f"\nBest {metric}: flag churn_probability > {row['threshold']:.4f} — {row['flagged']:,} customers, "
+              f"precision {row['precision']:.3f}, recall {row['recall']:.3f}, cost {row['cost']:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
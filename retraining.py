@@ -0,0 +1,148 @@
+import argparse
+import copy
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from churn_pipeline import TARGET_COLUMN, ChurnPipeline, ChurnPreprocessor
+from data_ingest import load_telco
+from model_store import PROMOTION_MARGIN, load_champion, print_decision, publish
+from retention_policy import best_threshold, threshold_sweep
+from training_engine import evaluate_model
+
+# ===============================
+# 🔄 WARM-START RETRAINING
+# ===============================
+# Refreshes the served model on new data without redoing the model zoo:
+# the challenger is the champion's model, continued from where it stopped
+#
+#   Logistic Regression  lbfgs starts from the champion's coefficients
+#   Gradient Boosting    keeps its stages and fits CHURN_WARM_ROUNDS more
+#   XGBoost              continues the champion's booster for CHURN_WARM_ROUNDS
+#   anything else        refit from scratch with the same hyperparameters
+#
+# Warm starts keep the champion's preprocessor and scaler, so its
+# parameters still mean the same features; data with category levels it
+# never saw falls back to a cold fit. The challenger then goes through
+# model_store.publish: saved as a new version, compared with the champion
+# on the test split and promoted only if it is strictly better.
+#
+#   python retraining.py --data new_export.csv
+#   python retraining.py --cold --force
+
+WARM_ROUNDS = int(os.environ.get("CHURN_WARM_ROUNDS", "50"))
+# Boosting only ever grows under warm starts; past this many rounds retrain cold.
+MAX_BOOSTING_ROUNDS = int(os.environ.get("CHURN_MAX_BOOSTING_ROUNDS", "1000"))
+
+
+def warm_start_model(model, n_rounds=WARM_ROUNDS):
+    """``(unfitted challenger, fit kwargs, description)`` continuing from a fitted ``model``."""
+    if isinstance(model, LogisticRegression) and model.solver != "liblinear":
+        challenger = clone(model).set_params(warm_start=True)
+        challenger.coef_ = model.coef_.copy()
+        challenger.intercept_ = model.intercept_.copy()
+        return challenger, {}, "from the champion's coefficients"
+    if isinstance(model, GradientBoostingClassifier) and model.n_estimators_ + n_rounds <= MAX_BOOSTING_ROUNDS:
+        challenger = copy.deepcopy(model).set_params(warm_start=True, n_estimators=model.n_estimators_ + n_rounds)
+        return challenger, {}, f"{model.n_estimators_} stages + {n_rounds}"
+    if isinstance(model, xgb.XGBClassifier):
+        booster = model.get_booster()
+        if booster.num_boosted_rounds() + n_rounds <= MAX_BOOSTING_ROUNDS:
+            return (clone(model).set_params(n_estimators=n_rounds), {"xgb_model": booster},
+                    f"{booster.num_boosted_rounds()} rounds + {n_rounds}")
+    return clone(model), {}, "cold (no warm start for this model)"
+
+
+def retrain(df, champion, cold=False, n_rounds=WARM_ROUNDS):
+    """Fit the challenger on ``df``; returns ``(pipeline, split, holdout, info)``."""
+    y = (df[TARGET_COLUMN] == 'Yes').astype(int)
+    preprocessor, scaler, features = None, None, None
+    if not cold:
+        try:
+            features = champion.pipeline.preprocessor.encode_frame(df)
+            preprocessor, scaler = champion.pipeline.preprocessor, champion.pipeline.scaler
+        except ValueError as e:
+            print(f"⚠️ Champion preprocessing does not fit this data ({e}); retraining cold")
+    if preprocessor is None:
+        preprocessor = ChurnPreprocessor.fit(df)
+        features = preprocessor.encode_frame(df)
+    X = pd.DataFrame(features, columns=preprocessor.feature_columns, index=df.index)
+
+    # the split predicting_customer_churn.py uses, so the test rows match its holdout
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    if scaler is None:
+        scaler = StandardScaler().fit(X_train)
+    split = {'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test,
+             'X_train_scaled': scaler.transform(X_train), 'X_test_scaled': scaler.transform(X_test),
+             'scaler': scaler}
+
+    if scaler is champion.pipeline.scaler:
+        model, fit_kwargs, mode = warm_start_model(champion.model, n_rounds)
+    else:
+        model, fit_kwargs, mode = clone(champion.model), {}, "cold"
+    start = time.perf_counter()
+    model.fit(split['X_train_scaled'], np.asarray(y_train), **fit_kwargs)
+    fit_seconds = time.perf_counter() - start
+    if 'warm_start' in model.get_params():
+        model.set_params(warm_start=False)  # a later plain fit() starts fresh again
+
+    metrics = evaluate_model(model, split['X_test_scaled'], y_test)
+    sweep = threshold_sweep(model.predict_proba(split['X_test_scaled'])[:, 1], np.asarray(y_test))
+    pipeline = ChurnPipeline(preprocessor, scaler, model, {
+        "model_name": champion.pipeline.metadata.get("model_name", type(model).__name__),
+        "roc_auc": float(metrics['ROC-AUC']),
+        "n_train": int(len(X_train)),
+        "best_f1_threshold": best_threshold(sweep, 'f1')['threshold'],
+        "min_cost_threshold": best_threshold(sweep, 'cost')['threshold'],
+    })
+    info = {"mode": mode, "fit_seconds": fit_seconds, "metrics": metrics,
+            "n_iter": int(np.max(model.n_iter_)) if hasattr(model, "n_iter_") else None}
+    return pipeline, split, df.loc[X_test.index], info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain the served churn model on fresh data and promote it if it is better.")
+    parser.add_argument("--data", default=None, help="CSV export (default: CHURN_DATA_PATH or the bundled file)")
+    parser.add_argument("--model-dir", default=os.environ.get("CHURN_MODEL_DIR", "models"),
+                        help="versioned model directory (default: CHURN_MODEL_DIR or models/)")
+    parser.add_argument("--rounds", type=int, default=WARM_ROUNDS, help="boosting rounds to add on a warm start")
+    parser.add_argument("--cold", action="store_true", help="refit from scratch with the champion's hyperparameters")
+    parser.add_argument("--margin", type=float, default=PROMOTION_MARGIN,
+                        help="ROC-AUC the challenger must gain over the champion to be promoted")
+    parser.add_argument("--force", action="store_true", help="promote even if the champion scores better")
+    args = parser.parse_args()
+
+    # Deferred: pulls in the plotting and training modules
+    from predicting_customer_churn import save_artifacts
+
+    champion, error = load_champion(args.model_dir)
+    if error:
+        raise SystemExit(f"❌ Cannot load the model in '{args.model_dir}' ({error}); retrain with predicting_customer_churn.py")
+    if champion is None:
+        raise SystemExit(f"❌ No model in '{args.model_dir}' to retrain; run predicting_customer_churn.py first")
+    df = load_telco(args.data)
+    print(f"Champion {champion.version} ({type(champion.model).__name__}), {len(df):,} rows")
+
+    pipeline, split, holdout, info = retrain(df, champion, args.cold, args.rounds)
+    print(f"✓ Challenger fitted {info['mode']} in {info['fit_seconds']:.2f}s"
+          + (f" ({info['n_iter']} iterations)" if info['n_iter'] is not None else "")
+          + f" — test ROC-AUC {info['metrics']['ROC-AUC']:.4f}")
+
+    path, decision = publish(args.model_dir, pipeline, holdout, split['y_test'],
+                             lambda out_dir, version: save_artifacts(out_dir, pipeline, version, split),
+                             force=args.force, margin=args.margin,
+                             record={"warm_start": info['mode'], "parent_version": champion.version})
+    print(f"✅ Version {decision['version']} saved to '{path}'")
+    print_decision(decision)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from urllib.parse import parse_qs
+
+import numpy as np
+import pandas as pd
+
+from artifacts import ArtifactRegistry
+from churn_pipeline import RAW_COLUMNS
+from drift_monitor import DriftMonitor
+from prediction_history import TokenError, default_jwt_secret, open_history, token_user_id
+from retention_policy import DEFAULT_THRESHOLD, TIER_NAMES, assign_tiers
+
+# ===============================
+# 🌐 HTTP SCORING SERVICE
+# ===============================
+# Plain ASGI app serving the same ChurnPipeline as the Streamlit form,
+# run with e.g. `uvicorn scoring_service:app --workers 4`.
+#
+#   POST /predict        {"gender": "Male", "tenure": 12, ...}
+#   POST /predict/batch  {"customers": [{...}, {...}]}
+#   GET  /metrics        latency percentiles and batching stats
+#   GET  /drift          PSI/KS of this worker's traffic vs. training, plus
+#                        its sketch (merge sketches across workers with
+#                        drift_monitor.py)
+#   GET  /history?limit=50&cursor=...
+#                        a page of the caller's stored predictions, newest
+#                        first, and the cursor of the next page
+#   GET  /history/summary
+#                        prediction count, churn share, mean probability
+#                        (both need CHURN_PREDICTIONS_DSN and
+#                        CHURN_JWT_SECRET; the user comes from the
+#                        "Authorization: Bearer <Supabase access token>")
+#   GET  /health
+
+MAX_BATCH_SIZE = int(os.environ.get("CHURN_MAX_BATCH_SIZE", "256"))
+MAX_WAIT_MS = float(os.environ.get("CHURN_MAX_WAIT_MS", "2"))
+
+# null is rejected here; a null TotalCharges is a new customer and gets the fill
+REQUIRED_NUMBERS = ("SeniorCitizen", "tenure", "MonthlyCharges")
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionError(RuntimeError):
+    """The model failed on rows that passed validation (a server-side fault)."""
+
+
+class LatencyTracker:
+    """Keeps the most recent request latencies for percentile reporting."""
+
+    def __init__(self, window=10_000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self):
+        if not self.samples:
+            return {"count": self.count, "p50_ms": None, "p99_ms": None}
+        p50, p99 = np.percentile(np.fromiter(self.samples, dtype=np.float64), [50, 99]) * 1000
+        return {"count": self.count, "p50_ms": round(p50, 3), "p99_ms": round(p99, 3)}
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests into one predict_proba call.
+
+    A batch is flushed as soon as it holds ``max_batch_size`` rows or
+    ``max_wait_ms`` has passed since its first request arrived.
+    """
+
+    def __init__(self, registry, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.registry = registry
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        self.task = None
+        self.batches = 0
+        self.rows = 0
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, features, artifacts=None):
+        """Queue a scaled (n, d) matrix and wait for its churn probabilities.
+
+        ``artifacts`` should be the set the rows were encoded and scaled
+        with; a model promoted in between does not get them.
+        """
+        artifacts = artifacts or self.registry.get()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((features, artifacts, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            # one group normally; two while a newly promoted model takes over
+            groups = {}
+            for item in pending:
+                groups.setdefault(item[1].version, []).append(item)
+            for group in groups.values():
+                await self._predict(loop, group)
+
+    async def _predict(self, loop, group):
+        artifacts = group[0][1]
+        features = np.vstack([item[0] for item in group])
+        try:
+            probs = await loop.run_in_executor(None, artifacts.pipeline.predict_proba, features)
+        except Exception as exc:
+            if len(group) > 1:
+                # one request's rows must not fail everyone else's: retry each alone
+                for item in group:
+                    await self._predict(loop, [item])
+                return
+            error = PredictionError("prediction failed")
+            error.__cause__ = exc
+            if not group[0][2].done():
+                group[0][2].set_exception(error)
+            return
+
+        self.batches += 1
+        self.rows += len(features)
+        offset = 0
+        for block, _, future in group:
+            if not future.done():
+                future.set_result((probs[offset:offset + len(block)], artifacts.version))
+            offset += len(block)
+
+
+class ScoringService:
+    def __init__(self, registry=None, **batcher_options):
+        self.registry = registry or ArtifactRegistry()
+        self.batcher = MicroBatcher(self.registry, **batcher_options)
+        self.latency = LatencyTracker()
+        self.drift = DriftMonitor(self.registry)
+        # Off unless callers can be authenticated: the DSN bypasses RLS.
+        self.jwt_secret = default_jwt_secret()
+        self.history = open_history() if self.jwt_secret else None
+
+    def encode(self, customers, pipeline=None):
+        """Encoded, unscaled rows (what the drift sketch is built on).
+
+        One customer or many, a missing field raises KeyError and a value
+        that does not encode to a finite number raises ValueError, before
+        anything reaches the batcher.
+        """
+        pipeline = pipeline or self.registry.get().pipeline
+        for customer in customers:
+            if not isinstance(customer, dict):
+                raise TypeError("each customer must be a JSON object")
+            for col in RAW_COLUMNS:
+                if col not in customer:
+                    raise KeyError(col)
+                if customer[col] is None and col in REQUIRED_NUMBERS:
+                    raise ValueError(f"field '{col}' must be a finite number")
+        if len(customers) == 1:
+            features = pipeline.encode_row(customers[0]).reshape(1, -1)
+        else:
+            features = pipeline.preprocessor.encode_frame(pd.DataFrame(customers))
+        bad = ~np.isfinite(features)
+        if bad.any():
+            row, col = np.argwhere(bad)[0]
+            where = f" (customer {row})" if len(customers) > 1 else ""
+            raise ValueError(f"field '{pipeline.feature_columns[col]}' must be a finite number{where}")
+        return features
+
+    def transform(self, customers):
+        pipeline = self.registry.get().pipeline
+        return pipeline.scale(self.encode(customers, pipeline))
+
+    async def predict(self, customers):
+        artifacts = self.registry.get()
+        features = self.encode(customers, artifacts.pipeline)
+        probs, version = await self.batcher.submit(artifacts.pipeline.scale(features), artifacts)
+        self.drift.update(version, features, probs)
+        return [
+            {"churn_probability": float(p), "prediction": int(p > DEFAULT_THRESHOLD),
+             "retention_tier": TIER_NAMES[tier], "model_version": version}
+            for p, tier in zip(probs, assign_tiers(probs))
+        ]
+
+    def metrics(self):
+        batches = self.batcher.batches
+        return {
+            "latency": self.latency.summary(),
+            "batches": batches,
+            "rows": self.batcher.rows,
+            "mean_batch_rows": self.batcher.rows / batches if batches else 0.0,
+        }
+
+    # ---- ASGI plumbing ----
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.registry.get()
+                self.batcher.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.batcher.stop()
+                if self.history is not None:
+                    await self.history.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        start = time.perf_counter()
+        method, path = scope["method"], scope["path"].rstrip("/")
+        query = {key: values[-1] for key, values in parse_qs(scope.get("query_string", b"").decode()).items()}
+        try:
+            if method == "GET" and path == "/health":
+                status, payload = 200, {"status": "ok", "model_version": self.registry.get().version}
+            elif method == "GET" and path == "/metrics":
+                status, payload = 200, self.metrics()
+            elif method == "GET" and path == "/drift":
+                status, payload = 200, self.drift.report()
+            elif method == "GET" and path.startswith("/history") and self.history is None:
+                status, payload = 404, {"error": "prediction history needs CHURN_PREDICTIONS_DSN and CHURN_JWT_SECRET"}
+            elif method == "GET" and path == "/history":
+                user_id = token_user_id(_header(scope, b"authorization"), self.jwt_secret)
+                status, payload = 200, await self.history.page(user_id, query.get("limit"), query.get("cursor"))
+            elif method == "GET" and path == "/history/summary":
+                user_id = token_user_id(_header(scope, b"authorization"), self.jwt_secret)
+                status, payload = 200, await self.history.summary(user_id)
+            elif method == "POST" and path == "/predict":
+                body = await _read_json(receive)
+                status, payload = 200, (await self.predict([body]))[0]
+            elif method == "POST" and path == "/predict/batch":
+                customers = (await _read_json(receive))["customers"]
+                if not isinstance(customers, list) or not customers:
+                    raise ValueError("customers must be a non-empty list")
+                status, payload = 200, {"predictions": await self.predict(customers)}
+            else:
+                status, payload = 404, {"error": "not found"}
+        except TokenError as exc:
+            status, payload = 401, {"error": str(exc)}
+        except KeyError as exc:
+            status, payload = 400, {"error": f"missing field {exc}"}
+        except (ValueError, TypeError) as exc:
+            status, payload = 400, {"error": str(exc)}
+        except Exception:
+            # anything else (PredictionError included) is our bug or a dead
+            # database, not the client's; the details stay in the log
+            logger.exception("%s %s failed", method, path)
+            status, payload = 500, {"error": "internal server error"}
+
+        await _send_json(send, status, payload)
+        if path.startswith("/predict") and status == 200:
+            self.latency.record(time.perf_counter() - start)
+
+
+def _header(scope, name):
+    for key, value in scope.get("headers", []):
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _read_json(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return json.loads(body or b"{}")
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+app = ScoringService()
@@ -0,0 +1,103 @@
+import hashlib
+import inspect
+import os
+import time
+
+import joblib
+
+# ===============================
+# 🗃️ PIPELINE STAGE CACHE
+# ===============================
+# Disk-backed memoization for the training script's stages. A stage's key
+# hashes its own source code, its params and the keys of the stages it
+# consumed, so editing the modeling code only reruns modeling and
+# everything downstream of it.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, ".cache", "stages")
+
+# Bump to invalidate every cached stage at once.
+CACHE_VERSION = 1
+
+
+def source_hash(*objects):
+    """Hash the source of functions/modules a stage depends on."""
+    digest = hashlib.sha256()
+    for obj in objects:
+        digest.update(inspect.getsource(obj).encode())
+    return digest.hexdigest()
+
+
+class StageCache:
+    """Memoize ``func(*args)`` on disk under a key built from code, params and upstream keys.
+
+    Least recently used entries are evicted once the cache grows past
+    ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None, enabled=None):
+        self.cache_dir = cache_dir or os.environ.get("CHURN_STAGE_CACHE_DIR", DEFAULT_CACHE_DIR)
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get("CHURN_STAGE_CACHE_MB", "2048")) * 2**20)
+        self.max_bytes = max_bytes
+        if enabled is None:
+            enabled = os.environ.get("CHURN_STAGE_CACHE", "1") != "0"
+        self.enabled = enabled
+        self.log = []
+
+    def key(self, name, code, params, upstream):
+        digest = hashlib.sha256(f"v{CACHE_VERSION}|{name}|{code}|{params!r}".encode())
+        for key in upstream:
+            digest.update(key.encode())
+        return digest.hexdigest()[:20]
+
+    def _path(self, name, key):
+        return os.path.join(self.cache_dir, f"{name}-{key}.joblib")
+
+    def run(self, name, func, args=(), upstream=(), params=None, code_deps=(), validate=None):
+        """Return ``(result, key)`` for the stage, loading it from disk when cached.
+
+        ``upstream`` holds the keys of the stages whose outputs are in
+        ``args``; ``code_deps`` lists extra functions/modules whose source
+        should invalidate the stage. ``validate(result)`` may reject a hit,
+        e.g. when the files a stage wrote have since been deleted.
+        """
+        code = source_hash(func, *code_deps)
+        key = self.key(name, code, params, upstream)
+        path = self._path(name, key)
+        start = time.perf_counter()
+        if self.enabled and os.path.exists(path):
+            result = joblib.load(path)
+            if validate is None or validate(result):
+                os.utime(path)
+                self.log.append((name, "hit", time.perf_counter() - start))
+                return result, key
+
+        result = func(*args, **(params or {}))
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            joblib.dump(result, tmp_path)
+            os.replace(tmp_path, path)
+            self.evict()
+        self.log.append((name, "run", time.perf_counter() - start))
+        return result, key
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in ``max_bytes``."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".joblib"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def report(self):
+        print("\nStage cache:")
+        for name, status, seconds in self.log:
+            print(f"  {name:<18}{status:<5}{seconds:>8.2f}s")
@@ -0,0 +1,260 @@
+import argparse
+import os
+import resource
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+from churn_pipeline import (CATEGORICAL_COLUMNS, CHARGES_BINS, ID_COLUMN, TARGET_COLUMN,
+                            TENURE_BINS, ChurnPipeline, ChurnPreprocessor, bin_codes)
+from data_ingest import default_data_path, iter_csv_chunks
+from model_store import PROMOTION_MARGIN, print_decision, publish
+
+# ===============================
+# 🌊 OUT-OF-CORE TRAINING
+# ===============================
+# Trains on exports larger than RAM: every pass streams the CSV in chunks,
+# so peak memory follows --chunksize rather than the row count.
+#
+#   1. fit the preprocessor (category levels, median fills) from running stats
+#   2. StandardScaler.partial_fit on encoded chunks
+#   3. SGDClassifier(loss="log_loss").partial_fit for N epochs, each chunk
+#      shuffled, at a fixed learning rate ("adaptive" from eta0)
+#   4. evaluate on a hash-selected holdout with constant-memory metrics
+#   5. publish through model_store like any other export: a new version,
+#      compared with the served (batch) model on a sample of the holdout
+#
+# The SGD defaults (learning_rate="optimal" with alpha=1e-4, one pass over
+# rows in file order) gave holdout ROC-AUC 0.80 / log loss 1.20 on the
+# bundled data, 0.69 / 1.49 with --chunksize 1000. With the settings below
+# it is 0.85 / 0.41 at either chunk size, on par with the batch logistic
+# regression (0.846). The champion may have trained on some of the holdout
+# rows, so the comparison favours it slightly.
+#
+#   python streaming_training.py --data big_export.csv --chunksize 50000
+
+RESERVOIR_SIZE = 100_000
+AUC_BINS = 1000
+# Raw holdout and encoded training rows kept for publishing (champion
+# comparison, drift reference, compiled-model parity, explainer background).
+SAMPLE_ROWS = 20_000
+
+
+class StageMemory:
+    """Per-stage peak traced memory (tracemalloc) plus the process max RSS."""
+
+    def __init__(self):
+        self.stages = []
+        tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        yield
+        _, peak = tracemalloc.get_traced_memory()
+        self.stages.append({
+            "stage": name,
+            "seconds": time.perf_counter() - start,
+            "peak_traced_mb": peak / 2**20,
+            "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        })
+
+    def report(self):
+        print(f"\n{'Stage':<14}{'Seconds':>10}{'Peak traced MB':>17}{'Max RSS MB':>13}")
+        for row in self.stages:
+            print(f"{row['stage']:<14}{row['seconds']:>10.2f}{row['peak_traced_mb']:>17.1f}{row['max_rss_mb']:>13.1f}")
+
+
+def is_holdout(customer_ids, holdout_percent):
+    """Stable split on customerID so every pass sees the same holdout rows."""
+    hashes = pd.util.hash_pandas_object(customer_ids, index=False).to_numpy()
+    return hashes % 100 < holdout_percent
+
+
+def fit_preprocessor_streaming(chunks, seed=42):
+    """ChurnPreprocessor.fit over chunks; the TotalCharges median comes from a reservoir sample."""
+    rng = np.random.default_rng(seed)
+    levels = {col: set() for col in CATEGORICAL_COLUMNS}
+    tenure_counts = np.zeros(len(TENURE_BINS) - 1, dtype=np.int64)
+    charges_counts = np.zeros(len(CHARGES_BINS) - 1, dtype=np.int64)
+    reservoir = np.empty(RESERVOIR_SIZE, dtype=np.float64)
+    seen = 0
+    for chunk in chunks:
+        for col in CATEGORICAL_COLUMNS:
+            levels[col].update(str(v) for v in chunk[col].dropna().unique())
+        for counts, values, bins in ((tenure_counts, chunk["tenure"], TENURE_BINS),
+                                     (charges_counts, chunk["MonthlyCharges"], CHARGES_BINS)):
+            codes = bin_codes(values, bins)
+            counts += np.bincount(codes[~np.isnan(codes)].astype(np.int64), minlength=len(counts))
+        total = chunk["TotalCharges"].dropna().to_numpy(dtype=np.float64)
+        # Vectorized reservoir sampling (Algorithm R).
+        fill = min(len(total), max(0, RESERVOIR_SIZE - seen))
+        reservoir[seen:seen + fill] = total[:fill]
+        positions = seen + fill + np.arange(len(total) - fill)
+        slots = (rng.random(len(positions)) * (positions + 1)).astype(np.int64)
+        keep = slots < RESERVOIR_SIZE
+        reservoir[slots[keep]] = total[fill:][keep]
+        seen += len(total)
+
+    def count_median(counts):
+        return float(np.searchsorted(np.cumsum(counts), (counts.sum() + 1) / 2))
+
+    fill_values = {
+        "TotalCharges": float(np.median(reservoir[:min(seen, RESERVOIR_SIZE)])),
+        "TenureGroup": count_median(tenure_counts),
+        "ChargesGroup": count_median(charges_counts),
+    }
+    return ChurnPreprocessor({col: sorted(v) for col, v in levels.items()}, fill_values)
+
+
+def _encoded_chunks(path, chunksize, preprocessor, holdout_percent):
+    for chunk in iter_csv_chunks(path, chunksize):
+        features = preprocessor.encode_frame(chunk)
+        target = (chunk[TARGET_COLUMN] == "Yes").to_numpy(dtype=np.int8)
+        holdout = is_holdout(chunk[ID_COLUMN], holdout_percent)
+        yield chunk, features, target, holdout
+
+
+class StreamingMetrics:
+    """Accuracy, log loss and histogram-binned ROC-AUC in constant memory."""
+
+    def __init__(self, bins=AUC_BINS):
+        self.pos = np.zeros(bins, dtype=np.int64)
+        self.neg = np.zeros(bins, dtype=np.int64)
+        self.correct = 0
+        self.log_loss_sum = 0.0
+        self.n = 0
+
+    def update(self, y_true, proba):
+        idx = np.minimum((proba * len(self.pos)).astype(np.int64), len(self.pos) - 1)
+        self.pos += np.bincount(idx[y_true == 1], minlength=len(self.pos))
+        self.neg += np.bincount(idx[y_true == 0], minlength=len(self.neg))
+        self.correct += int(((proba > 0.5) == (y_true == 1)).sum())
+        clipped = np.clip(proba, 1e-15, 1 - 1e-15)
+        self.log_loss_sum += float(-(y_true * np.log(clipped) + (1 - y_true) * np.log(1 - clipped)).sum())
+        self.n += len(y_true)
+
+    def summary(self):
+        # Pairs ranked correctly, counting ties within a bin as half.
+        neg_below = np.cumsum(self.neg) - self.neg
+        auc_pairs = (self.pos * (neg_below + 0.5 * self.neg)).sum()
+        total_pairs = self.pos.sum() * self.neg.sum()
+        return {
+            "rows": self.n,
+            "accuracy": self.correct / self.n if self.n else float("nan"),
+            "log_loss": self.log_loss_sum / self.n if self.n else float("nan"),
+            "roc_auc": auc_pairs / total_pairs if total_pairs else float("nan"),
+        }
+
+
+def train_streaming(path=None, chunksize=100_000, epochs=5, holdout_percent=20, alpha=1e-4, eta0=0.01, seed=42,
+                    sample_rows=SAMPLE_ROWS):
+    """Fit preprocessor, scaler and an incremental logistic model chunk by chunk.
+
+    Returns ``(pipeline, metrics, memory, sample)``; ``sample`` holds the
+    first ``sample_rows`` training rows (encoded) and holdout rows (raw).
+    """
+    path = path or default_data_path()
+    memory = StageMemory()
+
+    with memory.stage("preprocess"):
+        preprocessor = fit_preprocessor_streaming(iter_csv_chunks(path, chunksize), seed)
+
+    with memory.stage("scale"):
+        scaler = StandardScaler()
+        for _, features, _, holdout in _encoded_chunks(path, chunksize, preprocessor, holdout_percent):
+            if (~holdout).any():
+                scaler.partial_fit(features[~holdout])
+
+    # "optimal" starts at 1/(alpha * t0), far too large for alpha=1e-4; an
+    # "adaptive" rate is only lowered by fit(), so under partial_fit it stays
+    # at eta0. Weight averaging was tried and hurt small chunks.
+    model = SGDClassifier(loss="log_loss", alpha=alpha, learning_rate="adaptive", eta0=eta0, random_state=seed)
+    pipeline = ChurnPipeline(preprocessor, scaler, model, {
+        "model_name": "SGD Logistic Regression (streaming)",
+        "epochs": epochs,
+        "chunksize": chunksize,
+    })
+    rng = np.random.default_rng(seed)
+    classes = np.array([0, 1])
+    for epoch in range(epochs):
+        with memory.stage(f"train[{epoch + 1}]"):
+            for _, features, target, holdout in _encoded_chunks(path, chunksize, preprocessor, holdout_percent):
+                train = np.flatnonzero(~holdout)
+                if len(train):
+                    # exports are often sorted (by signup date, region, ...);
+                    # SGD needs the rows of each chunk in random order
+                    train = rng.permutation(train)
+                    model.partial_fit(pipeline.scale(features[train]), target[train], classes=classes)
+
+    with memory.stage("evaluate"):
+        metrics = StreamingMetrics()
+        train_sample, holdout_sample = [], []
+        n_train = n_holdout = 0
+        for chunk, features, target, holdout in _encoded_chunks(path, chunksize, preprocessor, holdout_percent):
+            if holdout.any():
+                metrics.update(target[holdout], pipeline.predict_proba(pipeline.scale(features[holdout])))
+            if n_train < sample_rows:
+                train_sample.append(features[~holdout][:sample_rows - n_train])
+                n_train += len(train_sample[-1])
+            if n_holdout < sample_rows:
+                holdout_sample.append(chunk[holdout].iloc[:sample_rows - n_holdout])
+                n_holdout += len(holdout_sample[-1])
+
+    pipeline.metadata["roc_auc"] = float(metrics.summary()["roc_auc"])
+    sample = {"train": np.concatenate(train_sample), "holdout": pd.concat(holdout_sample)}
+    return pipeline, metrics.summary(), memory, sample
+
+
+def sample_split(pipeline, sample):
+    """The ``split`` predicting_customer_churn.save_artifacts expects, built from the kept sample rows."""
+    columns = pipeline.feature_columns
+    X_train = pd.DataFrame(sample["train"], columns=columns)
+    X_test = pd.DataFrame(pipeline.preprocessor.encode_frame(sample["holdout"]), columns=columns,
+                          index=sample["holdout"].index)
+    return {'X_train': X_train, 'X_test': X_test,
+            'y_test': (sample["holdout"][TARGET_COLUMN] == "Yes").astype(int),
+            'X_train_scaled': pipeline.scale(X_train.to_numpy()), 'X_test_scaled': pipeline.scale(X_test.to_numpy()),
+            'scaler': pipeline.scaler}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the churn model out of core, chunk by chunk.")
+    parser.add_argument("--data", default=None, help="CSV export (default: CHURN_DATA_PATH or the bundled file)")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--eta0", type=float, default=0.01, help="SGD learning rate")
+    parser.add_argument("--holdout-percent", type=int, default=20)
+    parser.add_argument("--model-dir", default=os.environ.get("CHURN_MODEL_DIR", "models"),
+                        help="versioned model directory (default: CHURN_MODEL_DIR or models/)")
+    parser.add_argument("--margin", type=float, default=PROMOTION_MARGIN,
+                        help="ROC-AUC the streaming model must gain over the champion to be promoted")
+    parser.add_argument("--force", action="store_true", help="promote even if the champion scores better")
+    args = parser.parse_args()
+
+    # Deferred: pulls in the plotting and training modules
+    from predicting_customer_churn import save_artifacts
+
+    pipeline, metrics, memory, sample = train_streaming(args.data, args.chunksize, args.epochs,
+                                                        args.holdout_percent, eta0=args.eta0)
+    print(f"\nHoldout: {metrics['rows']} rows, accuracy {metrics['accuracy']:.4f}, "
+          f"log loss {metrics['log_loss']:.4f}, ROC-AUC {metrics['roc_auc']:.4f}")
+    memory.report()
+
+    split = sample_split(pipeline, sample)
+    path, decision = publish(args.model_dir, pipeline, sample["holdout"], split['y_test'],
+                             lambda out_dir, version: save_artifacts(out_dir, pipeline, version, split),
+                             force=args.force, margin=args.margin,
+                             record={"streaming_holdout": {key: float(value) for key, value in metrics.items()}})
+    print(f"\n✅ Streaming pipeline version {decision['version']} saved to '{path}'")
+    print_decision(decision)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import os
+import time
+
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import HalvingRandomSearchCV, StratifiedKFold
+
+# ===============================
+# 🏋️ PARALLEL TRAINING ENGINE
+# ===============================
+# Fits the model zoo (and optional hyperparameter searches) in a process
+# pool. Estimators that thread internally (RandomForest, XGBoost) get
+# their n_jobs capped so workers x threads never exceeds the core count.
+
+SEARCH_SPACES = {
+    'Logistic Regression': {
+        'C': [0.001, 0.01, 0.1, 0.3, 1.0, 3.0, 10.0],
+        'class_weight': [None, 'balanced'],
+    },
+    'Decision Tree': {
+        'max_depth': [3, 4, 5, 6, 8, 10, None],
+        'min_samples_leaf': [1, 5, 10, 20, 50],
+    },
+    'Random Forest': {
+        'n_estimators': [100, 200, 400],
+        'max_depth': [4, 6, 8, 12, None],
+        'min_samples_leaf': [1, 2, 5, 10],
+        'max_features': ['sqrt', 0.5],
+    },
+    'Gradient Boosting': {
+        'n_estimators': [100, 200, 300],
+        'learning_rate': [0.03, 0.05, 0.1],
+        'max_depth': [2, 3, 4],
+        'subsample': [0.8, 1.0],
+    },
+    'XGBoost': {
+        'n_estimators': [100, 200, 400],
+        'learning_rate': [0.03, 0.05, 0.1],
+        'max_depth': [2, 3, 4, 6],
+        'subsample': [0.8, 1.0],
+        'colsample_bytree': [0.6, 0.8, 1.0],
+    },
+}
+
+
+def cpu_budget(n_tasks, n_jobs=None):
+    """Split the available cores into (outer workers, threads per worker)."""
+    cores = n_jobs if n_jobs and n_jobs > 0 else (os.cpu_count() or 1)
+    workers = max(1, min(n_tasks, cores))
+    return workers, max(1, cores // workers)
+
+
+def limit_threads(estimator, n_threads):
+    """Cap an estimator's internal parallelism, if it has any.
+
+    Linear models are left alone: their ``n_jobs`` only splits multiclass
+    one-vs-rest fits (and is deprecated on LogisticRegression since
+    scikit-learn 1.8), so it never threads a binary churn model.
+    """
+    if 'n_jobs' in estimator.get_params() and not isinstance(estimator, (LogisticRegression, SGDClassifier)):
+        estimator.set_params(n_jobs=n_threads)
+    return estimator
+
+
+def evaluate_model(model, X_test, y_test):
+    y_pred = model.predict(X_test)
+    y_pred_proba = model.predict_proba(X_test)[:, 1]
+    return {
+        'Accuracy': accuracy_score(y_test, y_pred),
+        'Precision': precision_score(y_test, y_pred),
+        'Recall': recall_score(y_test, y_pred),
+        'F1-Score': f1_score(y_test, y_pred),
+        'ROC-AUC': roc_auc_score(y_test, y_pred_proba),
+    }
+
+
+def _fit_one(name, model, X_train, y_train, X_test, y_test, n_threads):
+    model = limit_threads(clone(model), n_threads)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    metrics = evaluate_model(model, X_test, y_test)
+    return name, model, {'Model': name, **metrics, 'Fit Seconds': fit_seconds}
+
+
+def train_models(models, X_train, y_train, X_test, y_test, n_jobs=None):
+    """Fit and evaluate every model concurrently.
+
+    Returns ``(fitted_models, results)`` with both in the order of ``models``.
+    """
+    workers, threads = cpu_budget(len(models), n_jobs)
+    outputs = Parallel(n_jobs=workers)(
+        delayed(_fit_one)(name, model, X_train, y_train, X_test, y_test, threads)
+        for name, model in models.items()
+    )
+    fitted = {name: model for name, model, _ in outputs}
+    results = [result for _, _, result in outputs]
+    return fitted, results
+
+
+def _search_one(name, model, space, X, y, n_threads, cv, n_candidates, random_state):
+    search = HalvingRandomSearchCV(
+        limit_threads(clone(model), 1),
+        space,
+        n_candidates=n_candidates,
+        factor=3,
+        resource='n_samples',
+        cv=StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state),
+        scoring='roc_auc',
+        refit=False,
+        random_state=random_state,
+        n_jobs=n_threads,
+    )
+    start = time.perf_counter()
+    search.fit(X, y)
+    return name, search.best_params_, search.best_score_, time.perf_counter() - start
+
+
+def tune_models(models, X, y, search_spaces=None, n_jobs=None, cv=5, n_candidates='exhaust', random_state=42):
+    """Successive-halving random search for every model, run side by side.
+
+    Candidates are screened on small subsamples and only the best third
+    advance to the next, larger round, so most configurations never see
+    the full data. Returns ``(tuned_models, summary)`` where the tuned
+    models are unfitted clones carrying the best parameters.
+    """
+    search_spaces = search_spaces or SEARCH_SPACES
+    names = [name for name in models if name in search_spaces]
+    workers, threads = cpu_budget(len(names), n_jobs)
+    outputs = Parallel(n_jobs=workers)(
+        delayed(_search_one)(name, models[name], search_spaces[name], X, y, threads, cv, n_candidates, random_state)
+        for name in names
+    )
+    tuned = dict(models)
+    summary = []
+    for name, params, score, seconds in outputs:
+        tuned[name] = clone(models[name]).set_params(**params)
+        summary.append({'Model': name, 'CV ROC-AUC': score, 'Search Seconds': seconds, 'Best Params': params})
+    return tuned, summary
@@ -100,6 +100,36 @@ export type Database = {
         }
         Relationships: []
       }
+      prediction_user_stats: {
+        Row: {
+          user_id: string
+          predictions: number
+          churned: number
+          probability_sum: number
+          probability_count: number
+          last_prediction_at: string | null
+          updated_at: string
+        }
+        Insert: {
+          user_id: string
+          predictions?: number
+          churned?: number
+          probability_sum?: number
+          probability_count?: number
+          last_prediction_at?: string | null
+          updated_at?: string
+        }
+        Update: {
+          user_id?: string
+          predictions?: number
+          churned?: number
+          probability_sum?: number
+          probability_count?: number
+          last_prediction_at?: string | null
+          updated_at?: string
+        }
+        Relationships: []
+      }
       user_roles: {
         Row: {
           created_at: string
@@ -382,6 +412,7 @@ export const Constants = {
       profiles: true,
       user_roles: true,
       predictions: true,
+      prediction_user_stats: true,
     },
   },
 } as const